@@ -0,0 +1,244 @@
+# infant_mortality.py — panel prep, batched what-if scenarios and permutation importance
+#
+# The data prep mirrors Code_infantmortatility.ipynb (load_and_clean -> make_panel -> add_lags
+# -> temporal split); lag_panel.LagPanel builds the same frame incrementally. On top of a fitted model, ScenarioEngine:
+#
+#   * predicts the baseline once and keeps it,
+#   * applies any number of scenarios (per-state, per-indicator factors / deltas) to a stacked
+#     copy of the feature matrix and scores them all with one batched predict,
+#   * computes permutation importance the same way, every (feature, repeat) permutation in one
+#     batch, with chunks spread over a thread pool.
+#
+#   python infant_mortality.py --model outputs/models/best_rf_pipeline.joblib --pcts -10 -5 5 10
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from lag_panel import LagPanel
+
+# Cost_Of_HealthCare_Analysis/ on sys.path for the shared modules (pattern documented in data_catalog.py)
+sys.path.append(next(str(p) for p in Path(__file__).resolve().parents if (p / "data_catalog.py").exists()))
+from data_catalog import read_csv  # noqa: E402
+
+CANDIDATES = [
+    Path("ahpf_outcomes_clean.csv"),
+    Path("data/anjana/processed/ahpf_outcomes_clean.csv"),
+    Path.cwd() / "ahpf_outcomes_clean.csv",
+]
+OUT_DIR = Path("outputs/models")
+
+TARGET = "Infant and young child mortality rate"
+LAGS = [1, 2]
+RANDOM_STATE = 42
+BATCH_ROWS = 200_000  # rows per predict call when scoring stacked scenarios
+
+
+# ---------- data ----------
+def find_data() -> Path:
+    path = next((p for p in CANDIDATES if p.exists()), None)
+    if path is None:
+        raise FileNotFoundError("Couldn’t find 'ahpf_outcomes_clean.csv'.")
+    return path
+
+
+def load_and_clean(path):
+    df = read_csv(path, low_memory=False)
+    df["Name"] = df["Name"].astype(str).str.strip()
+    df["State"] = df["State"].astype(str).str.strip()
+
+    if "Period" in df.columns:
+        df["Year"] = pd.to_numeric(df["Period"], errors="coerce")
+    elif "Year" in df.columns:
+        df["Year"] = pd.to_numeric(df["Year"], errors="coerce")
+
+    df["Value"] = pd.to_numeric(
+        df["Value"].astype(str)
+            .str.replace(",", "", regex=False)
+            .str.replace("−", "-", regex=False),
+        errors="coerce"
+    )
+    df = df.dropna(subset=["State", "Year", "Name", "Value"])
+    df = df[df["UnitType"] == "DecimalOne"]
+    return df
+
+
+def make_panel(df):
+    wide = df.pivot_table(
+        index=["State", "Year"],
+        columns="Name",
+        values="Value",
+        aggfunc="mean"
+    ).sort_index()
+    if TARGET not in wide.columns:
+        raise ValueError(f"Target '{TARGET}' not found. Columns: {list(wide.columns[:10])}")
+    return wide
+
+
+def add_lags(panel, cols, lag_years):
+    out = panel.copy()
+    for col in cols:
+        for k in lag_years:
+            out[f"{col}_lag{k}"] = out.groupby(level=0)[col].shift(k)
+    return out
+
+
+def temporal_train_test_split(panel_with_lags, n_test_years=2):
+    years = panel_with_lags.index.get_level_values("Year").unique().sort_values()
+    test_years = years[-n_test_years:]
+    train_years = years[:-n_test_years]
+    need_cols = [TARGET] + [f"{TARGET}_lag{k}" for k in LAGS]
+    train = panel_with_lags.loc[(slice(None), train_years), :].dropna(subset=need_cols)
+    test = panel_with_lags.loc[(slice(None), test_years), :].dropna(subset=need_cols)
+    return train, test, train_years, test_years
+
+
+def feature_columns(wide, wide_lag) -> List[str]:
+    feat_now = [c for c in wide.columns if c != TARGET]
+    feat_lag = [c for c in wide_lag.columns if c.startswith(f"{TARGET}_lag")]
+    return feat_now + feat_lag
+
+
+# ---------- scenarios ----------
+def pct_scenarios(feature: str, pcts: Sequence[float], states: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """The notebook's what-if: scale one feature by each percentage, for every state (or the given ones)."""
+    rows = [{"Scenario": f"{p:+g}%", "State": s, "Feature": feature, "Factor": 1 + p / 100, "Delta": 0.0}
+            for p in pcts for s in (states or [None])]
+    return pd.DataFrame(rows)
+
+
+def _r2(y: np.ndarray, pred: np.ndarray) -> np.ndarray:
+    """R² of each row of pred (n_batches × n) against y."""
+    ss_tot = ((y - y.mean()) ** 2).sum()
+    return 1 - ((pred - y) ** 2).sum(axis=-1) / ss_tot
+
+
+class ScenarioEngine:
+    """
+    What-if and permutation-importance runs against one fitted model and one feature matrix.
+    X is indexed by (State, Year) like the notebook's X_test; baseline predictions are cached.
+    """
+
+    def __init__(self, model, X: pd.DataFrame, batch_rows: int = BATCH_ROWS, workers: Optional[int] = None):
+        self.model = model
+        self.X = X
+        self.columns = list(X.columns)
+        self.values = X.to_numpy(dtype=float)
+        self.states = np.asarray(X.index.get_level_values(0))
+        self.batch_rows = batch_rows
+        self.workers = workers
+        self.baseline = self.predict_stacked(self.values[None])[0]
+
+    def predict_stacked(self, stack: np.ndarray) -> np.ndarray:
+        """(n_batches × n_rows × n_features) -> (n_batches × n_rows), predicted in row chunks."""
+        flat = stack.reshape(-1, stack.shape[-1])
+        chunks = [flat[i:i + self.batch_rows] for i in range(0, len(flat), self.batch_rows)]
+        predict = lambda a: self.model.predict(pd.DataFrame(a, columns=self.columns))  # noqa: E731
+        if len(chunks) > 1 and self.workers != 1:
+            from joblib import Parallel, delayed
+            parts = Parallel(n_jobs=self.workers or -1, prefer="threads")(delayed(predict)(c) for c in chunks)
+        else:
+            parts = [predict(c) for c in chunks]
+        return np.concatenate(parts).reshape(stack.shape[:2])
+
+    def apply(self, scenarios: pd.DataFrame):
+        """
+        Scenario names and the stacked feature matrices. scenarios has one row per change:
+        Scenario, State (None/NaN = every state), Feature, Factor (×, default 1), Delta (+, default 0).
+        """
+        sc = scenarios.copy()
+        sc["Factor"] = sc.get("Factor", pd.Series(1.0, index=sc.index)).fillna(1.0)
+        sc["Delta"] = sc.get("Delta", pd.Series(0.0, index=sc.index)).fillna(0.0)
+        unknown = set(sc["Feature"]) - set(self.columns)
+        if unknown:
+            raise KeyError(f"Unknown feature(s): {sorted(unknown)}")
+        names = pd.Index(pd.unique(sc["Scenario"]))
+
+        # expand every change to the (scenario, row, column) cells it touches
+        rows = pd.DataFrame({"State": self.states, "row": np.arange(len(self.states))})
+        all_states = sc["State"].isna()
+        cells = pd.concat([
+            sc[~all_states].merge(rows, on="State"),
+            sc[all_states].drop(columns="State").merge(rows, how="cross"),
+        ], ignore_index=True)
+        s_idx = names.get_indexer(cells["Scenario"])
+        c_idx = pd.Index(self.columns).get_indexer(cells["Feature"])
+        r_idx = cells["row"].to_numpy()
+
+        shape = (len(names),) + self.values.shape
+        factor, delta = np.ones(shape), np.zeros(shape)
+        np.multiply.at(factor, (s_idx, r_idx, c_idx), cells["Factor"].to_numpy(dtype=float))
+        np.add.at(delta, (s_idx, r_idx, c_idx), cells["Delta"].to_numpy(dtype=float))
+        return names, self.values[None] * factor + delta
+
+    def run(self, scenarios: pd.DataFrame) -> pd.DataFrame:
+        """Scenario, State, Year, Baseline, Predicted, Delta for every scenario × row, from one batched predict."""
+        names, stack = self.apply(scenarios)
+        pred = self.predict_stacked(stack)
+        n = len(self.states)
+        return pd.DataFrame({
+            "Scenario": np.repeat(names.to_numpy(), n),
+            "State": np.tile(self.states, len(names)),
+            "Year": np.tile(np.asarray(self.X.index.get_level_values(-1)), len(names)),
+            "Baseline": np.tile(self.baseline, len(names)),
+            "Predicted": pred.ravel(),
+            "Delta": (pred - self.baseline).ravel(),
+        })
+
+    def permutation_importance(self, y, n_repeats: int = 30, random_state: int = RANDOM_STATE) -> pd.DataFrame:
+        """Drop in R² when each feature is shuffled (mean / std over repeats), highest first."""
+        y = np.asarray(y, dtype=float)
+        rng = np.random.RandomState(random_state)
+        n, p = self.values.shape
+        perms = np.array([rng.permutation(n) for _ in range(p * n_repeats)])
+        stack = np.repeat(self.values[None], p * n_repeats, axis=0)
+        cols = np.repeat(np.arange(p), n_repeats)
+        stack[np.arange(len(cols))[:, None], np.arange(n)[None], cols[:, None]] = self.values[perms, cols[:, None]]
+
+        base = _r2(y, self.baseline)
+        drops = (base - _r2(y, self.predict_stacked(stack))).reshape(p, n_repeats)
+        return (pd.DataFrame({"feature": self.columns, "importance": drops.mean(axis=1),
+                              "std": drops.std(axis=1)})
+                .sort_values("importance", ascending=False).reset_index(drop=True))
+
+
+def scenario_summary(results: pd.DataFrame) -> pd.DataFrame:
+    """Mean change per State × Scenario (the what-if bar chart)."""
+    return results.groupby(["State", "Scenario"])["Delta"].mean().reset_index()
+
+
+def main(argv=None):
+    import joblib
+
+    p = argparse.ArgumentParser(description="Batched what-if scenarios for the infant mortality model.")
+    p.add_argument("--model", default=str(OUT_DIR / "best_rf_pipeline.joblib"))
+    p.add_argument("--data", default=None, help="ahpf_outcomes_clean.csv (default: search CANDIDATES)")
+    p.add_argument("--feature", default=None, help="feature to vary (default: top permutation importance)")
+    p.add_argument("--pcts", nargs="+", type=float, default=[-10, -5, 5, 10])
+    p.add_argument("--repeats", type=int, default=30)
+    p.add_argument("--workers", type=int, default=None)
+    args = p.parse_args(argv)
+
+    model = joblib.load(args.model)
+    panel = LagPanel.from_long(load_and_clean(args.data or find_data()), [TARGET], LAGS)
+    wide_lag = panel.frame()
+    _, test, _, _ = temporal_train_test_split(wide_lag)
+    engine = ScenarioEngine(model, test[feature_columns(panel.frame(with_lags=False), wide_lag)],
+                            workers=args.workers)
+
+    imp = engine.permutation_importance(test[TARGET], args.repeats)
+    print(imp.to_string(index=False))
+    feature = args.feature or imp.iloc[0]["feature"]
+    summary = scenario_summary(engine.run(pct_scenarios(feature, args.pcts)))
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    imp.to_csv(OUT_DIR / "permutation_importance.csv", index=False)
+    summary.to_csv(OUT_DIR / "what_if_summary.csv", index=False)
+    print(f"What-if on {feature}: {len(summary)} State × Scenario rows -> {OUT_DIR.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# lag_panel.py — State × Year indicator panel with lag features, kept as numpy arrays and grown in place
+#
+# make_panel() + add_lags() in the notebook re-pivot the whole long AHPF table and copy the
+# panel once per (column, lag). LagPanel keeps running sums / counts in a dense
+# (state, year, indicator) array instead:
+#
+#   * append() scatters new long rows into the array with one bincount (repeated rows average
+#     exactly like pivot_table(aggfunc="mean")),
+#   * lags for every lagged column and every k are one slice assignment per lag,
+#   * only years from the earliest appended year onwards are recomputed; the year axis grows
+#     with spare capacity, so adding a year is O(rows added), not O(panel).
+#
+# Lag k is the value k calendar years earlier (NaN if that year has no data). For a panel
+# without gaps this is exactly groupby(level=0).shift(k); with gaps shift() would silently
+# take an older row.
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class LagPanel:
+    def __init__(self, lag_cols: Sequence[str], lags: Sequence[int] = (1, 2), year_capacity: int = 16):
+        self.lag_cols = list(lag_cols)
+        self.lags = list(lags)
+        self.states: List[str] = []
+        self.columns: List[str] = []
+        self._state_pos: Dict[str, int] = {}
+        self._col_pos: Dict[str, int] = {}
+        self.first_year: Optional[int] = None
+        self.year_dtype = np.dtype(float)  # Year comes back with the dtype it came in with
+        self.n_years = 0
+        self._sum = np.zeros((0, year_capacity, 0))
+        self._count = np.zeros((0, year_capacity, 0), dtype=np.int32)
+        self._lagged = np.full((0, year_capacity, len(self.lag_cols) * len(self.lags)), np.nan)
+
+    @classmethod
+    def from_long(cls, df: pd.DataFrame, lag_cols: Sequence[str], lags: Sequence[int] = (1, 2)) -> "LagPanel":
+        return cls(lag_cols, lags).append(df)
+
+    # ---------- storage ----------
+    def _grow(self, n_states: int, n_years: int, n_cols: int, shift: int = 0):
+        """Resize the arrays (doubling the year capacity); `shift` moves history right for earlier years."""
+        cap = self._sum.shape[1]
+        if n_years + shift > cap:
+            cap = max(cap * 2, n_years + shift)
+        if (n_states, cap, n_cols) == self._sum.shape and not shift:
+            return
+        s0, y0, c0 = self._sum.shape[0], self.n_years, self._sum.shape[2]
+        new_sum = np.zeros((n_states, cap, n_cols))
+        new_count = np.zeros((n_states, cap, n_cols), dtype=np.int32)
+        new_lagged = np.full((n_states, cap, self._lagged.shape[2]), np.nan)
+        new_sum[:s0, shift:shift + y0, :c0] = self._sum[:, :y0]
+        new_count[:s0, shift:shift + y0, :c0] = self._count[:, :y0]
+        new_lagged[:s0, shift:shift + y0] = self._lagged[:, :y0]
+        self._sum, self._count, self._lagged = new_sum, new_count, new_lagged
+
+    def _codes(self, values: pd.Series, pos: Dict[str, int], names: List[str]) -> np.ndarray:
+        codes, uniques = pd.factorize(values)
+        for v in uniques:
+            if v not in pos:
+                pos[v] = len(names)
+                names.append(v)
+        return np.array([pos[v] for v in uniques], dtype=np.intp)[codes]
+
+    # ---------- updates ----------
+    def append(self, df: pd.DataFrame) -> "LagPanel":
+        """Add long rows (State, Year, Name, Value); rows for years already present are averaged in."""
+        df = df.dropna(subset=["State", "Year", "Name", "Value"])
+        if df.empty:
+            return self
+        years = df["Year"].to_numpy(dtype=float).astype(int)
+        lo, hi = int(years.min()), int(years.max())
+        shift = 0
+        if self.first_year is None:
+            self.first_year = lo
+            self.year_dtype = df["Year"].dtype
+        elif lo < self.first_year:
+            shift, self.first_year = self.first_year - lo, lo
+            self._lagged[:] = np.nan  # everything after the new first year is recomputed below
+
+        s_idx = self._codes(df["State"], self._state_pos, self.states)
+        c_idx = self._codes(df["Name"], self._col_pos, self.columns)
+        n_years = max(self.n_years + shift, hi - self.first_year + 1)
+        self._grow(len(self.states), n_years, len(self.columns), shift)
+        self.n_years = n_years
+
+        # scatter into the touched year window only (bincount is the fast np.add.at)
+        y_idx = years - self.first_year
+        w0, w1 = (0, self.n_years) if shift else (int(y_idx.min()), int(y_idx.max()) + 1)
+        shape = (len(self.states), w1 - w0, len(self.columns))
+        flat = np.ravel_multi_index((s_idx, y_idx - w0, c_idx), shape)
+        size = int(np.prod(shape))
+        self._sum[:, w0:w1] += np.bincount(flat, df["Value"].to_numpy(dtype=float), size).reshape(shape)
+        self._count[:, w0:w1] += np.bincount(flat, minlength=size).reshape(shape).astype(np.int32)
+        self._update_lags(w0)
+        return self
+
+    def _update_lags(self, start: int):
+        """Recompute lag features for year slots >= start (earlier slots cannot depend on them)."""
+        lo = max(0, start - max(self.lags))
+        values = self.values(lo)  # only the years the new lags can read from
+        cols = [self._col_pos.get(c) for c in self.lag_cols]
+        j = 0
+        for ci in cols:
+            for k in self.lags:
+                out = self._lagged[:, start:self.n_years, j]
+                out[:] = np.nan
+                if ci is not None:
+                    src_lo = start - k
+                    skip = max(0, -src_lo)  # the first k years have no lag
+                    out[:, skip:] = values[:, src_lo + skip - lo:self.n_years - k - lo, ci]
+                j += 1
+
+    # ---------- views ----------
+    def values(self, start: int = 0) -> np.ndarray:
+        """(state, year, indicator) means from year slot `start` on; NaN where there is no data."""
+        s, c = self._sum[:, start:self.n_years], self._count[:, start:self.n_years]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(c > 0, s / np.maximum(c, 1), np.nan)
+
+    @property
+    def lag_names(self) -> List[str]:
+        return [f"{col}_lag{k}" for col in self.lag_cols for k in self.lags]
+
+    def frame(self, with_lags: bool = True) -> pd.DataFrame:
+        """The notebook's wide_lag frame: (State, Year) index, indicators sorted by name, then the lags."""
+        vals = self.values()
+        present = (self._count[:, :self.n_years] > 0).any(axis=2)
+        s_order = np.argsort(self.states, kind="stable")
+        c_order = np.argsort(self.columns, kind="stable")
+        si, yi = np.nonzero(present[s_order])  # state-major, years ascending
+        si = s_order[si]
+
+        data = vals[si, yi][:, c_order]
+        names = [self.columns[i] for i in c_order]
+        if with_lags:
+            data = np.hstack([data, self._lagged[si, yi]])
+            names += self.lag_names
+        index = pd.MultiIndex.from_arrays(
+            [[self.states[i] for i in si], (yi + self.first_year).astype(self.year_dtype)], names=["State", "Year"])
+        out = pd.DataFrame(data, index=index, columns=names)
+        out.columns.name = "Name"
+        return out
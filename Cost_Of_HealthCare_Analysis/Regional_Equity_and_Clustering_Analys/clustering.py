@@ -0,0 +1,212 @@
+# clustering.py — k selection, final clustering and cluster profiles for the regional equity analysis
+#
+# Replaces the fit-twice loops in Notebooks/Analysis/clustering_analysis.ipynb. Every
+# (k, init) K-Means fit runs once in a process pool; the best init per k is kept and its
+# labels are reused for inertia, silhouette, Calinski-Harabasz and Davies-Bouldin.
+# Agglomerative (Ward) clustering builds its merge tree once (cached on disk by joblib) and
+# every k is a cut of that tree.
+#
+#   python clustering.py                     # PHN features, k = 2..7, final k = 4 -> Data/preprocessed-data/
+#   python clustering.py --k auto --method agglomerative
+#   python clustering.py --data sa2_scaled.csv --id-cols SA2_CODE State --out-dir out/
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import AgglomerativeClustering, KMeans
+from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score, silhouette_score
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, "Data", "preprocessed-data")
+CACHE_DIR = os.path.join(ROOT, ".cluster_cache")
+
+SCALED_FILE = "final_scaled_dataset.csv"
+BASE_FILE = "final_cost_pph_seifa_dataset.csv"
+FEATURES = ["Cost_per_person_scaled", "PPH_rate_per_100k_scaled", "SEIFA_IRSD_Score_scaled"]
+ID_COLS = ["PHN_Code", "PHN_Name", "State"]
+BASE_COLS = ["PPH_rate_per_100k", "Cost_per_person", "SEIFA_IRSD_Score"]
+# output column -> (input column, aggregation), as in cluster_profile_summary.csv
+PROFILE = {
+    "Num_of_PHNs": ("PHN_Code", "count"),
+    "Cost_PP_Mean": ("Cost_per_person", "mean"),
+    "PPH_Mean": ("PPH_rate_per_100k", "mean"),
+    "SEIFA_IRSD_Score_Mean": ("SEIFA_IRSD_Score", "mean"),
+}
+
+K_RANGE = range(2, 8)
+N_INIT = 20
+RANDOM_STATE = 2333
+SILHOUETTE_SAMPLE = 10_000  # above this many rows, silhouette is estimated on a sample
+
+# Cost_Of_HealthCare_Analysis/ on sys.path for the shared modules (pattern documented in data_catalog.py)
+sys.path.append(next(str(p) for p in Path(__file__).resolve().parents if (p / "data_catalog.py").exists()))
+from data_catalog import load  # noqa: E402
+
+
+# ---------- K-Means ----------
+def init_seeds(n_init: int = N_INIT, random_state: int = RANDOM_STATE) -> List[int]:
+    """One independent seed per init, so results do not depend on how inits are spread over workers."""
+    return [int(s) for s in np.random.SeedSequence(random_state).generate_state(n_init)]
+
+
+def _fit_kmeans(task) -> Tuple[int, int, float, np.ndarray, float]:
+    X, k, init, seed = task
+    t0 = time.perf_counter()
+    km = KMeans(n_clusters=k, n_init=1, random_state=seed).fit(X)
+    return k, init, float(km.inertia_), km.labels_, time.perf_counter() - t0
+
+
+def kmeans_fits(X: np.ndarray, k_values: Sequence[int], n_init: int = N_INIT, random_state: int = RANDOM_STATE,
+                workers: Optional[int] = None) -> Dict[int, dict]:
+    """k -> {"labels", "inertia", "fit_s"} for the lowest-inertia init (ties go to the earlier init)."""
+    seeds = init_seeds(n_init, random_state)
+    tasks = [(X, k, i, s) for k in k_values for i, s in enumerate(seeds)]
+    if workers == 1:
+        fits = [_fit_kmeans(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            fits = list(pool.map(_fit_kmeans, tasks, chunksize=max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))))
+
+    best: Dict[int, dict] = {}
+    for k, init, inertia, labels, sec in sorted(fits, key=lambda f: (f[0], f[1])):
+        b = best.setdefault(k, {"labels": labels, "inertia": inertia, "fit_s": 0.0})
+        b["fit_s"] += sec
+        if inertia < b["inertia"]:
+            b.update(labels=labels, inertia=inertia)
+    return best
+
+
+# ---------- agglomerative ----------
+def agglomerative_fits(X: np.ndarray, k_values: Sequence[int], linkage: str = "ward",
+                       cache_dir: Optional[str] = CACHE_DIR) -> Dict[int, dict]:
+    """k -> labels from one merge tree; with cache_dir the tree is also reused across runs."""
+    out = {}
+    for k in k_values:
+        t0 = time.perf_counter()
+        model = AgglomerativeClustering(n_clusters=k, linkage=linkage, memory=cache_dir, compute_full_tree=True)
+        labels = model.fit_predict(X)
+        out[k] = {"labels": labels, "inertia": within_ss(X, labels), "fit_s": time.perf_counter() - t0}
+    return out
+
+
+# ---------- scoring ----------
+def within_ss(X: np.ndarray, labels: np.ndarray) -> float:
+    return float(sum(((X[labels == c] - X[labels == c].mean(axis=0)) ** 2).sum() for c in np.unique(labels)))
+
+
+def score_labels(X: np.ndarray, labels: np.ndarray, random_state: int = RANDOM_STATE) -> dict:
+    sample = SILHOUETTE_SAMPLE if len(X) > SILHOUETTE_SAMPLE else None
+    return {
+        "silhouette": silhouette_score(X, labels, sample_size=sample, random_state=random_state),
+        "calinski_harabasz": calinski_harabasz_score(X, labels),
+        "davies_bouldin": davies_bouldin_score(X, labels),
+    }
+
+
+def select_k(X: np.ndarray, k_values: Sequence[int] = K_RANGE, methods: Sequence[str] = ("kmeans",),
+             n_init: int = N_INIT, random_state: int = RANDOM_STATE, workers: Optional[int] = None,
+             cache_dir: Optional[str] = CACHE_DIR) -> Tuple[pd.DataFrame, Dict[Tuple[str, int], np.ndarray]]:
+    """
+    (one row per method × k with inertia and the validity indices, {(method, k): labels}).
+    Each k is fitted once per method; all indices come from those labels.
+    """
+    fits = {}
+    if "kmeans" in methods:
+        fits["kmeans"] = kmeans_fits(X, k_values, n_init, random_state, workers)
+    if "agglomerative" in methods:
+        fits["agglomerative"] = agglomerative_fits(X, k_values, cache_dir=cache_dir)
+
+    rows, labels = [], {}
+    for method, by_k in fits.items():
+        for k, f in by_k.items():
+            labels[(method, k)] = f["labels"]
+            rows.append({"method": method, "k": k, "inertia": f["inertia"], **score_labels(X, f["labels"], random_state),
+                         "fit_s": f["fit_s"]})
+    return pd.DataFrame(rows), labels
+
+
+def best_k(scores: pd.DataFrame, method: str) -> int:
+    """Highest silhouette for this method."""
+    s = scores[scores["method"] == method]
+    return int(s.loc[s["silhouette"].idxmax(), "k"])
+
+
+# ---------- outputs ----------
+def clustered_frame(ids: pd.DataFrame, labels: np.ndarray, base: Optional[pd.DataFrame] = None,
+                    key: str = "PHN_Code", base_cols: Sequence[str] = BASE_COLS) -> pd.DataFrame:
+    """ids + Cluster, joined to the unscaled values (final_clustered_dataset.csv)."""
+    out = ids.copy()
+    out["Cluster"] = labels
+    if base is not None:
+        out = out.merge(base[[key, *base_cols]], on=key, how="left")
+    return out
+
+
+def cluster_profile(clustered: pd.DataFrame, spec: Optional[Dict[str, Tuple[str, str]]] = None) -> pd.DataFrame:
+    spec = spec or PROFILE
+    return (clustered.groupby("Cluster", as_index=False)
+            .agg(**{name: col_agg for name, col_agg in spec.items() if col_agg[0] in clustered})
+            .sort_values("Cluster").round(3))
+
+
+def state_matrix(clustered: pd.DataFrame, state_col: str = "State") -> pd.DataFrame:
+    # plain strings, so the columns stay in alphabetical order rather than the catalogue's state order
+    states = clustered[state_col].astype(str)
+    return clustered.groupby(["Cluster", states]).size().unstack(fill_value=0)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="K selection and clustering for the regional equity analysis.")
+    p.add_argument("--data", default=None, help=f"scaled feature CSV (default: catalogued {SCALED_FILE})")
+    p.add_argument("--base", default=None,
+                   help=f"unscaled CSV joined onto the labels (default: catalogued {BASE_FILE}; '' to skip)")
+    p.add_argument("--features", nargs="+", default=FEATURES)
+    p.add_argument("--id-cols", nargs="+", default=ID_COLS, help="first column is the join key")
+    p.add_argument("--k-min", type=int, default=K_RANGE.start)
+    p.add_argument("--k-max", type=int, default=K_RANGE.stop - 1)
+    p.add_argument("--k", default="4", help="final number of clusters, or 'auto' (best silhouette)")
+    p.add_argument("--method", choices=["kmeans", "agglomerative"], default="kmeans", help="final clustering")
+    p.add_argument("--n-init", type=int, default=N_INIT)
+    p.add_argument("--workers", type=int, default=None, help="process pool size (1 = run in-process)")
+    p.add_argument("--out-dir", default=DATA_DIR)
+    args = p.parse_args(argv)
+
+    # typed by the catalogue: PHN_Code / State categorical in one spelling
+    df = load("cost_pph_seifa_scaled", args.data)
+    X = df[args.features].to_numpy(dtype=float)
+    k_values = range(args.k_min, args.k_max + 1)
+
+    t0 = time.perf_counter()
+    scores, labels = select_k(X, k_values, ("kmeans", "agglomerative"), args.n_init, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    print(scores.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    print(f"{len(X)} rows × {len(k_values)} k values in {elapsed:.2f}s")
+
+    k = best_k(scores, args.method) if args.k == "auto" else int(args.k)
+    if (args.method, k) not in labels:
+        labels.update(select_k(X, [k], (args.method,), args.n_init, workers=args.workers)[1])
+    key = args.id_cols[0]
+    base = load("cost_pph_seifa_phn", args.base) if args.base != "" else None
+    base_cols = [c for c in BASE_COLS if base is not None and c in base]
+    clustered = clustered_frame(df[args.id_cols], labels[(args.method, k)], base, key, base_cols)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    # fit_s is wall-clock and differs every run: printed above, kept out of the committed CSV
+    scores.drop(columns="fit_s").to_csv(os.path.join(args.out_dir, "cluster_k_selection.csv"), index=False,
+                                        float_format="%.6g")
+    clustered.to_csv(os.path.join(args.out_dir, "final_clustered_dataset.csv"), index=False)
+    spec = {**PROFILE, "Num_of_PHNs": (key, "count")}
+    cluster_profile(clustered, spec).to_csv(os.path.join(args.out_dir, "cluster_profile_summary.csv"), index=False)
+    if "State" in clustered:
+        state_matrix(clustered).to_csv(os.path.join(args.out_dir, "cluster_state_matrix.csv"))
+    print(f"{args.method} k={k} -> {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
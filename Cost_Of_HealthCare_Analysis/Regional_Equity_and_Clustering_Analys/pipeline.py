@@ -0,0 +1,315 @@
+# pipeline.py — content-addressed runner for the preprocessing -> clustering notebook chain
+#
+# The notebooks (data_preprocessing -> cost_pph_merging -> seifa_integrating ->
+# baseline_seifa_merging -> exploratory_data_analysis (scaling) -> clustering_analysis) are stages
+# here: plain functions that read their input files and write their output files. The stage graph
+# follows from which files each stage reads and writes. A stage's key is the sha1 of its code (with the
+# constants and helper functions it uses) and the *contents* of its inputs; its outputs are kept in
+# .pipeline_cache/<key>/, so
+#
+#   * a stage whose inputs have not changed is restored from the cache instead of re-run,
+#   * only stages downstream of a changed raw workbook re-run, and a re-run that writes the same
+#     bytes as before stops the change from propagating further,
+#   * stages whose inputs are ready run in parallel (SEIFA aggregation alongside the cost / PPH side).
+#
+# A stage whose raw input is not in the repo (the PPH workbook) keeps its committed outputs.
+#
+#   python pipeline.py                    # bring Data/preprocessed-data up to date
+#   python pipeline.py --dry-run          # which stages would run / restore
+#   python pipeline.py --force seifa_phn  # re-run a stage (and whatever its outputs change downstream)
+#   python pipeline.py --list             # the stage graph
+import argparse
+import hashlib
+import inspect
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RAW_DIR = os.path.join(ROOT, "Data", "raw-data")
+DATA_DIR = os.path.join(ROOT, "Data", "preprocessed-data")
+CACHE_DIR = os.path.join(ROOT, ".pipeline_cache")
+PIPELINE_VERSION = 1  # bump to invalidate every cached stage
+
+DATACUBE_FILE = "HWE-101-Health-Expenditure-Australia-datacube-2022-23.xlsx"
+PPH_FILE = "pph-20202-2022.xlsx"
+YEAR = "2022-23"
+STATE_MAP = {"NSW": "NSW", "Vic": "VIC", "Qld": "QLD", "SA": "SA", "WA": "WA", "Tas": "TAS", "NT": "NT", "ACT": "ACT"}
+
+# Cost_Of_HealthCare_Analysis/ on sys.path for the shared modules (pattern documented in data_catalog.py)
+SHARED = next(str(p) for p in Path(__file__).resolve().parents if (p / "data_catalog.py").exists())
+sys.path.append(SHARED)
+from data_catalog import read_csv  # noqa: E402
+from excel_cache import file_hash, read_sheet  # noqa: E402
+
+import clustering  # noqa: E402
+import seifa_aggregation  # noqa: E402
+
+
+# ---------- stages ----------
+def cost_by_state(inp: Dict[str, str], out: Dict[str, str]) -> None:
+    """data_preprocessing.ipynb: mean constant-price cost per person by jurisdiction, 2022-23."""
+    df = read_sheet(inp[DATACUBE_FILE], "Datacube", skiprows=7)
+    df = df[(df["Year"] == YEAR) & df["Jurisdiction"].isin(STATE_MAP)]
+    summary = df.groupby("Jurisdiction")["Constant per person ($)"].mean().reset_index()
+    summary.columns = ["State", "Cost_per_person"]
+    summary["Cost_per_person"] = summary["Cost_per_person"].round(3)
+    summary.to_csv(out["headlthcare_costs_summary_by_state_2022_23.csv"], index=False)
+
+
+def pph_by_phn(inp: Dict[str, str], out: Dict[str, str]) -> None:
+    """data_preprocessing.ipynb: age-standardised PPH rate per PHN, all persons, 2022-23."""
+    df = read_sheet(inp[PPH_FILE], "Table 3", skiprows=1)
+    df = df[(df["Year"] == YEAR.replace("-", "–")) & (df["Demographic group"] == "All persons")]
+    df = df[["Year", "State", "PHN code", "PHN name", "Hospitalisations per 100,000 people (age-standardised)"]]
+    df.columns = ["Year", "State", "PHN_Code", "PHN_Name", "PPH_rate_per_100k"]
+    df = df[~df["State"].isin(["National", "Vic/NSW"])].dropna(subset=["State"]).copy()
+    df["State"] = df["State"].map(STATE_MAP)
+    rate = (df["PPH_rate_per_100k"].astype(str).str.strip().str.replace(",", "", regex=False)
+            .str.replace("n.p.", "", regex=False).str.replace("..", "", regex=False))
+    df["PPH_rate_per_100k"] = pd.to_numeric(rate, errors="coerce")
+    agg = (df.dropna(subset=["PPH_rate_per_100k"])
+           .groupby(["PHN_Code", "PHN_Name", "State"], as_index=False)["PPH_rate_per_100k"].mean())
+    agg["PPH_rate_per_100k"] = agg["PPH_rate_per_100k"].round(3)
+    agg.to_csv(out["pph_ppn_level_2022_23.csv"], index=False)
+
+
+def merge_cost_pph(inp: Dict[str, str], out: Dict[str, str]) -> None:
+    """cost_pph_merging.ipynb: state cost per person onto every PHN."""
+    state_map = {**STATE_MAP, **{v: v for v in STATE_MAP.values()}}
+    cost = read_csv(inp["headlthcare_costs_summary_by_state_2022_23.csv"])
+    pph = read_csv(inp["pph_ppn_level_2022_23.csv"])
+    cost["State"] = cost["State"].map(state_map)
+    pph["State"] = pph["State"].map(state_map)
+    pph.merge(cost, on="State", how="left").to_csv(out["merged_cost_pph.csv"], index=False)
+
+
+def seifa_phn(inp: Dict[str, str], out: Dict[str, str]) -> None:
+    """seifa_integrating.ipynb: population-weighted IRSD per PHN (seifa_aggregation)."""
+    conc = seifa_aggregation.Concordance.phn(inp[seifa_aggregation.PHN_FILE])
+    seifa = seifa_aggregation.load_seifa_sa2(inp[seifa_aggregation.SEIFA_FILE])
+    seifa_aggregation.aggregate(seifa, conc).to_csv(out["seifa_phn.csv"], index=False)
+
+
+def baseline_seifa(inp: Dict[str, str], out: Dict[str, str]) -> None:
+    """baseline_seifa_merging.ipynb: SEIFA onto the cost / PPH baseline (PHN205 dropped, inner join)."""
+    seifa = read_csv(inp["seifa_phn.csv"])
+    base = read_csv(inp["merged_cost_pph.csv"])
+    for df in (seifa, base):
+        df["PHN_Code"] = df["PHN_Code"].astype(str).str.strip()
+    seifa = seifa[seifa["PHN_Code"] != "PHN205"]
+    merged = base.merge(seifa[["PHN_Code", "SEIFA_IRSD_Score", "IRSD_Decile_Mean"]], on="PHN_Code", how="inner")
+    merged.to_csv(out[clustering.BASE_FILE], index=False)
+
+
+def scale_features(inp: Dict[str, str], out: Dict[str, str]) -> None:
+    """exploratory_data_analysis.ipynb: standard-scaled clustering features."""
+    from sklearn.preprocessing import StandardScaler
+
+    df = read_csv(inp[clustering.BASE_FILE])
+    raw = [c[: -len("_scaled")] for c in clustering.FEATURES]
+    scaled = pd.DataFrame(StandardScaler().fit_transform(df[raw]), columns=clustering.FEATURES, index=df.index)
+    pd.concat([df[clustering.ID_COLS], scaled], axis=1).to_csv(out[clustering.SCALED_FILE], index=False)
+
+
+def cluster(inp: Dict[str, str], out: Dict[str, str]) -> None:
+    """clustering_analysis.ipynb via clustering.py: k selection, final K-Means (k = 4) and profiles."""
+    out_dir = os.path.dirname(out["final_clustered_dataset.csv"])
+    clustering.main(["--data", inp[clustering.SCALED_FILE], "--base", inp[clustering.BASE_FILE],
+                     "--out-dir", out_dir, "--workers", "1"])
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable[[Dict[str, str], Dict[str, str]], None]
+    inputs: List[str]   # file names: produced by another stage, else looked up in raw-data/
+    outputs: List[str]  # file names written to preprocessed-data/
+
+
+STAGES = [
+    Stage("cost_by_state", cost_by_state, [DATACUBE_FILE], ["headlthcare_costs_summary_by_state_2022_23.csv"]),
+    Stage("pph_by_phn", pph_by_phn, [PPH_FILE], ["pph_ppn_level_2022_23.csv"]),
+    Stage("merge_cost_pph", merge_cost_pph,
+          ["headlthcare_costs_summary_by_state_2022_23.csv", "pph_ppn_level_2022_23.csv"], ["merged_cost_pph.csv"]),
+    Stage("seifa_phn", seifa_phn, [seifa_aggregation.SEIFA_FILE, seifa_aggregation.PHN_FILE], ["seifa_phn.csv"]),
+    Stage("baseline_seifa", baseline_seifa, ["seifa_phn.csv", "merged_cost_pph.csv"], [clustering.BASE_FILE]),
+    Stage("scale_features", scale_features, [clustering.BASE_FILE], [clustering.SCALED_FILE]),
+    Stage("cluster", cluster, [clustering.SCALED_FILE, clustering.BASE_FILE],
+          ["cluster_k_selection.csv", "final_clustered_dataset.csv", "cluster_profile_summary.csv",
+           "cluster_state_matrix.csv"]),
+]
+
+
+# ---------- runner ----------
+def _names(code) -> set:
+    """Global names a code object refers to, including those inside its comprehensions and lambdas."""
+    names = set(code.co_names)
+    for c in code.co_consts:
+        if inspect.iscode(c):
+            names |= _names(c)
+    return names
+
+
+def _local(obj) -> bool:
+    path = os.path.abspath(getattr(obj, "__file__", None) or inspect.getfile(obj))
+    return path.startswith(SHARED + os.sep)
+
+
+def code_hash(fn: Callable, _seen: Optional[set] = None) -> str:
+    """sha1 of a stage function plus everything it refers to: the local modules it calls into
+    (clustering.py, seifa_aggregation.py), the source of helper functions here and in the shared
+    modules (read_sheet, read_csv, ... and their own helpers), and the repr of module constants
+    (YEAR, STATE_MAP, DATACUBE_FILE, ...)."""
+    seen = set() if _seen is None else _seen
+    h = hashlib.sha1(inspect.getsource(fn).encode())
+    for name in sorted(_names(fn.__code__)):
+        obj = fn.__globals__.get(name)
+        if inspect.ismodule(obj):
+            if getattr(obj, "__file__", None) and _local(obj):
+                h.update(inspect.getsource(obj).encode())
+        elif inspect.isfunction(inspect.unwrap(obj) if callable(obj) else obj):
+            obj = inspect.unwrap(obj)
+            if obj not in seen and _local(obj):
+                seen.add(obj)
+                h.update(f"{name}:{code_hash(obj, seen)}".encode())
+        elif isinstance(obj, (str, int, float, bool, tuple, list, dict)):
+            h.update(f"{name}={obj!r}".encode())
+    return h.hexdigest()
+
+
+class Pipeline:
+    """Stages wired by file name; run() brings the output directory up to date."""
+
+    def __init__(self, stages: Sequence[Stage] = STAGES, raw_dir: str = RAW_DIR, data_dir: str = DATA_DIR,
+                 cache_dir: str = CACHE_DIR):
+        self.stages = {s.name: s for s in stages}
+        self.raw_dir, self.data_dir, self.cache_dir = raw_dir, data_dir, cache_dir
+        self.producer = {f: s.name for s in stages for f in s.outputs}
+        self.upstream = {s.name: {self.producer[f] for f in s.inputs if f in self.producer} for s in stages}
+        self._code = {s.name: code_hash(s.fn) for s in stages}
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.data_dir if name in self.producer else self.raw_dir, name)
+
+    def key(self, stage: Stage) -> Optional[str]:
+        """sha1 of the stage code and input contents; None when an input is missing."""
+        h = hashlib.sha1(f"{PIPELINE_VERSION}:{stage.name}:{self._code[stage.name]}".encode())
+        for f in stage.inputs:
+            p = self.path(f)
+            if not os.path.exists(p):
+                return None
+            h.update(f"{f}:{file_hash(p)}".encode())
+        return h.hexdigest()
+
+    def _current(self, stage: Stage, entry: str) -> bool:
+        return all(os.path.exists(self.path(f)) and file_hash(self.path(f)) == file_hash(os.path.join(entry, f))
+                   for f in stage.outputs)
+
+    def _restore(self, stage: Stage, entry: str) -> None:
+        for f in stage.outputs:
+            shutil.copyfile(os.path.join(entry, f), self.path(f))
+
+    def _execute(self, stage: Stage, key: str) -> str:
+        """Run the stage into a scratch dir, then publish it as the cache entry for key."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{stage.name}-")
+        try:
+            stage.fn({f: self.path(f) for f in stage.inputs}, {f: os.path.join(tmp, f) for f in stage.outputs})
+            missing = [f for f in stage.outputs if not os.path.exists(os.path.join(tmp, f))]
+            if missing:
+                raise RuntimeError(f"stage {stage.name} did not write {missing}")
+            entry = os.path.join(self.cache_dir, key)
+            if os.path.exists(entry):  # another process published it first
+                shutil.rmtree(tmp)
+            else:
+                os.replace(tmp, entry)
+            return entry
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def step(self, name: str, force: bool = False, dry_run: bool = False) -> str:
+        """Bring one stage's outputs up to date; returns what happened."""
+        stage = self.stages[name]
+        key = self.key(stage)
+        if key is None:
+            if all(os.path.exists(self.path(f)) for f in stage.outputs):
+                return "pinned"  # raw input not available here: keep the committed outputs
+            missing = [f for f in stage.inputs if not os.path.exists(self.path(f))]
+            raise FileNotFoundError(f"stage {name}: missing input(s) {missing}")
+        entry = os.path.join(self.cache_dir, key)
+        if os.path.isdir(entry) and not force:
+            if self._current(stage, entry):
+                return "up to date"
+            if not dry_run:
+                self._restore(stage, entry)
+            return "restored"
+        if dry_run:
+            return "would run"
+        if force and os.path.isdir(entry):
+            shutil.rmtree(entry)
+        self._restore(stage, self._execute(stage, key))
+        return "ran"
+
+    def run(self, force: Sequence[str] = (), workers: Optional[int] = None, dry_run: bool = False,
+            log: Callable[[str], None] = print) -> Dict[str, str]:
+        """
+        Every stage once its upstream stages are done; ready stages run concurrently. force names
+        stages to re-run even on a cache hit (their dependants re-key off the new outputs as usual).
+        """
+        status: Dict[str, str] = {}
+        pending = dict(self.upstream)
+        running = {}
+        with ThreadPoolExecutor(max_workers=workers or min(4, len(self.stages))) as pool:
+            while pending or running:
+                ready = [n for n, up in pending.items() if up <= set(status)]
+                for n in ready:
+                    del pending[n]
+                    t0 = time.perf_counter()
+                    fut = pool.submit(self.step, n, n in force, dry_run)
+                    running[fut] = (n, t0)
+                if not running:
+                    raise RuntimeError(f"unresolvable stages: {sorted(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    n, t0 = running.pop(fut)
+                    status[n] = fut.result()
+                    log(f"{n:<16} {status[n]:<11} {time.perf_counter() - t0:6.2f}s")
+        return status
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Run the regional equity preprocessing and clustering stages.")
+    p.add_argument("--force", nargs="+", default=[], metavar="STAGE",
+                   help="re-run these stages even when cached ('all' for every stage)")
+    p.add_argument("--dry-run", action="store_true", help="report what would run without running it")
+    p.add_argument("--workers", type=int, default=None, help="stages run at once")
+    p.add_argument("--list", action="store_true", help="print the stage graph and exit")
+    args = p.parse_args(argv)
+
+    pipe = Pipeline()
+    if args.list:
+        for s in pipe.stages.values():
+            print(f"{s.name:<16} <- {', '.join(sorted(pipe.upstream[s.name])) or '(raw)'}: {', '.join(s.outputs)}")
+        return
+    force = list(pipe.stages) if args.force == ["all"] else args.force
+    unknown = set(force) - set(pipe.stages)
+    if unknown:
+        p.error(f"unknown stage(s) {sorted(unknown)}; expected {list(pipe.stages)}")
+
+    t0 = time.perf_counter()
+    status = pipe.run(force, args.workers, args.dry_run)
+    counts = pd.Series(status).value_counts()
+    print(f"{len(status)} stages in {time.perf_counter() - t0:.2f}s: "
+          + ", ".join(f"{n} {s}" for s, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
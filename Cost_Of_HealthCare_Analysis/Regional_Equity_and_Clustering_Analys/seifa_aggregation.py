@@ -0,0 +1,179 @@
+# seifa_aggregation.py — SA2 SEIFA scores rolled up to PHN (or any other geography) as sparse matrix products
+#
+# A concordance (SA2 -> target region, with the share of each SA2's population in the target)
+# is turned once into a sparse target × SA2 weight matrix W. Every SEIFA index is then
+# aggregated in the same product:
+#
+#   population  = W @ pop
+#   score       = W @ (score * pop) / W @ pop        (population-weighted mean)
+#   decile mean = B @ decile / B @ 1[decile known]   (plain mean over mapped SA2s, B = 0/1 incidence)
+#
+# which is the merge / groupby in Notebooks/Preprocessing/seifa_integrating.ipynb, but re-running
+# it for another index or concordance edition is a single sparse multiply.
+#
+#   python seifa_aggregation.py                           # -> Data/preprocessed-data/seifa_phn.csv (IRSD)
+#   python seifa_aggregation.py --indexes all --out Data/preprocessed-data/seifa_phn_all.csv
+#   python seifa_aggregation.py --concordance CG_SA2_2021_LGA_2021.xlsx --to-col LGA_CODE_2021 \
+#       --name-col LGA_NAME_2021 --prefix LGA --out seifa_lga.csv
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RAW_DIR = os.path.join(ROOT, "Data", "raw-data")
+OUT_DIR = os.path.join(ROOT, "Data", "preprocessed-data")
+SEIFA_FILE = "Statistical_Area_Level 2_Indexes_SEIFA_2021.xlsx"
+PHN_FILE = "primary-health-networks-phn-2023-statistical-area-level-2-2021.xlsx"
+
+# SEIFA Table 1 lists the four indexes left to right as Score / Decile pairs
+INDEXES = ["IRSD", "IRSAD", "IER", "IEO"]
+
+# Cost_Of_HealthCare_Analysis/ on sys.path for the shared modules (pattern documented in data_catalog.py)
+sys.path.append(next(str(p) for p in Path(__file__).resolve().parents if (p / "data_catalog.py").exists()))
+from excel_cache import read_sheet  # noqa: E402
+
+
+# ---------- inputs ----------
+def load_seifa_sa2(path: Optional[str] = None) -> pd.DataFrame:
+    """SA2_CODE, {index}_score, {index}_decile for every index, Usual_Resident_Population (SEIFA 2021 Table 1)."""
+    raw = read_sheet(path or os.path.join(RAW_DIR, SEIFA_FILE), "Table 1", skiprows=5, dtype=str)
+    out = pd.DataFrame({"SA2_CODE": raw.iloc[:, 0].str.strip()})
+    for i, idx in enumerate(INDEXES):
+        sfx = f".{i}" if i else ""
+        out[f"{idx}_score"] = pd.to_numeric(raw[f"Score{sfx}"], errors="coerce")
+        out[f"{idx}_decile"] = pd.to_numeric(raw[f"Decile{sfx}"], errors="coerce")
+    out["Usual_Resident_Population"] = pd.to_numeric(raw["Usual Resident Population"], errors="coerce")
+    # drop the footer rows (blank line, copyright notice)
+    return out[out["SA2_CODE"].str.fullmatch(r"\d+", na=False)].reset_index(drop=True)
+
+
+def load_phn_concordance(path: Optional[str] = None) -> pd.DataFrame:
+    """SA2_CODE, PHN_Code, PHN_Name, Ratio from the ABS SA2 2021 -> PHN 2023 correspondence."""
+    raw = read_sheet(path or os.path.join(RAW_DIR, PHN_FILE), "CG_SA2_2021_PHN_2017_All", dtype=str)
+    df = raw.rename(columns={"SA2_CODE_2021": "SA2_CODE", "PHN_CODE_2023": "PHN_Code",
+                             "PHN_NAME_2023": "PHN_Name", "RATIO_FROM_TO": "Ratio"})
+    df = df[["SA2_CODE", "PHN_Code", "PHN_Name", "Ratio"]].copy()
+    for c in ["SA2_CODE", "PHN_Code", "PHN_Name"]:
+        df[c] = df[c].str.strip()
+    df["Ratio"] = pd.to_numeric(df["Ratio"], errors="coerce")
+    return df
+
+
+# ---------- concordance ----------
+class Concordance:
+    """Sparse target × source weights (W: population ratios, B: 0/1 incidence) for one correspondence file."""
+
+    def __init__(self, mapping: pd.DataFrame, from_col: str, to_col: str, ratio_col: Optional[str] = None,
+                 name_col: Optional[str] = None):
+        m = mapping.dropna(subset=[from_col, to_col])
+        self.sources = pd.Index(pd.unique(m[from_col]))
+        codes = m[[to_col] + ([name_col] if name_col else [])].drop_duplicates(to_col).sort_values(to_col)
+        self.targets = pd.Index(codes[to_col])
+        self.names = codes[name_col].tolist() if name_col else None
+
+        rows = self.targets.get_indexer(m[to_col])
+        cols = self.sources.get_indexer(m[from_col])
+        ratio = m[ratio_col].to_numpy(dtype=float) if ratio_col else np.ones(len(m))
+        shape = (len(self.targets), len(self.sources))
+        # duplicate (target, source) rows are summed, as the groupby did
+        self.W = sparse.csr_matrix((np.nan_to_num(ratio), (rows, cols)), shape=shape)
+        self.B = sparse.csr_matrix((np.ones(len(m)), (rows, cols)), shape=shape)
+
+    @classmethod
+    def phn(cls, path: Optional[str] = None) -> "Concordance":
+        return cls(load_phn_concordance(path), "SA2_CODE", "PHN_Code", "Ratio", "PHN_Name")
+
+    def align(self, df: pd.DataFrame, key: str, columns: Sequence[str]) -> np.ndarray:
+        """Source-ordered (n_sources × len(columns)) matrix; sources missing from df are NaN."""
+        pos = pd.Index(df[key]).get_indexer(self.sources)
+        X = df[list(columns)].to_numpy(dtype=float)
+        out = np.full((len(self.sources), len(columns)), np.nan)
+        out[pos >= 0] = X[pos[pos >= 0]]
+        return out
+
+
+# ---------- aggregation ----------
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den > 0, num / np.where(den > 0, den, 1), np.nan)
+
+
+def aggregate(seifa: pd.DataFrame, conc: Concordance, indexes: Optional[List[str]] = None,
+              prefix: str = "PHN", pop_col: str = "Usual_Resident_Population", key: str = "SA2_CODE",
+              decimals: Optional[int] = 3) -> pd.DataFrame:
+    """
+    One row per target region: {prefix}_Code, {prefix}_Name, SEIFA_{index}_Score, {index}_Decile_Mean
+    for each index, {prefix}_Population. With prefix="PHN" and indexes=["IRSD"] this is seifa_phn.csv.
+    """
+    indexes = indexes or ["IRSD"]
+    scores = [f"{i}_score" for i in indexes]
+    deciles = [f"{i}_decile" for i in indexes]
+    X = conc.align(seifa, key, [pop_col] + scores + deciles)
+    pop, S, D = X[:, :1], X[:, 1:1 + len(indexes)], X[:, 1 + len(indexes):]
+
+    pop0 = np.nan_to_num(pop)
+    known = ~np.isnan(D)
+    # one sparse product for the weighted sums of every index, one for the decile means
+    weighted = conc.W @ np.hstack([pop0, np.where(np.isnan(S), 0.0, S * pop0)])
+    counted = conc.B @ np.hstack([np.where(known, D, 0.0), known.astype(float)])
+
+    target_pop = weighted[:, 0]
+    out = pd.DataFrame({f"{prefix}_Code": conc.targets})
+    if conc.names is not None:
+        out[f"{prefix}_Name"] = conc.names
+    for j, idx in enumerate(indexes):
+        out[f"SEIFA_{idx}_Score"] = _ratio(weighted[:, 1 + j], target_pop)
+        out[f"{idx}_Decile_Mean"] = _ratio(counted[:, j], counted[:, len(indexes) + j])
+    if decimals is not None:
+        value_cols = out.columns[1 + (conc.names is not None):]
+        out[value_cols] = out[value_cols].round(decimals)
+    out[f"{prefix}_Population"] = np.round(target_pop).astype(int)
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Population-weighted SEIFA for PHNs (or any SA2 concordance).")
+    p.add_argument("--indexes", nargs="+", default=["IRSD"], help=f"subset of {INDEXES}, or 'all'")
+    p.add_argument("--seifa", default=None, help=f"SEIFA SA2 workbook (default: Data/raw-data/{SEIFA_FILE})")
+    p.add_argument("--concordance", default=None, help="SA2 correspondence workbook (default: the PHN 2023 file)")
+    p.add_argument("--sheet", default=0, help="correspondence sheet (name or position)")
+    p.add_argument("--from-col", default="SA2_CODE_2021")
+    p.add_argument("--to-col", default=None)
+    p.add_argument("--name-col", default=None)
+    p.add_argument("--ratio-col", default="RATIO_FROM_TO")
+    p.add_argument("--prefix", default="PHN", help="output column prefix, e.g. LGA or RA")
+    p.add_argument("--out", default=None, help="output CSV (default: Data/preprocessed-data/seifa_phn.csv)")
+    args = p.parse_args(argv)
+
+    indexes = INDEXES if args.indexes == ["all"] else args.indexes
+    unknown = set(indexes) - set(INDEXES)
+    if unknown:
+        p.error(f"unknown index(es) {sorted(unknown)}; expected {INDEXES}")
+
+    if args.concordance:
+        if not args.to_col:
+            p.error("--to-col is required with --concordance")
+        sheet = int(args.sheet) if str(args.sheet).isdigit() else args.sheet
+        m = read_sheet(args.concordance, sheet, dtype=str)
+        m = m.apply(lambda c: c.str.strip() if pd.api.types.is_string_dtype(c) else c)
+        ratio = args.ratio_col if args.ratio_col in m.columns else None  # no ratio column: whole SA2s
+        if ratio:
+            m[ratio] = pd.to_numeric(m[ratio], errors="coerce")
+        conc = Concordance(m, args.from_col, args.to_col, ratio, args.name_col)
+    else:
+        conc = Concordance.phn()
+
+    res = aggregate(load_seifa_sa2(args.seifa), conc, indexes, prefix=args.prefix)
+    out = args.out or os.path.join(OUT_DIR, "seifa_phn.csv")
+    res.to_csv(out, index=False)
+    print(f"{len(res)} {args.prefix} regions × {len(indexes)} index(es) from {len(conc.sources)} SA2s -> {out}")
+
+
+if __name__ == "__main__":
+    main()
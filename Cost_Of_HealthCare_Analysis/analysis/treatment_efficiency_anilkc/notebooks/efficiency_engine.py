@@ -0,0 +1,440 @@
+# efficiency_engine.py — state treatment-efficiency rankings, trends and heatmaps from running array sums
+#
+# treatment_efficiency.ipynb rebuilds every summary from the full long table (groupby / pivot_table)
+# each time it runs. Here both of its data shapes are kept as dense (key, key, year) arrays of
+# running sums and counts (YearCube), so a new year of data is one bincount over the new rows:
+#
+#   * CostOutcome    — record level (treatment_name, state, year, cost, outcome_score):
+#                      avg_cost / avg_outcome / n_cases / cost_per_outcome per treatment × state × year,
+#                      the state summary, rankings, year-over-year trends and state × year heatmaps.
+#   * EfficiencyIndex — measure level (geo, year, measure_name, value, lower_better):
+#                      each measure min-max scaled across states within a year (inverted when lower is
+#                      better) and averaged into the composite index. Scores depend only on their own
+#                      year, so appending a year rescores that year alone.
+#
+#   python efficiency_engine.py                       # -> processed_data/state_efficiency_{all_years,latest}.csv
+#   python efficiency_engine.py --benchmark 2000000   # synthetic per-hospital, per-procedure rows
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = os.path.join(ROOT, "processed_data")
+
+# the notebook also treats these names as "lower is better" when the flag is missing
+LOWER_BETTER_RE = re.compile(r"wait|time|cancel|readmission", re.I)
+
+# Cost_Of_HealthCare_Analysis/ on sys.path for the shared modules (pattern documented in data_catalog.py)
+sys.path.append(next(str(p) for p in Path(__file__).resolve().parents if (p / "data_catalog.py").exists()))
+from data_catalog import load  # noqa: E402
+
+
+# ---------- storage ----------
+class YearCube:
+    """Running sums (one per value column) and row counts over (key_1, ..., key_n, year) in dense arrays."""
+
+    def __init__(self, keys: Sequence[str], values: Sequence[str], year: str = "year", year_capacity: int = 16):
+        self.keys = list(keys)
+        self.value_cols = list(values)
+        self.year = year
+        self.labels: List[List] = [[] for _ in self.keys]
+        self._pos: List[Dict] = [{} for _ in self.keys]
+        self.first_year: Optional[int] = None
+        self.n_years = 0
+        self._sum = np.zeros((len(self.value_cols),) + (0,) * len(self.keys) + (year_capacity,))
+        self._count = np.zeros((0,) * len(self.keys) + (year_capacity,), dtype=np.int64)
+
+    @property
+    def years(self) -> np.ndarray:
+        return np.arange(self.n_years) + (self.first_year or 0)
+
+    def _codes(self, values: pd.Series, axis: int) -> np.ndarray:
+        codes, uniques = pd.factorize(values)
+        pos, names = self._pos[axis], self.labels[axis]
+        for v in uniques:
+            if v not in pos:
+                pos[v] = len(names)
+                names.append(v)
+        return np.array([pos[v] for v in uniques], dtype=np.intp)[codes]
+
+    def _grow(self, n_years: int, shift: int = 0):
+        """Resize to the current key counts (doubling the year capacity); `shift` moves history right."""
+        cap = self._count.shape[-1]
+        if n_years + shift > cap:
+            cap = max(cap * 2, n_years + shift)
+        shape = tuple(len(l) for l in self.labels) + (cap,)
+        if shape == self._count.shape and not shift:
+            return
+        old = tuple(slice(0, n) for n in self._count.shape[:-1]) + (slice(shift, shift + self.n_years),)
+        new_sum = np.zeros((len(self.value_cols),) + shape)
+        new_count = np.zeros(shape, dtype=np.int64)
+        new_sum[(slice(None),) + old] = self._sum[..., :self.n_years]
+        new_count[old] = self._count[..., :self.n_years]
+        self._sum, self._count = new_sum, new_count
+
+    def append(self, df: pd.DataFrame) -> Tuple[int, int]:
+        """Add long rows; returns the (start, stop) year slots that changed."""
+        df = df.dropna(subset=self.keys + [self.year] + self.value_cols)
+        if df.empty:
+            return 0, 0
+        years = df[self.year].to_numpy(dtype=float).astype(int)
+        lo, hi = int(years.min()), int(years.max())
+        shift = 0
+        if self.first_year is None:
+            self.first_year = lo
+        elif lo < self.first_year:
+            shift, self.first_year = self.first_year - lo, lo
+
+        codes = [self._codes(df[k], i) for i, k in enumerate(self.keys)]
+        n_years = max(self.n_years + shift, hi - self.first_year + 1)
+        self._grow(n_years, shift)
+        self.n_years = n_years
+
+        # scatter into the touched year window only
+        y_idx = years - self.first_year
+        w0, w1 = (0, self.n_years) if shift else (int(y_idx.min()), int(y_idx.max()) + 1)
+        shape = tuple(len(l) for l in self.labels) + (w1 - w0,)
+        flat = np.ravel_multi_index(codes + [y_idx - w0], shape)
+        size = int(np.prod(shape))
+        self._count[..., w0:w1] += np.bincount(flat, minlength=size).reshape(shape)
+        for i, col in enumerate(self.value_cols):
+            self._sum[i][..., w0:w1] += np.bincount(flat, df[col].to_numpy(dtype=float), size).reshape(shape)
+        return w0, w1
+
+    def sums(self, start: int = 0, stop: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        stop = self.n_years if stop is None else stop
+        return self._sum[..., start:stop], self._count[..., start:stop]
+
+    def means(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """(value, key_1, ..., key_n, year) means; NaN where a cell has no rows."""
+        s, c = self.sums(start, stop)
+        return _ratio(s, c)
+
+    def order(self, axis: int) -> np.ndarray:
+        """Positions of the labels on one key axis in sorted order (groupby's output order)."""
+        return np.argsort(np.array(self.labels[axis], dtype=object), kind="stable")
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den > 0, num / np.where(den > 0, den, 1), np.nan)
+
+
+def _yoy(a: np.ndarray) -> np.ndarray:
+    """Change from the previous calendar year along the last axis (NaN for the first year or a gap)."""
+    out = np.full(a.shape, np.nan)
+    out[..., 1:] = a[..., 1:] - a[..., :-1]
+    return out
+
+
+def _first_valid(a: np.ndarray) -> np.ndarray:
+    """Per row of the last axis, the earliest non-NaN value (NaN if none)."""
+    ok = ~np.isnan(a)
+    first = np.take_along_axis(a, ok.argmax(axis=-1)[..., None], axis=-1)[..., 0]
+    return np.where(ok.any(axis=-1), first, np.nan)
+
+
+# ---------- record level ----------
+class CostOutcome:
+    """cost_per_outcome for every treatment × state × year, from per-case (or per-hospital) rows."""
+
+    def __init__(self, treatment: str = "treatment_name", state: str = "state", year: str = "year",
+                 cost: str = "cost", outcome: str = "outcome_score"):
+        self.cols = (treatment, state, year)
+        self.cube = YearCube([treatment, state], [cost, outcome], year)
+
+    @classmethod
+    def from_records(cls, df: pd.DataFrame, **cols) -> "CostOutcome":
+        out = cls(**cols)
+        out.append(df)
+        return out
+
+    def append(self, df: pd.DataFrame) -> "CostOutcome":
+        """Add rows (typically a new year); cells for years already present are averaged in."""
+        self.cube.append(df)
+        return self
+
+    def _cells(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        (s_cost, s_out), n = self.cube.sums()
+        return _ratio(s_cost, n), _ratio(s_out, n), n
+
+    def table(self) -> pd.DataFrame:
+        """The notebook's agg: treatment_name, state, year, avg_cost, avg_outcome, n_cases, cost_per_outcome."""
+        avg_cost, avg_out, n = self._cells()
+        t_order, s_order = self.cube.order(0), self.cube.order(1)
+        ti, si, yi = np.nonzero(n[np.ix_(t_order, s_order)] > 0)
+        ti, si = t_order[ti], s_order[si]
+        treatment, state, year = self.cols
+        out = pd.DataFrame({
+            treatment: np.array(self.cube.labels[0], dtype=object)[ti],
+            state: np.array(self.cube.labels[1], dtype=object)[si],
+            year: self.cube.years[yi],
+            "avg_cost": avg_cost[ti, si, yi],
+            "avg_outcome": avg_out[ti, si, yi],
+            "n_cases": n[ti, si, yi],
+        })
+        out["cost_per_outcome"] = out["avg_cost"] / out["avg_outcome"]
+        return out
+
+    def rankings(self) -> pd.DataFrame:
+        """table() with rank of each state within its treatment × year (1 = lowest cost_per_outcome)."""
+        out = self.table()
+        treatment, _, year = self.cols
+        out["rank"] = out.groupby([treatment, year])["cost_per_outcome"].rank(method="min").astype(int)
+        return out
+
+    def state_summary(self) -> pd.DataFrame:
+        """The notebook's state_summary: means of the treatment × year cells, total cases, 95% band."""
+        avg_cost, avg_out, n = self._cells()
+        cells = (n > 0).sum(axis=(0, 2))
+        s_order = self.cube.order(1)
+        out = pd.DataFrame({
+            self.cols[1]: np.array(self.cube.labels[1], dtype=object),
+            "avg_cost": _ratio(np.nansum(avg_cost, axis=(0, 2)), cells),
+            "avg_outcome": _ratio(np.nansum(avg_out, axis=(0, 2)), cells),
+            "total_cases": n.sum(axis=(0, 2)),
+        }).iloc[s_order].reset_index(drop=True)
+        out["cost_per_outcome"] = out["avg_cost"] / out["avg_outcome"]
+        out["se_outcome"] = 0.09 / np.sqrt(out["total_cases"])
+        out["lo_outcome"] = out["avg_outcome"] - 1.96 * out["se_outcome"]
+        out["hi_outcome"] = out["avg_outcome"] + 1.96 * out["se_outcome"]
+        return out
+
+    def trends(self) -> pd.DataFrame:
+        """table() plus yoy_change / yoy_pct in cost_per_outcome against the previous calendar year."""
+        avg_cost, avg_out, n = self._cells()
+        cpo = _ratio(avg_cost, avg_out)
+        yoy = _yoy(cpo)
+        out = self.table()
+        t = pd.Index(self.cube.labels[0]).get_indexer(out[self.cols[0]])
+        s = pd.Index(self.cube.labels[1]).get_indexer(out[self.cols[1]])
+        y = out[self.cols[2]].to_numpy() - self.cube.first_year
+        out["yoy_change"] = yoy[t, s, y]
+        prev = np.where(y > 0, cpo[t, s, np.maximum(y - 1, 0)], np.nan)
+        out["yoy_pct"] = 100 * out["yoy_change"] / prev
+        return out
+
+    def heatmap(self, treatment: Optional[str] = None) -> pd.DataFrame:
+        """state × year cost_per_outcome for one treatment, or pooled over every treatment's cases."""
+        (s_cost, s_out), n = self.cube.sums()
+        if treatment is None:
+            s_cost, s_out, n = s_cost.sum(axis=0), s_out.sum(axis=0), n.sum(axis=0)
+        else:
+            i = self.cube._pos[0][treatment]
+            s_cost, s_out, n = s_cost[i], s_out[i], n[i]
+        m = _ratio(_ratio(s_cost, n), _ratio(s_out, n))
+        order = self.cube.order(1)
+        return pd.DataFrame(m[order], index=pd.Index(np.array(self.cube.labels[1], dtype=object)[order],
+                                                     name=self.cols[1]),
+                            columns=pd.Index(self.cube.years, name=self.cols[2]))
+
+
+# ---------- measure level ----------
+class EfficiencyIndex:
+    """Composite efficiency index per geo × year from AIHW-style measure rows."""
+
+    def __init__(self, geo: str = "geo", year: str = "year", measure: str = "measure_name", value: str = "value"):
+        self.cols = (geo, year, measure, value)
+        self.cube = YearCube([geo, measure], [value], year)
+        self.lower_better: Dict[str, bool] = {}
+        self._scores = np.zeros((0, 0, 0))
+
+    @classmethod
+    def from_long(cls, df: pd.DataFrame, **cols) -> "EfficiencyIndex":
+        out = cls(**cols)
+        out.append(df)
+        return out
+
+    def append(self, df: pd.DataFrame) -> "EfficiencyIndex":
+        """Add measure rows (typically a new year); only the years they touch are rescored."""
+        measure = self.cols[2]
+        flags = (df.groupby(measure)["lower_better"].first() if "lower_better" in df
+                 else pd.Series(False, index=pd.unique(df[measure])))
+        for name, flag in flags.items():
+            self.lower_better.setdefault(name, bool(flag) or bool(LOWER_BETTER_RE.search(str(name))))
+        w0, w1 = self.cube.append(df)
+        if w1 > w0:
+            self._rescore(w0, w1)
+        return self
+
+    def _rescore(self, start: int, stop: int):
+        # new keys / years start as NaN; a backfilled earlier year makes the cube return every slot
+        shape = self.cube._count.shape
+        if self._scores.shape != shape:
+            grown = np.full(shape, np.nan)
+            g, m, y = self._scores.shape
+            grown[:g, :m, :y] = self._scores
+            self._scores = grown
+        v = self.cube.means(start, stop)[0]  # (geo, measure, year)
+        lo, hi = np.fmin.reduce(v, axis=0), np.fmax.reduce(v, axis=0)
+        span = hi - lo
+        with np.errstate(invalid="ignore", divide="ignore"):
+            s = np.where(span > 0, (v - lo) / np.where(span > 0, span, 1), 0.5)
+        s = np.where(np.isnan(v), np.nan, s)
+        flip = np.array([self.lower_better.get(m, False) for m in self.cube.labels[1]], dtype=bool)
+        s[:, flip] = 1 - s[:, flip]
+        self._scores[..., start:stop] = s
+
+    def scores(self) -> np.ndarray:
+        """(geo, measure, year) normalised scores, 1 = best state for that measure and year."""
+        return self._scores[..., :self.cube.n_years]
+
+    def _index(self) -> Tuple[np.ndarray, np.ndarray]:
+        s = self.scores()
+        known = ~np.isnan(s)
+        count = known.sum(axis=1)
+        return _ratio(np.where(known, s, 0.0).sum(axis=1), count), count
+
+    def table(self) -> pd.DataFrame:
+        """geo, year, efficiency_index, measures (state_efficiency_all_years.csv)."""
+        idx, count = self._index()
+        order = self.cube.order(0)
+        gi, yi = np.nonzero(count[order] > 0)
+        gi = order[gi]
+        geo, year = self.cols[:2]
+        return pd.DataFrame({geo: np.array(self.cube.labels[0], dtype=object)[gi], year: self.cube.years[yi],
+                             "efficiency_index": idx[gi, yi], "measures": count[gi, yi]})
+
+    def latest(self) -> pd.DataFrame:
+        """The latest year's rows, best first (state_efficiency_latest.csv)."""
+        t = self.table()
+        year = self.cols[1]
+        return (t[t[year] == t[year].max()].sort_values("efficiency_index", ascending=False, kind="stable")
+                .reset_index(drop=True))
+
+    def rankings(self) -> pd.DataFrame:
+        """table() with rank within each year (1 = most efficient), sorted year then rank."""
+        t = self.table()
+        year = self.cols[1]
+        t["rank"] = t.groupby(year)["efficiency_index"].rank(ascending=False, method="min").astype(int)
+        return t.sort_values([year, "rank"], kind="stable").reset_index(drop=True)
+
+    def trends(self) -> pd.DataFrame:
+        """table() plus change from the previous calendar year and from the state's first year."""
+        idx, count = self._index()
+        yoy = _yoy(idx)
+        since = idx - _first_valid(idx)[:, None]
+        t = self.table()
+        g = pd.Index(self.cube.labels[0]).get_indexer(t[self.cols[0]])
+        y = t[self.cols[1]].to_numpy() - self.cube.first_year
+        t["yoy_change"] = yoy[g, y]
+        t["change_since_first"] = since[g, y]
+        return t
+
+    def heatmap(self, kind: str = "index") -> pd.DataFrame:
+        """
+        geo × year matrix. kind="index": the efficiency index; kind="value": the notebook's
+        performance_heatmap (mean raw value over every measure row, min-max scaled over the whole grid).
+        """
+        if kind == "index":
+            m = self._index()[0]
+        elif kind == "value":
+            (s,), n = self.cube.sums()
+            m = _ratio(s.sum(axis=1), n.sum(axis=1))
+            lo, hi = np.nanmin(m), np.nanmax(m)
+            m = (m - lo) / (hi - lo)
+        else:
+            raise ValueError(f"kind must be 'index' or 'value', not {kind!r}")
+        order = self.cube.order(0)
+        return pd.DataFrame(m[order], index=pd.Index(np.array(self.cube.labels[0], dtype=object)[order],
+                                                     name=self.cols[0]),
+                            columns=pd.Index(self.cube.years, name=self.cols[1]))
+
+    def measure_scores(self) -> pd.DataFrame:
+        """Long geo, year, measure_name, score (the per-measure heatmap / contribution input)."""
+        s = self.scores()
+        gi, mi, yi = np.nonzero(~np.isnan(s))
+        geo, year, measure, _ = self.cols
+        return pd.DataFrame({geo: np.array(self.cube.labels[0], dtype=object)[gi],
+                             year: self.cube.years[yi],
+                             measure: np.array(self.cube.labels[1], dtype=object)[mi],
+                             "score": s[gi, mi, yi]})
+
+
+# ---------- benchmark ----------
+def synthetic_records(n_rows: int, n_years: int = 10, n_procedures: int = 60, seed: int = 77) -> pd.DataFrame:
+    """Per-hospital, per-procedure rows shaped like the notebook's big table (plus a hospital column)."""
+    rng = np.random.default_rng(seed)
+    states = np.array(["NSW", "VIC", "QLD", "WA", "SA", "TAS", "ACT", "NT"])
+    procedures = np.array([f"Procedure {i:03d}" for i in range(n_procedures)])
+    n_hosp = max(8, n_rows // (n_years * n_procedures * 4))
+    hosp = rng.integers(0, n_hosp, n_rows)
+    return pd.DataFrame({
+        "treatment_name": procedures[rng.integers(0, n_procedures, n_rows)],
+        "state": states[hosp % len(states)],
+        "hospital": hosp,
+        "year": 2015 + rng.integers(0, n_years, n_rows),
+        "cost": rng.integers(12000, 50000, n_rows).astype(float),
+        "outcome_score": rng.uniform(0.5, 0.99, n_rows),
+    })
+
+
+def benchmark(n_rows: int) -> pd.DataFrame:
+    """Seconds for the groupby the notebook runs vs. building the cube, and for adding the last year."""
+    df = synthetic_records(n_rows)
+    last = df["year"].max()
+    old, new = df[df["year"] < last], df[df["year"] == last]
+    keys = ["treatment_name", "state", "year"]
+
+    def groupby(frame):
+        agg = frame.groupby(keys, as_index=False).agg(avg_cost=("cost", "mean"), avg_outcome=("outcome_score", "mean"),
+                                                      n_cases=("outcome_score", "count"))
+        agg["cost_per_outcome"] = agg["avg_cost"] / agg["avg_outcome"]
+        return agg
+
+    rows, timings = [], {}
+    for name, fn in [("pandas groupby, all years", lambda: groupby(df)),
+                     ("pandas groupby, after new year", lambda: groupby(pd.concat([old, new]))),
+                     ("cube build, all years", lambda: CostOutcome.from_records(df)),
+                     ("cube build, years before last", lambda: CostOutcome.from_records(old))]:
+        t0 = time.perf_counter()
+        timings[name] = fn()
+        rows.append({"step": name, "seconds": time.perf_counter() - t0})
+    cube = timings["cube build, years before last"]
+    t0 = time.perf_counter()
+    cube.append(new)
+    table = cube.table()
+    rows.append({"step": "cube append new year + table()", "seconds": time.perf_counter() - t0})
+
+    ref = timings["pandas groupby, all years"]
+    assert len(ref) == len(table) and np.allclose(ref["cost_per_outcome"], table["cost_per_outcome"])
+    out = pd.DataFrame(rows)
+    out["rows"] = n_rows
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="State treatment-efficiency index, rankings and trends.")
+    p.add_argument("--data", default=None, help="long AIHW measure CSV (default: catalogued aihw_treatment)")
+    p.add_argument("--out-dir", default=OUT_DIR)
+    p.add_argument("--benchmark", type=int, default=None, metavar="ROWS",
+                   help="time the record-level engine on this many synthetic rows instead")
+    args = p.parse_args(argv)
+
+    if args.benchmark:
+        print(benchmark(args.benchmark).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+        return
+
+    # geo as the catalogue's State categorical, year as int
+    eff = EfficiencyIndex.from_long(load("aihw_treatment", args.data))
+    os.makedirs(args.out_dir, exist_ok=True)
+    eff.table().to_csv(os.path.join(args.out_dir, "state_efficiency_all_years.csv"), index=False)
+    latest = eff.latest()
+    latest.to_csv(os.path.join(args.out_dir, "state_efficiency_latest.csv"), index=False)
+    trends = eff.trends()
+    print(latest.to_string(index=False))
+    print(trends[trends["year"] == trends["year"].max()][["geo", "yoy_change", "change_since_first"]]
+          .sort_values("change_since_first", ascending=False).to_string(index=False))
+    print(f"{len(eff.cube.labels[0])} states × {eff.cube.n_years} years × {len(eff.cube.labels[1])} measures "
+          f"-> {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+# data_catalog.py — one catalogue of the Cost_Of_HealthCare_Analysis datasets behind a shared, size-bounded cache
+#
+# Every study used to read its own copy of its inputs with hand-written relative paths. Here each
+# dataset is listed once (path, expected columns, which columns hold State / PHN / year, where it
+# came from), and all reads go through one process-wide LRU cache:
+#
+#   * entries are keyed on the file's path, size and mtime, so an edited file is read again,
+#   * the cache is bounded by the frames' deep memory usage (COST_DATA_CACHE_MB, default 512);
+#     least recently used frames are dropped first,
+#   * .xlsx sheets go through excel_cache (columnar copies of the workbooks) before landing here.
+#
+# read() / read_csv() return the file as pandas reads it; load() adds the typed view: State and PHN
+# columns as categoricals with one spelling (NSW ... NT, AUS; PHN101 ...), year columns as integers.
+# Under copy-on-write (always on from pandas 3, opt-in on 2.x) returned frames share memory with the
+# cache and edits never reach it; without it they are deep copies. load() parses the file itself
+# rather than through read(), so a typed dataset is held once, not as a raw and a typed frame.
+#
+#   python data_catalog.py            # list the catalogue, check files and columns
+#   python data_catalog.py --warm     # load everything and print cache usage
+#
+#   from data_catalog import load
+#   t8 = load("oop_table8")           # State categorical, Year int
+#
+# Study scripts sit in subfolders of different depths; all of them put this folder on sys.path with
+# the same line, which walks up from the script to the directory holding data_catalog.py:
+#
+#   sys.path.append(next(str(p) for p in Path(__file__).resolve().parents if (p / "data_catalog.py").exists()))
+#   from data_catalog import load  # noqa: E402
+import argparse
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_MB = int(os.environ.get("COST_DATA_CACHE_MB", "512"))
+
+STATES = ["NSW", "VIC", "QLD", "WA", "SA", "TAS", "ACT", "NT", "AUS"]
+_STATE_ALIASES = {
+    "new south wales": "NSW", "victoria": "VIC", "queensland": "QLD", "western australia": "WA",
+    "south australia": "SA", "tasmania": "TAS", "australian capital territory": "ACT",
+    "northern territory": "NT", "australia": "AUS", "aust": "AUS", "national": "AUS", "total": "AUS",
+}
+
+
+class Dataset(NamedTuple):
+    path: str                       # relative to Cost_Of_HealthCare_Analysis/
+    description: str
+    source: str
+    columns: Tuple[str, ...] = ()   # expected columns (checked by the CLI)
+    state: Optional[str] = None     # column roles for load()
+    phn: Optional[str] = None
+    year: Optional[str] = None
+    sheet: object = None            # .xlsx only
+    skiprows: int = 0
+    dtype: object = None
+
+
+_OOP = "out-of-pocket burden analysis/data"
+_REG = "Regional_Equity_and_Clustering_Analys/Data"
+_TEMP = "temporal_trends_and_cost_growth_analysis/Data"
+_EFF = "analysis/treatment_efficiency_anilkc/notebooks"
+_PHN_COLS = ("PHN_Code", "PHN_Name", "State")
+
+CATALOG: Dict[str, Dataset] = {
+    # out-of-pocket burden
+    "oop_table8": Dataset(f"{_OOP}/Table8_GP_Out_of_Pocket_Clean_YearFixed (1).csv",
+                          "GP out-of-pocket cost by state and SEIFA quintile", "AIHW MBS Table 8",
+                          ("Year", "State", "SEIFA_Quintile", "Actual", "Adjusted"), state="State", year="Year"),
+    "oop_table9": Dataset(f"{_OOP}/Table9_Remoteness_Out_of_Pocket_Clean (1) (1).csv",
+                          "GP out-of-pocket cost by state and remoteness", "AIHW MBS Table 9",
+                          ("service_year", "state", "oop_actual", "oop_inflation_adjusted", "remoteness"),
+                          state="state", year="service_year"),
+    "oop_states": Dataset(f"{_OOP}/Out_of_pocket_costs_by_states&territories_2003_2023.csv",
+                          "Out-of-pocket cost quintiles by region, actual and adjusted", "AIHW",
+                          ("Year", "Region"), state="Region", year="Year"),
+    "oop_forecast": Dataset(f"{_OOP}/forecast_table.csv", "Precomputed dashboard forecasts",
+                            "forecasting.py", ("Table", "Basis", "State", "Group", "Year", "Value", "Lower", "Upper",
+                                               "Model"), state="State", year="Year"),
+    # regional equity and clustering
+    "seifa_sa2": Dataset(f"{_REG}/raw-data/Statistical_Area_Level 2_Indexes_SEIFA_2021.xlsx",
+                         "SEIFA 2021 scores and deciles by SA2 (Table 1)", "ABS SEIFA 2021",
+                         sheet="Table 1", skiprows=5, dtype=str),
+    "phn_sa2_concordance": Dataset(f"{_REG}/raw-data/primary-health-networks-phn-2023-statistical-area-level-2-2021.xlsx",
+                                   "SA2 2021 to PHN 2023 correspondence", "ABS / Department of Health",
+                                   ("SA2_CODE_2021", "PHN_CODE_2023", "PHN_NAME_2023", "RATIO_FROM_TO"),
+                                   sheet="CG_SA2_2021_PHN_2017_All", dtype=str),
+    "seifa_phn": Dataset(f"{_REG}/preprocessed-data/seifa_phn.csv", "Population-weighted SEIFA IRSD by PHN",
+                         "seifa_aggregation.py", ("PHN_Code", "PHN_Name", "SEIFA_IRSD_Score", "IRSD_Decile_Mean",
+                                                  "PHN_Population"), phn="PHN_Code"),
+    "pph_phn": Dataset(f"{_REG}/preprocessed-data/pph_ppn_level_2022_23.csv",
+                       "Potentially preventable hospitalisations per 100k by PHN, 2022-23", "AIHW",
+                       _PHN_COLS + ("PPH_rate_per_100k",), state="State", phn="PHN_Code"),
+    "cost_by_state": Dataset(f"{_REG}/preprocessed-data/headlthcare_costs_summary_by_state_2022_23.csv",
+                             "Health cost per person by state, 2022-23", "AIHW HWE 2022-23",
+                             ("State", "Cost_per_person"), state="State"),
+    "cost_pph_phn": Dataset(f"{_REG}/preprocessed-data/merged_cost_pph.csv", "PPH rate and cost per person by PHN",
+                            "Preprocessing notebooks", _PHN_COLS + ("PPH_rate_per_100k", "Cost_per_person"),
+                            state="State", phn="PHN_Code"),
+    "cost_pph_seifa_phn": Dataset(f"{_REG}/preprocessed-data/final_cost_pph_seifa_dataset.csv",
+                                  "Cost, PPH and SEIFA by PHN (clustering input, unscaled)", "Preprocessing notebooks",
+                                  _PHN_COLS + ("PPH_rate_per_100k", "Cost_per_person", "SEIFA_IRSD_Score"),
+                                  state="State", phn="PHN_Code"),
+    "cost_pph_seifa_scaled": Dataset(f"{_REG}/preprocessed-data/final_scaled_dataset.csv",
+                                     "Standardised clustering features by PHN", "Preprocessing notebooks",
+                                     _PHN_COLS + ("Cost_per_person_scaled", "PPH_rate_per_100k_scaled",
+                                                  "SEIFA_IRSD_Score_scaled"), state="State", phn="PHN_Code"),
+    "phn_clusters": Dataset(f"{_REG}/preprocessed-data/final_clustered_dataset.csv", "Cluster label per PHN",
+                            "clustering.py", _PHN_COLS + ("Cluster",), state="State", phn="PHN_Code"),
+    "hwe_datacube": Dataset(f"{_REG}/raw-data/HWE-101-Health-Expenditure-Australia-datacube-2022-23.xlsx",
+                            "Health expenditure Australia 2022-23 data cube", "AIHW HWE 101", sheet=0),
+    # temporal trends
+    "hwe_trends": Dataset(f"{_TEMP}/Health_Expenditure_Trends_2008-2022_Cleaned.csv",
+                          "National health expenditure, current and constant prices", "AIHW HWE",
+                          ("Year", "StartYear", "Current ($m)", "Constant ($m)"), year="StartYear"),
+    "hwe_breakdown": Dataset(f"{_TEMP}/Health_Expenditure_Breakdown_By_Category_2018-2022_Cleaned.csv",
+                             "Government / non-government expenditure by category (indented hierarchy)", "AIHW HWE",
+                             ("Category", "Government", "Non-government", "YearLabel")),
+    "hwe_a6_combined": Dataset(f"{_TEMP}/Combined A6 tables 2018-2023.xlsx",
+                               "Table A6 (expenditure by area and source of funds), one sheet per year",
+                               "AIHW HWE Table A6", sheet=0),
+    # treatment efficiency
+    "aihw_treatment": Dataset(f"{_EFF}/data/processed/aihw_complete_treatment_data.cleaned.csv",
+                              "Treatment efficiency measures by state and year (long)", "AIHW (sample build)",
+                              ("measure_code", "measure_name", "category", "unit", "lower_better", "geo", "year",
+                               "value"), state="geo", year="year"),
+    "state_efficiency": Dataset(f"{_EFF}/processed_data/state_efficiency_all_years.csv",
+                                "Composite efficiency index by state and year", "efficiency_engine.py",
+                                ("geo", "year", "efficiency_index", "measures"), state="geo", year="year"),
+    # outcome modelling (not committed; produced by the AHPF cleaning notebook)
+    "ahpf_outcomes": Dataset("Outcome_Modelling/Infant_MortalityRate_code/data/anjana/processed/ahpf_outcomes_clean.csv",
+                             "AHPF outcome indicators by state and year (long)", "AIHW AHPF",
+                             ("Name", "State", "Value", "UnitType"), state="State", year="Period"),
+}
+
+
+# ---------- cache ----------
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class FrameCache:
+    """Thread-safe LRU of DataFrames bounded by their total deep memory usage."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: Hashable, loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+            self.misses += 1
+        df = loader()  # outside the lock: a slow parse does not block other readers
+        size = frame_bytes(df)
+        with self._lock:
+            if key in self._items:  # another thread loaded it meanwhile
+                return self._items[key][0]
+            if size <= self.max_bytes:
+                self._items[key] = (df, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, dropped) = self._items.popitem(last=False)
+                    self.bytes -= dropped
+                    self.evictions += 1
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+CACHE = FrameCache(CACHE_MB << 20)
+
+
+def _share(df: pd.DataFrame) -> pd.DataFrame:
+    """A caller's handle on a cached frame: shallow under copy-on-write, a deep copy otherwise."""
+    cow = int(pd.__version__.split(".")[0]) >= 3 or pd.options.mode.copy_on_write is True
+    return df.copy(deep=not cow)
+
+
+def _file_key(path: str) -> tuple:
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+def _kwargs_key(kwargs: dict) -> tuple:
+    return tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+
+
+# ---------- raw reads ----------
+def read_csv(path: str, **kwargs) -> pd.DataFrame:
+    """pd.read_csv(path, **kwargs) through the shared cache."""
+    key = ("csv",) + _file_key(path) + _kwargs_key(kwargs)
+    return _share(CACHE.get(key, lambda: pd.read_csv(path, **kwargs)))
+
+
+def read_excel(path: str, sheet_name=0, skiprows: int = 0, dtype=None) -> pd.DataFrame:
+    """One sheet via excel_cache.read_sheet, held in the shared cache."""
+    from excel_cache import read_sheet
+
+    key = ("xlsx",) + _file_key(path) + (repr(sheet_name), skiprows, repr(dtype))
+    return _share(CACHE.get(key, lambda: read_sheet(path, sheet_name, skiprows=skiprows, dtype=dtype)))
+
+
+def dataset(name: str) -> Dataset:
+    if name not in CATALOG:
+        raise KeyError(f"Unknown dataset {name!r}; known: {sorted(CATALOG)}")
+    return CATALOG[name]
+
+
+def path_of(name: str) -> str:
+    return os.path.join(ROOT, dataset(name).path)
+
+
+def _is_excel(path: str) -> bool:
+    return path.lower().endswith((".xlsx", ".xls"))
+
+
+def read(name: str, path: Optional[str] = None) -> pd.DataFrame:
+    """A catalogued dataset as pandas reads it (from `path` instead, for another file with the same layout)."""
+    ds, path = dataset(name), path or path_of(name)
+    if _is_excel(path):
+        return read_excel(path, ds.sheet or 0, ds.skiprows, ds.dtype)
+    return read_csv(path, dtype=ds.dtype) if ds.dtype is not None else read_csv(path)
+
+
+def _parse(ds: Dataset, path: str) -> pd.DataFrame:
+    """read() without the shared cache, for load() to build its typed frame from."""
+    if _is_excel(path):
+        from excel_cache import read_sheet
+
+        return read_sheet(path, ds.sheet or 0, skiprows=ds.skiprows, dtype=ds.dtype)
+    return pd.read_csv(path, dtype=ds.dtype) if ds.dtype is not None else pd.read_csv(path)
+
+
+# ---------- typed view ----------
+def state_codes(series: pd.Series) -> pd.Series:
+    """State / territory names in any spelling ("Qld", "Queensland", "Aus") -> categorical NSW ... NT, AUS."""
+    text = series.astype("string").str.strip()
+    upper = text.str.upper()
+    mapped = upper.where(upper.isin(STATES), text.str.lower().map(_STATE_ALIASES))
+    return pd.Series(pd.Categorical(mapped, categories=STATES), index=series.index, name=series.name)
+
+
+def phn_codes(series: pd.Series) -> pd.Series:
+    """PHN codes as categorical "PHN101" (bare numbers get the prefix)."""
+    text = series.astype("string").str.strip().str.upper()
+    text = text.where(~text.str.fullmatch(r"\d+", na=False), "PHN" + text)
+    return text.astype("category")
+
+
+def year_ints(series: pd.Series) -> pd.Series:
+    """First four-digit year in each value ("2018-19" -> 2018); int64, or Int64 when some are missing."""
+    years = pd.to_numeric(series.astype("string").str.extract(r"(\d{4})", expand=False), errors="coerce")
+    return years.astype("int64") if years.notna().all() else years.astype("Int64")
+
+
+def load(name: str, path: Optional[str] = None) -> pd.DataFrame:
+    """
+    read() plus categorical State / PHN and integer year columns (cached as well; the raw frame is
+    not). With `path`, the file is read from there but typed by `name`'s column roles (e.g. a
+    pipeline stage's copy).
+    """
+    ds, path = dataset(name), path or path_of(name)
+
+    def typed() -> pd.DataFrame:
+        df = _parse(ds, path)
+        df.columns = [str(c).strip() for c in df.columns]
+        if ds.state and ds.state in df:
+            df[ds.state] = state_codes(df[ds.state])
+        if ds.phn and ds.phn in df:
+            df[ds.phn] = phn_codes(df[ds.phn])
+        if ds.year and ds.year in df:
+            df[ds.year] = year_ints(df[ds.year])
+        return df
+
+    return _share(CACHE.get(("typed", name) + _file_key(path), typed))
+
+
+def catalog_frame() -> pd.DataFrame:
+    """One row per dataset: name, path, whether it exists, missing expected columns, description, source."""
+    rows = []
+    for name, ds in CATALOG.items():
+        path = path_of(name)
+        exists = os.path.exists(path)
+        missing = ""
+        if exists and ds.columns:
+            cols = {str(c).strip() for c in read(name).columns}
+            missing = ", ".join(c for c in ds.columns if c not in cols)
+        rows.append({"name": name, "path": ds.path, "exists": exists, "missing_columns": missing,
+                     "description": ds.description, "source": ds.source})
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="List and warm the Cost_Of_HealthCare_Analysis data catalogue.")
+    p.add_argument("--warm", action="store_true", help="load every available dataset (typed) into the cache")
+    p.add_argument("names", nargs="*", help="datasets to warm (default: all)")
+    args = p.parse_args(argv)
+
+    cat = catalog_frame()
+    print(cat.drop(columns=["description"]).to_string(index=False))
+    if args.warm:
+        for name in args.names or cat.loc[cat["exists"], "name"]:
+            df = load(name)
+            print(f"{name:24s} {len(df):>7} rows  {frame_bytes(df) / 1e6:8.2f} MB")
+        s = CACHE.stats()
+        print(f"cache: {s['entries']} entries, {s['bytes'] / 1e6:.1f} / {s['max_bytes'] / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# dimensions.py — integer surrogate keys for State, Year, PHN, SEIFA quintile and remoteness, and keyed lookups
+#
+# The studies meet on a handful of shared dimensions but spell them differently ("Qld" / "QLD",
+# "Major cities" / "Major Cities", "2018-19" / 2018) and join with string merges. Here each
+# dimension has one ordered member list; encode() turns any spelling into a small integer key
+# (-1 when unknown). A KeyedTable holds a study table as a dense array indexed by those keys, so
+# joining it onto another table, or rolling it up through a mapping array such as
+# phn_state[phn_key] -> state_key, is array indexing instead of a merge.
+#
+#   python dimensions.py               # OOP cost vs efficiency index by PHN cluster, state-weighted
+#
+#   from dimensions import KeyedTable
+#   oop = KeyedTable.from_frame(load("oop_table8"), {"State": "state", "Year": "year"}, ["Actual"])
+#   t9["oop_state_mean"] = oop.join(t9, {"state": "state", "service_year": "year"})["Actual"]
+import argparse
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from data_catalog import CATALOG, STATES, load, state_codes
+
+YEARS = range(1990, 2051)
+SEIFA_QUINTILES = ["Q1", "Q2", "Q3", "Q4", "Q5"]
+REMOTENESS = ["Major Cities", "Inner Regional", "Outer Regional", "Remote", "Very Remote"]
+# first digit of an ABS PHN code is the state number
+PHN_STATE_DIGIT = {"1": "NSW", "2": "VIC", "3": "QLD", "4": "SA", "5": "WA", "6": "TAS", "7": "NT", "8": "ACT"}
+
+
+# ---------- normalisers ----------
+def _year_values(series: pd.Series) -> pd.Series:
+    return pd.to_numeric(series.astype("string").str.extract(r"(\d{4})", expand=False), errors="coerce")
+
+
+def _seifa_labels(series: pd.Series) -> pd.Series:
+    # "Q3", "Quintile 3", "3", "3 (most advantaged)" -> "Q3"; deciles ("10") and other spellings -> <NA>
+    text = series.astype("string").str.strip()
+    digit = text.str.extract(r"^(?:Q|Quintile\s*)?([1-5])\b", flags=re.IGNORECASE, expand=False)
+    return "Q" + digit
+
+
+def _area_labels(series: pd.Series) -> pd.Series:
+    text = series.astype("string").str.strip().str.lower().str.replace(r"\s+", "", regex=True)
+    canon = {re.sub(r"\s+", "", a.lower()): a for a in REMOTENESS}
+    return text.map(canon)
+
+
+def _phn_labels(series: pd.Series) -> pd.Series:
+    text = series.astype("string").str.strip().str.upper()
+    return text.where(~text.str.fullmatch(r"\d+", na=False), "PHN" + text)
+
+
+class Dimension:
+    """An ordered member list; encode() maps raw values (any supported spelling) to positions, -1 if unknown."""
+
+    def __init__(self, name: str, members: Sequence, normalise=None):
+        self.name = name
+        self.members = pd.Index(list(members))
+        self.normalise = normalise
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def encode(self, values) -> np.ndarray:
+        s = pd.Series(values)
+        if self.normalise is not None:
+            s = self.normalise(s)
+        return self.members.get_indexer(s.to_numpy(dtype=object)).astype(np.int32)
+
+    def decode(self, keys: np.ndarray) -> np.ndarray:
+        keys = np.asarray(keys)
+        out = np.asarray(self.members, dtype=object)[np.where(keys >= 0, keys, 0)]
+        return np.where(keys >= 0, out, None)
+
+    def categorical(self, keys: np.ndarray) -> pd.Categorical:
+        return pd.Categorical.from_codes(np.asarray(keys), categories=self.members, ordered=True)
+
+
+class DimensionIndex:
+    """The shared dimensions plus precomputed parent mappings (phn_state)."""
+
+    def __init__(self, phns: Sequence[str]):
+        self.state = Dimension("state", STATES, lambda s: state_codes(s).astype("string"))
+        self.year = Dimension("year", YEARS, _year_values)
+        self.phn = Dimension("phn", sorted(phns), _phn_labels)
+        self.seifa = Dimension("seifa", SEIFA_QUINTILES, _seifa_labels)
+        self.area = Dimension("area", REMOTENESS, _area_labels)
+        self.dims: Dict[str, Dimension] = {d.name: d for d in (self.state, self.year, self.phn, self.seifa, self.area)}
+        # phn_key -> state_key
+        self.phn_state = self.state.encode([PHN_STATE_DIGIT.get(str(p)[3:4]) for p in self.phn.members])
+
+    @classmethod
+    def from_catalog(cls) -> "DimensionIndex":
+        """PHN members from every catalogued table that has a PHN column."""
+        phns = set()
+        for name, ds in CATALOG.items():
+            if ds.phn:
+                try:
+                    phns.update(load(name)[ds.phn].dropna().astype(str))
+                except FileNotFoundError:
+                    continue
+        return cls(sorted(phns))
+
+    def __getitem__(self, name: str) -> Dimension:
+        return self.dims[name]
+
+    def encode(self, df: pd.DataFrame, on: Dict[str, str]) -> List[np.ndarray]:
+        """Key arrays for {column: dimension name}, in that order."""
+        return [self.dims[dim].encode(df[col]) for col, dim in on.items()]
+
+    def add_keys(self, df: pd.DataFrame, on: Dict[str, str]) -> pd.DataFrame:
+        """df with a {dimension}_key int32 column per entry of on."""
+        out = df.copy()
+        for (col, dim), keys in zip(on.items(), self.encode(df, on)):
+            out[f"{dim}_key"] = keys
+        return out
+
+    def phn_to_state(self, phn_keys: np.ndarray) -> np.ndarray:
+        phn_keys = np.asarray(phn_keys)
+        return np.where(phn_keys >= 0, self.phn_state[np.maximum(phn_keys, 0)], -1)
+
+
+_DIMS: Optional[DimensionIndex] = None
+
+
+def dims() -> DimensionIndex:
+    """The process-wide DimensionIndex (built from the catalogue on first use)."""
+    global _DIMS
+    if _DIMS is None:
+        _DIMS = DimensionIndex.from_catalog()
+    return _DIMS
+
+
+# ---------- keyed tables ----------
+class KeyedTable:
+    """
+    Value columns of a table as a dense array over its dimensions (dim sizes × n_values),
+    NaN where there are no rows; duplicate key rows are averaged.
+    """
+
+    def __init__(self, dim_names: Sequence[str], columns: Sequence[str], values: np.ndarray, count: np.ndarray,
+                 index: Optional[DimensionIndex] = None):
+        self.index = index or dims()
+        self.dim_names = list(dim_names)
+        self.columns = list(columns)
+        self.values = values
+        self.count = count
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, on: Dict[str, str], columns: Sequence[str],
+                   index: Optional[DimensionIndex] = None) -> "KeyedTable":
+        index = index or dims()
+        keys = index.encode(df, on)
+        shape = tuple(len(index[d]) for d in on.values())
+        ok = np.logical_and.reduce([k >= 0 for k in keys]) if keys else np.ones(len(df), bool)
+        X = df[list(columns)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        ok &= ~np.isnan(X).all(axis=1)
+        flat = np.ravel_multi_index([k[ok] for k in keys], shape)
+        size = int(np.prod(shape))
+        count = np.zeros((size, len(columns)))
+        total = np.zeros((size, len(columns)))
+        for j in range(len(columns)):
+            known = ~np.isnan(X[ok, j])
+            count[:, j] = np.bincount(flat[known], minlength=size)
+            total[:, j] = np.bincount(flat[known], X[ok, j][known], size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+        return cls(list(on.values()), columns, values.reshape(shape + (len(columns),)),
+                   count.reshape(shape + (len(columns),)), index)
+
+    def take(self, *keys: np.ndarray) -> np.ndarray:
+        """(n × n_values) rows for key arrays in dim_names order; NaN for unknown (-1) keys."""
+        keys = [np.asarray(k) for k in keys]
+        ok = np.logical_and.reduce([k >= 0 for k in keys])
+        out = self.values[tuple(np.maximum(k, 0) for k in keys)]
+        out[~ok] = np.nan
+        return out
+
+    def join(self, df: pd.DataFrame, on: Dict[str, str], suffix: str = "") -> pd.DataFrame:
+        """Left join onto df; on maps df columns to this table's dimensions (all of them)."""
+        by_dim = {dim: col for col, dim in on.items()}
+        missing = set(self.dim_names) - set(by_dim)
+        if missing:
+            raise KeyError(f"join needs columns for {sorted(missing)}")
+        keys = [self.index[d].encode(df[by_dim[d]]) for d in self.dim_names]
+        out = df.copy()
+        vals = self.take(*keys)
+        for j, col in enumerate(self.columns):
+            out[col + suffix] = vals[:, j]
+        return out
+
+    def frame(self) -> pd.DataFrame:
+        """Long form: one row per populated key combination, labels decoded."""
+        populated = (self.count > 0).any(axis=-1)
+        idx = np.nonzero(populated)
+        out = pd.DataFrame({d: self.index[d].decode(k) for d, k in zip(self.dim_names, idx)})
+        for j, col in enumerate(self.columns):
+            out[col] = self.values[idx + (j,)]
+        return out
+
+
+# ---------- cross-study ----------
+def cluster_state_weights(clusters: pd.DataFrame, index: Optional[DimensionIndex] = None,
+                          phn_col: str = "PHN_Code", cluster_col: str = "Cluster") -> pd.DataFrame:
+    """cluster × state share of each cluster's PHNs (rows sum to 1), via phn_state."""
+    index = index or dims()
+    phn = index.phn.encode(clusters[phn_col])
+    state = index.phn_to_state(phn)
+    cl = pd.Index(sorted(clusters[cluster_col].unique()))
+    c = cl.get_indexer(clusters[cluster_col])
+    ok = state >= 0
+    W = np.zeros((len(cl), len(index.state)))
+    np.add.at(W, (c[ok], state[ok]), 1.0)
+    W /= W.sum(axis=1, keepdims=True)
+    return pd.DataFrame(W, index=pd.Index(cl, name=cluster_col), columns=index.state.members)
+
+
+def by_cluster(weights: pd.DataFrame, table: KeyedTable) -> pd.DataFrame:
+    """
+    A state × year KeyedTable rolled up to cluster × year: the PHN-share-weighted mean over the
+    states each cluster's PHNs sit in (states without a value are left out of the weights).
+    """
+    if table.dim_names != ["state", "year"]:
+        raise ValueError("by_cluster expects a (state, year) table")
+    W = weights.to_numpy()
+    V = table.values  # state × year × k
+    known = ~np.isnan(V)
+    num = np.einsum("cs,syk->cyk", W, np.where(known, V, 0.0))
+    den = np.einsum("cs,syk->cyk", W, known.astype(float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        M = np.where(den > 0, num / np.where(den > 0, den, 1), np.nan)
+    ci, yi = np.nonzero(~np.isnan(M).all(axis=-1))
+    out = pd.DataFrame({weights.index.name: weights.index.to_numpy()[ci],
+                        "Year": np.asarray(table.index.year.members)[yi]})
+    for j, col in enumerate(table.columns):
+        out[col] = M[ci, yi, j]
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="OOP cost vs treatment efficiency by PHN cluster (keyed lookups).")
+    p.add_argument("--basis", choices=["Actual", "Adjusted"], default="Actual", help="Table 8 value column")
+    args = p.parse_args(argv)
+
+    index = dims()
+    W = cluster_state_weights(load("phn_clusters"), index)
+    oop = KeyedTable.from_frame(load("oop_table8"), {"State": "state", "Year": "year"}, [args.basis], index)
+    eff = KeyedTable.from_frame(load("state_efficiency"), {"geo": "state", "year": "year"}, ["efficiency_index"], index)
+    out = by_cluster(W, oop).merge(by_cluster(W, eff), on=["Cluster", "Year"], how="inner")
+    print(W.round(3).loc[:, (W > 0).any()].to_string())
+    print(out.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"{len(index.phn)} PHNs, {len(index.state)} states; {len(out)} cluster-year rows")
+
+
+if __name__ == "__main__":
+    main()
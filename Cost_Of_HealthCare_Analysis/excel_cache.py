@@ -0,0 +1,275 @@
+# excel_cache.py — parse the raw AIHW / ABS workbooks once, then load them as columnar files
+#
+# Every (workbook, sheet, skiprows, header) is converted with openpyxl in streaming read-only
+# mode and written to .ingest_cache/<sha1 of the workbook>/ as Parquet (pickle when pyarrow is
+# missing, a column mixes numbers and text, or a header label is not text, e.g. a year or a date,
+# since Parquet would turn it into a string). The key is the file *content*, so a replaced
+# workbook is re-ingested and an unchanged copy elsewhere reuses the same files. Sheets are
+# converted in parallel across a process pool.
+#
+#   python excel_cache.py                     # warm the cache for every .xlsx under Cost_Of_HealthCare_Analysis
+#   python excel_cache.py path/to/book.xlsx --workers 4
+#
+# In a notebook, swap pd.ExcelFile / pd.read_excel for the cached versions:
+#   xls = CachedWorkbook(path); xls.sheet_names; xls.parse("Table 1", skiprows=5, dtype=str)
+#   df = read_sheet(path, sheet_name=0)
+import argparse
+import glob
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ROOT, ".ingest_cache")
+FORMAT_VERSION = 2  # bump when the conversion below changes
+MANIFEST = "manifest.json"
+
+Sheet = Union[str, int]
+
+_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+# ---------- keys ----------
+def file_hash(path: str) -> str:
+    """sha1 of the workbook bytes (memoised per path/size/mtime for the life of the process)."""
+    st = os.stat(path)
+    memo = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo not in _digests:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _digests[memo] = h.hexdigest()
+    return _digests[memo]
+
+
+def _safe_name(sheet: str) -> str:
+    # readable, plus a short hash so "Table 2.1" and "Table_2.1" cannot collide
+    readable = "".join(c if c.isalnum() or c in "-_." else "_" for c in sheet)
+    return f"{readable}-{hashlib.sha1(sheet.encode()).hexdigest()[:6]}"
+
+
+def _entry_stem(sheet: str, skiprows: int, header: Optional[int], as_str: bool = False) -> str:
+    h = "none" if header is None else header
+    return f"{_safe_name(sheet)}__s{skiprows}_h{h}{'_str' if as_str else ''}_v{FORMAT_VERSION}"
+
+
+def _book_dir(digest: str, cache_dir: Optional[str] = None) -> str:
+    return os.path.join(cache_dir or CACHE_DIR, digest)
+
+
+# ---------- parsing ----------
+def _cell(v):
+    # same conversions as pandas' openpyxl reader: blanks -> "", whole floats -> int
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+
+def workbook_sheets(path: str) -> List[str]:
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def parse_sheet(path: str, sheet: str, skiprows: int = 0, header: Optional[int] = 0,
+                as_str: bool = False) -> pd.DataFrame:
+    """One sheet via openpyxl read-only row streaming (trailing blank rows / columns trimmed)."""
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        data, last_row = [], 0
+        for i, values in enumerate(wb[sheet].iter_rows(values_only=True)):
+            row = [_cell(v) for v in values]
+            while row and row[-1] == "":
+                row.pop()
+            if row:
+                last_row = i + 1
+            data.append(row)
+    finally:
+        wb.close()
+    data = data[:last_row]
+    if not data:
+        return pd.DataFrame()
+    width = max(len(r) for r in data)
+    data = [r + [""] * (width - len(r)) for r in data]
+    return TextParser(data, header=header, skiprows=skiprows, dtype=str if as_str else None).read()
+
+
+def _store(df: pd.DataFrame, stem: str) -> str:
+    """Write atomically; Parquet where possible, else pickle (mixed object columns, non-text labels, no pyarrow)."""
+    os.makedirs(os.path.dirname(stem), exist_ok=True)
+    out = df.copy()
+    # Parquet only keeps string column names; pickle keeps 1397 / datetime headers (and the RangeIndex of
+    # an empty sheet) as pd.read_excel gives them
+    text_labels = len(out.columns) and all(isinstance(c, str) for c in out.columns)
+    exts = ("parquet", "pkl") if text_labels else ("pkl",)
+    for ext in exts:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(stem), suffix=".part")
+        os.close(fd)
+        try:
+            if ext == "parquet":
+                out.to_parquet(tmp, index=False)
+            else:
+                with open(tmp, "wb") as f:
+                    pickle.dump(out, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, f"{stem}.{ext}")
+            return f"{stem}.{ext}"
+        except (ImportError, TypeError, ValueError, NotImplementedError) as e:
+            if ext == "pkl" or not _is_arrow_error(e):
+                raise
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def _is_arrow_error(e: Exception) -> bool:
+    # pyarrow missing, or a column it cannot type (ArrowTypeError / ArrowInvalid subclass TypeError / ValueError)
+    return isinstance(e, ImportError) or type(e).__module__.startswith("pyarrow")
+
+
+def _load(stem: str) -> Optional[pd.DataFrame]:
+    if os.path.exists(f"{stem}.parquet"):
+        return pd.read_parquet(f"{stem}.parquet")
+    if os.path.exists(f"{stem}.pkl"):
+        with open(f"{stem}.pkl", "rb") as f:
+            return pickle.load(f)
+    return None
+
+
+# ---------- ingestion ----------
+def _ingest_task(task) -> Tuple[str, str, str, float]:
+    path, sheet, skiprows, header, as_str, stem = task
+    t0 = time.perf_counter()
+    out = _store(parse_sheet(path, sheet, skiprows, header, as_str), stem)
+    return path, sheet, out, time.perf_counter() - t0
+
+
+def _manifest(path: str, cache_dir: Optional[str] = None) -> dict:
+    """{"sheets": [...]} for this workbook's content, written on first use."""
+    book = _book_dir(file_hash(path), cache_dir)
+    mpath = os.path.join(book, MANIFEST)
+    if os.path.exists(mpath):
+        with open(mpath) as f:
+            return json.load(f)
+    m = {"source": os.path.basename(path), "sheets": workbook_sheets(path)}
+    os.makedirs(book, exist_ok=True)
+    # temp file + rename, so a crash or a concurrent worker never leaves a truncated manifest
+    fd, tmp = tempfile.mkstemp(dir=book, suffix=".part")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(m, f, indent=2)
+        os.replace(tmp, mpath)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return m
+
+
+def _resolve(path: str, sheet: Sheet, cache_dir: Optional[str] = None) -> str:
+    sheets = _manifest(path, cache_dir)["sheets"]
+    if isinstance(sheet, int):
+        return sheets[sheet]
+    if sheet not in sheets:
+        raise ValueError(f"Worksheet named '{sheet}' not found in {os.path.basename(path)}")
+    return sheet
+
+
+def ingest(paths: Iterable[str], sheets: Optional[List[Sheet]] = None, skiprows: int = 0,
+           header: Optional[int] = 0, as_str: bool = False, workers: Optional[int] = None,
+           cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Convert every requested sheet that is not cached yet (default: all sheets) in parallel.
+    Returns one row per sheet: path, sheet, file, cached (already there), seconds.
+    """
+    tasks, rows = [], []
+    for path in paths:
+        book = _book_dir(file_hash(path), cache_dir)
+        names = [_resolve(path, s, cache_dir) for s in sheets] if sheets else _manifest(path, cache_dir)["sheets"]
+        for sheet in names:
+            stem = os.path.join(book, _entry_stem(sheet, skiprows, header, as_str))
+            hit = next((f"{stem}.{e}" for e in ("parquet", "pkl") if os.path.exists(f"{stem}.{e}")), None)
+            if hit:
+                rows.append({"path": path, "sheet": sheet, "file": hit, "cached": True, "seconds": 0.0})
+            else:
+                tasks.append((path, sheet, skiprows, header, as_str, stem))
+
+    if tasks and (workers == 1 or len(tasks) == 1):
+        done = [_ingest_task(t) for t in tasks]
+    elif tasks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(_ingest_task, tasks))
+    else:
+        done = []
+    rows += [{"path": p, "sheet": s, "file": f, "cached": False, "seconds": sec} for p, s, f, sec in done]
+    return pd.DataFrame(rows, columns=["path", "sheet", "file", "cached", "seconds"])
+
+
+def read_sheet(path: str, sheet_name: Sheet = 0, skiprows: int = 0, header: Optional[int] = 0,
+               dtype=None, cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    pd.read_excel for one sheet, served from the columnar cache (converted on first call).
+    dtype=str is applied while parsing, like pandas; any other dtype is applied to the cached frame.
+    """
+    sheet = _resolve(path, sheet_name, cache_dir)
+    as_str = dtype is str
+    stem = os.path.join(_book_dir(file_hash(path), cache_dir), _entry_stem(sheet, skiprows, header, as_str))
+    df = _load(stem)
+    if df is None:
+        _store(parse_sheet(path, sheet, skiprows, header, as_str), stem)
+        df = _load(stem)
+    return df.astype(dtype) if dtype is not None and not as_str else df
+
+
+class CachedWorkbook:
+    """Drop-in for the pd.ExcelFile calls the notebooks make (sheet_names, parse)."""
+
+    def __init__(self, path: str, cache_dir: Optional[str] = None):
+        self.path = path
+        self.cache_dir = cache_dir
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(_manifest(self.path, self.cache_dir)["sheets"])
+
+    def parse(self, sheet_name: Sheet = 0, skiprows: int = 0, header: Optional[int] = 0, dtype=None) -> pd.DataFrame:
+        return read_sheet(self.path, sheet_name, skiprows, header, dtype, self.cache_dir)
+
+
+def default_workbooks() -> List[str]:
+    return sorted(glob.glob(os.path.join(ROOT, "**", "*.xlsx"), recursive=True))
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Convert Excel workbooks to cached columnar files.")
+    p.add_argument("paths", nargs="*", help="workbooks (default: every .xlsx under Cost_Of_HealthCare_Analysis)")
+    p.add_argument("--skiprows", type=int, default=0)
+    p.add_argument("--str", dest="as_str", action="store_true", help="read every cell as text (dtype=str)")
+    p.add_argument("--workers", type=int, default=None, help="process pool size (1 = run in-process)")
+    args = p.parse_args(argv)
+
+    paths = args.paths or default_workbooks()
+    t0 = time.perf_counter()
+    res = ingest(paths, skiprows=args.skiprows, as_str=args.as_str, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    new = res[~res["cached"]]
+    print(f"{len(res)} sheets from {len(paths)} workbooks: {len(new)} converted "
+          f"({new['seconds'].sum():.1f}s of parsing), {int(res['cached'].sum())} already cached, "
+          f"{elapsed:.1f}s wall -> {CACHE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
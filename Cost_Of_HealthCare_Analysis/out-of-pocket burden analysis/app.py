@@ -1,78 +1,31 @@
 # app.py — Interactive OOP Dashboard (visuals polished)
-import os
-import re
-from typing import List, Optional
-
-import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
 import plotly.graph_objects as go
 
+from exports import MIME, build_artifact, cached_artifact, export_formats, iter_file
+from figure_cache import FigureCache, compact_figure, data_version, figure_key
+from forecasting import DEFAULT_HORIZON, FORECAST_FILE, SELECTION_FILE, build_forecast_table, load_forecast_table
+from oop_data import (
+    FILE_STATES, FILE_TABLE8, FILE_TABLE9, SHARED_CACHE, order_seifa, prep_states, prep_table8, prep_table9,
+    read_table, safe_path, timed,
+)
+from oop_queries import (
+    by_area, by_seifa, filter_frame, headline, latest_by_area, latest_by_state, national_forecast,
+    national_trend, seifa_gap, series_forecast, state_matrix, t9_value_col,
+)
+
 # ---------- CONFIG ----------
 st.set_page_config(page_title="Out-of-Pocket Costs Dashboard", layout="wide")
 
-DATA_DIR = "data"
-
-FILE_TABLE8 = "Table8_GP_Out_of_Pocket_Clean_YearFixed (1).csv"
-FILE_TABLE9 = "Table9_Remoteness_Out_of_Pocket_Clean (1) (1).csv"
-FILE_STATES = "Out_of_pocket_costs_by_states&territories_2003_2023.csv"
-
-# ---------- helpers ----------
-def find_one(patterns: List[str], columns: List[str], required=True, default: Optional[str]=None) -> Optional[str]:
-    for pat in patterns:
-        rx = re.compile(pat, re.I)
-        for c in columns:
-            if rx.search(str(c)):
-                return c
-    if required:
-        raise KeyError(f"Could not find any column matching: {patterns} in {list(columns)}")
-    return default
-
-def yearify(series: pd.Series) -> pd.Series:
-    return (
-        pd.to_numeric(
-            series.astype(str).str.extract(r"(\d{4})", expand=False),
-            errors="coerce",
-        ).astype("Int64")
-    )
-
-@st.cache_data(show_spinner=False)
+@timed
 def load_csv(path):
-    df = pd.read_csv(path)
-    df.columns = [c.strip() for c in df.columns]
-    return df
-
-def value_col_choice(df: pd.DataFrame, basis: str) -> str:
-    cols = list(df.columns)
-    if basis == "Actual":
-        return find_one(
-            [r"actual.*(cost|price)", r"\bactual\b", r"oop.*actual", r"value|amount|price"],
-            cols, required=True
-        )
-    else:  # Inflation adjusted
-        return find_one(
-            [r"inflation.*adjust", r"adjust(ed|ment)", r"\bcpi\b", r"inflation.*price"],
-            cols, required=True
-        )
+    return read_table(path)
 
-def seifa_standardize_label(s: str) -> str:
-    t = str(s).strip().lower()
-    mapping = {"quintile 1": "Q1", "quintile 2": "Q2", "quintile 3": "Q3", "quintile 4": "Q4", "quintile 5": "Q5"}
-    for k, v in mapping.items():
-        if k in t:
-            return v
-    m = re.search(r"\b([1-5])\b", t)
-    return f"Q{m.group(1)}" if m else s
-
-def area_standardize_label(s: str) -> str:
-    t = str(s).strip().lower()
-    t = t.replace("majorcities", "major cities")
-    t = t.replace("innerregional", "inner regional")
-    t = t.replace("outerregional", "outer regional")
-    t = t.replace("veryremote", "very remote")
-    return t.title()
+if not SHARED_CACHE:  # outside the repo there is no data_catalog; keep Streamlit's own cache
+    load_csv = st.cache_data(show_spinner=False)(load_csv)
 
 # --------- visualization helpers (polished & consistent) ----------
 def _is_dark():
@@ -199,60 +152,11 @@ They come from the ABS ASGS classification and describe how far a place is from
 """
     )
 
-# helpers to keep category order consistent everywhere
-SEIFA_ORDER = ["Q1", "Q2", "Q3", "Q4", "Q5"]
-AREA_ORDER  = ["Major Cities", "Inner Regional", "Outer Regional", "Remote", "Very Remote"]
-
-def order_seifa(df, col="SEIFA"):
-    if col in df.columns:
-        df[col] = pd.Categorical(df[col], categories=SEIFA_ORDER, ordered=True)
-    return df
-
-def order_area(df, col="Area"):
-    if col in df.columns:
-        df[col] = pd.Categorical(df[col], categories=AREA_ORDER, ordered=True)
-    return df
-
 # ---------- load data ----------
-def safe_path(name): return os.path.join(DATA_DIR, name)
-
 table8 = load_csv(safe_path(FILE_TABLE8))
 table9 = load_csv(safe_path(FILE_TABLE9))
 states = load_csv(safe_path(FILE_STATES))
 
-# ---------- normalize schemas ----------
-def prep_table8(df: pd.DataFrame) -> pd.DataFrame:
-    y = find_one([r"^year$", r"service[_\s]*year", r"\bdate\b"], df.columns)
-    s = find_one([r"^state$", r"jurisdiction"], df.columns)
-    q = find_one([r"seifa.*quintile", r"\bquintile\b"], df.columns)
-    df = df.copy()
-    df["Year"] = yearify(df[y])
-    df["State"] = df[s].astype(str)
-    df["SEIFA"] = df[q].map(seifa_standardize_label)
-    return df
-
-def prep_table9(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    y = find_one([r"^year$", r"service[_\s]*year"], df.columns, required=False)
-    if not y and "service_year" in df.columns: y = "service_year"
-    s = find_one([r"^state$", r"jurisdiction"], df.columns, required=False) or "state"
-    a = find_one([r"remoteness|aria|ra\s*category|area"], df.columns)
-    df["Year"] = yearify(df[y]) if y else pd.NA
-    df["State"] = df[s].astype(str)
-    df["Area"] = df[a].map(area_standardize_label)
-    return df
-
-def prep_states(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    y = find_one([r"^year$"], df.columns)
-    r = find_one([r"^region$|^state$|jurisdiction"], df.columns)
-    df["Year"] = yearify(df[y])
-    actual_cols = [c for c in df.columns if re.fullmatch(r"actual[1-5]", c.lower())]
-    if not actual_cols:
-        actual_cols = [find_one([r"actual.*(price|cost)|\bactual\b"], df.columns)]
-    df["_actual_mean"] = df[actual_cols].apply(pd.to_numeric, errors="coerce").mean(axis=1)
-    return df.rename(columns={r: "Region"})
-
 t8 = prep_table8(table8)
 t9 = prep_table9(table9)
 st_wide = prep_states(states)
@@ -278,62 +182,80 @@ state_pick = st.sidebar.multiselect("State(s)/Territories", options=state_option
 # ---------- page routing ----------
 page = st.sidebar.radio("Page", ["Overview", "SEIFA equity", "Remoteness", "States & Territories", "Predictions"])
 
-# ---------- forecasting ----------
-
-def forecast_national(df: pd.DataFrame, basis: str, years: int = 20):
-    col_val = value_col_choice(df, basis)
+# ---------- figure cache ----------
+# Finished figures are cached as compact JSON per (page, chart, filters, basis, theme, data version),
+# so page switches and repeated filter combinations skip px.* + style_* entirely.
+@st.cache_resource
+def figure_cache():
+    return FigureCache(max_entries=256)
+
+DATA_VERSION = data_version([safe_path(f) for f in (FILE_TABLE8, FILE_TABLE9, FILE_STATES, FORECAST_FILE, SELECTION_FILE)])
+
+def show_chart(chart: str, build, **filters):
+    key = figure_key(page, chart, basis, _template(), DATA_VERSION, year_range, state_pick, filters)
+    fig = figure_cache().get_or_build(key, build)
+    st.plotly_chart(fig, use_container_width=True)
+
+# ---------- exports ----------
+# Extracts are written only when requested, then served from disk (cached by filter hash);
+# the file is read when Download is clicked, not on every rerun.
+def export_panel(table: str, make_frame, file_stem: str, **filters):
+    with st.expander("⬇️ Export data"):
+        fmt = st.radio("Format", export_formats(), horizontal=True, key=f"fmt_{table}")
+        filters = dict(filters, basis=basis, years=year_range, states=state_pick, version=DATA_VERSION)
+        path = cached_artifact(table, fmt, filters)
+        if path is None and st.button("Prepare extract", key=f"prep_{table}"):
+            with st.spinner("Writing extract…"):
+                path = build_artifact(table, fmt, filters, make_frame)
+        if path:
+            # bytes are only read when the button is clicked (rebuilt if the file was evicted meanwhile)
+            def read():
+                return b"".join(iter_file(build_artifact(table, fmt, filters, make_frame)))
+            st.download_button(f"Download {fmt.upper()}", data=read, file_name=f"{file_stem}.{fmt}",
+                               mime=MIME[fmt], key=f"dl_{table}")
 
-    # national mean per year
-    base = df.copy()
-    aus = base[base["State"].astype(str).str.fullmatch("Aus", case=False, na=False)]
-    if aus.empty:
-        series = base.groupby("Year", as_index=False)[col_val].mean()
-    else:
-        series = aus.groupby("Year", as_index=False)[col_val].mean()
+# ---------- forecasting ----------
 
-    series = series.dropna().sort_values("Year")
-    ts = series.rename(columns={"Year": "ds", col_val: "y"}).copy()
-    ts["ds"] = pd.to_datetime(ts["ds"], format="%Y")
+# State × SEIFA / State × remoteness projections from the batched forecast table
+# keyed on DATA_VERSION so a rewritten forecast_table.csv (or selection) replaces the cached overlay
+@st.cache_data(show_spinner=False)
+def load_forecasts(version: str):
+    fc = load_forecast_table()
+    if fc is None:  # no persisted table (run forecasting.py) -> fit in memory, batched so it's quick
+        fc = build_forecast_table(t8, t9, horizon=DEFAULT_HORIZON)
+    return fc
+
+def forecast_overlay_controls():
+    show = st.sidebar.checkbox("Overlay forecasts", value=False,
+                               help="Dashed lines project each series forward (linear trend).")
+    years = st.sidebar.slider("Forecast horizon (years)", min_value=1, max_value=DEFAULT_HORIZON, value=10, step=1) if show else 0
+    return show, years
+
+def add_forecast_overlay(fig, table: str, years: int):
+    colors = {tr.legendgroup: tr.line.color for tr in fig.data}  # match the px line colours
+    fc = series_forecast(load_forecasts(DATA_VERSION), table, basis, state_pick, years)
+    for g, d in fc.groupby("Group"):
+        fig.add_scatter(
+            x=d["Year"], y=d["Value"],
+            mode="lines",
+            line=dict(color=colors.get(g), width=2, dash="dash"),
+            legendgroup=g,
+            name=f"{g} (forecast)",
+            customdata=d[["Lower", "Upper"]].to_numpy(),
+            hovertemplate="<b>%{x}</b><br>$%{y:.2f} forecast<br>80%: $%{customdata[0]:.2f}–$%{customdata[1]:.2f}<extra>" + str(g) + "</extra>",
+        )
+    return fig
 
-    # --- Prophet if available, else linear fallback
-    try:
-        from prophet import Prophet
-        m = Prophet(interval_width=0.8, yearly_seasonality=False)
-        m.fit(ts)
-        future = m.make_future_dataframe(periods=years, freq="Y")
-        fc = m.predict(future)[["ds", "yhat", "yhat_lower", "yhat_upper"]]
-    except Exception:
-        from sklearn.linear_model import LinearRegression
-        X = np.arange(len(ts)).reshape(-1, 1)
-        y = ts["y"].values
-        model = LinearRegression().fit(X, y)
-        Xf = np.arange(len(ts) + years).reshape(-1, 1)
-        yhat = model.predict(Xf)
-
-        resid = y - model.predict(X)
-        s = np.std(resid)
-        z = 1.28  # ~80%
-        h = np.arange(len(Xf)) - (len(ts) - 1)
-        h = np.clip(h, 0, None)
-        widen = np.sqrt(1 + h)
-
-        dates = pd.date_range(ts["ds"].min(), periods=len(ts) + years, freq="Y")
-        fc = pd.DataFrame({
-            "ds": dates,
-            "yhat": yhat,
-            "yhat_lower": yhat - z * s * widen,
-            "yhat_upper": yhat + z * s * widen
-        })
+@timed
+def forecast_national(df: pd.DataFrame, basis: str, years: int = 20):
+    fcst_df, act_df, model = national_forecast(df, basis, years)
 
     # ---- Build styled chart ----
-    act = fc[fc["ds"] <= ts["ds"].max()]
-    fut = fc[fc["ds"] > ts["ds"].max()]
-
     fig = go.Figure()
 
     # actual history
     fig.add_trace(go.Scatter(
-        x=act["ds"].dt.year, y=act["yhat"],
+        x=act_df["Year"], y=act_df["Value"],
         mode="lines",
         line=dict(color="#5DA5DA", width=2.5),
         name="Actual"
@@ -341,7 +263,7 @@ def forecast_national(df: pd.DataFrame, basis: str, years: int = 20):
 
     # forecast line
     fig.add_trace(go.Scatter(
-        x=fut["ds"].dt.year, y=fut["yhat"],
+        x=fcst_df["Year"], y=fcst_df["Value"],
         mode="lines",
         line=dict(color="#F15854", width=2.5, dash="dash"),
         name="Forecast"
@@ -349,8 +271,8 @@ def forecast_national(df: pd.DataFrame, basis: str, years: int = 20):
 
     # confidence band
     fig.add_trace(go.Scatter(
-        x=list(fut["ds"].dt.year) + list(fut["ds"].dt.year[::-1]),
-        y=list(fut["yhat_upper"]) + list(fut["yhat_lower"][::-1]),
+        x=list(fcst_df["Year"]) + list(fcst_df["Year"][::-1]),
+        y=list(fcst_df["Upper"]) + list(fcst_df["Lower"][::-1]),
         fill="toself",
         fillcolor="rgba(241, 88, 84, 0.2)",
         line=dict(color="rgba(255,255,255,0)"),
@@ -361,7 +283,7 @@ def forecast_national(df: pd.DataFrame, basis: str, years: int = 20):
 
     fig.update_layout(
         template=_template(),
-        title=f"National OOP forecast — {basis}",
+        title=f"National OOP forecast — {basis} ({model} model)",
         title_x=0.02,
         margin=dict(l=40, r=40, t=60, b=40),
         yaxis=currency_axis(),
@@ -370,25 +292,14 @@ def forecast_national(df: pd.DataFrame, basis: str, years: int = 20):
                     xanchor="left", x=0.0, title=None)
     )
 
-    # return for metrics
-    forecast_df = fut.rename(columns={"ds": "Year", "yhat": "Value",
-                                      "yhat_lower": "Lower", "yhat_upper": "Upper"})
-    forecast_df["Year"] = forecast_df["Year"].dt.year
-
-    actual_df = act.rename(columns={"ds": "Year", "yhat": "Value"})
-    actual_df["Year"] = actual_df["Year"].dt.year
+    return fig, fcst_df, act_df
 
-    return fig, forecast_df, actual_df
-
-
-# ---------- derive filtered frames ----------
-def filter_by_year(df):
-    if "Year" not in df.columns: return df.copy()
-    return df[(df["Year"].notna()) & (df["Year"].between(year_range[0], year_range[1]))].copy()
+@st.cache_data(show_spinner=False)
+def forecast_national_cached(basis: str, years: int, theme: str, version: str):
+    # theme/version only key the cache; the figure is stored compacted like show_chart's
+    fig, fcst_df, act_df = forecast_national(t8, basis, years=years)
+    return compact_figure(fig), fcst_df, act_df
 
-def apply_state_filter(df):
-    if not state_pick or "State" not in df.columns: return df
-    return df[df["State"].isin(state_pick)] if "State" in df.columns else df
 
 # ---------- Overview ----------
 if page == "Overview":
@@ -406,61 +317,54 @@ if page == "Overview":
         """
     )
 
-    col_val = value_col_choice(t8, basis)
-    base = filter_by_year(t8)
-    aus = base[base["State"].str.fullmatch("Aus", case=False, na=False)]
-    if aus.empty:
-        aus = base.groupby("Year", as_index=False)[col_val].mean()
-
-    if not aus.empty:
-        latest_row = aus.sort_values("Year").tail(1)
-        latest_year = int(latest_row["Year"].iloc[0])
-        latest_val = float(latest_row[col_val].iloc[0])
-        prev = aus[aus["Year"] == latest_year-1]
-        yoy = (latest_val - float(prev[col_val].iloc[0]))/float(prev[col_val].iloc[0])*100 if not prev.empty else 0.0
-
-        t8_gap = filter_by_year(t8)
-        t8_gap = t8_gap[t8_gap["State"].str.fullmatch("Aus", case=False, na=False)]
-        try:
-            pvt = t8_gap.pivot_table(index="Year", columns="SEIFA", values=col_val, aggfunc="mean")
-            gap_latest = float(pvt.loc[latest_year, "Q5"] - pvt.loc[latest_year, "Q1"])
-        except Exception:
-            gap_latest = float("nan")
+    head = headline(t8, basis, year_range)
+    if head:
+        latest_year, latest_val = head["latest_year"], head["latest_value"]
+        yoy, gap_latest = head["yoy_pct"], head["equity_gap"]
 
         c1, c2, c3 = st.columns(3)
         c1.metric(f"Latest OOP ({basis})", f"${latest_val:,.2f}", f"{yoy:+.1f}% vs {latest_year-1}")
         c2.metric("Latest year", f"{latest_year}")
         c3.metric("Equity gap (Q5 − Q1)", f"${gap_latest:,.2f}" if pd.notna(gap_latest) else "N/A")
 
-        series = aus.sort_values("Year").reset_index(drop=True)
-        fig = px.line(series, x="Year", y=col_val, markers=True)
-        fig.update_traces(hovertemplate="<b>%{x}</b><br>$%{y:.2f} per GP service<br>(Price basis: " + basis + ")<extra></extra>")
-        fig = style_time_series(fig, f"Australia — OOP per service ({basis})")
+        series = national_trend(t8, basis, year_range)
 
-        fig.add_scatter(
-            x=[int(series['Year'].iloc[-1])],
-            y=[float(series[col_val].iloc[-1])],
-            mode="markers",
-            marker=dict(size=11, line=dict(width=1), symbol="circle-open"),
-            name="Latest year",
-            hovertemplate="<b>%{x}</b><br>$%{y:.2f} per GP service (latest)<extra></extra>",
-        )
+        def build():
+            fig = px.line(series, x="Year", y="Value", markers=True)
+            fig.update_traces(hovertemplate="<b>%{x}</b><br>$%{y:.2f} per GP service<br>(Price basis: " + basis + ")<extra></extra>")
+            fig = style_time_series(fig, f"Australia — OOP per service ({basis})")
 
-        st.plotly_chart(fig, use_container_width=True)
+            fig.add_scatter(
+                x=[int(series['Year'].iloc[-1])],
+                y=[float(series["Value"].iloc[-1])],
+                mode="markers",
+                marker=dict(size=11, line=dict(width=1), symbol="circle-open"),
+                name="Latest year",
+                hovertemplate="<b>%{x}</b><br>$%{y:.2f} per GP service (latest)<extra></extra>",
+            )
+            return fig
+
+        show_chart("national_trend", build)
         st.caption("Each dot shows the average out-of-pocket (OOP) cost per GP service for that year on the selected price basis.")
 
     st.subheader("Latest-year OOP by state/territory")
-    sw = filter_by_year(st_wide)
-    if not sw.empty:
-        ly = int(sw["Year"].max())
-        latest = sw[sw["Year"] == ly].groupby("Region", as_index=False)["_actual_mean"].mean().sort_values("_actual_mean")
-        fig2 = px.bar(latest, x="_actual_mean", y="Region", orientation="h", labels={"_actual_mean":"Cost ($)", "Region":"State/Territory"})
-        fig2 = style_bar(fig2, f"OOP by state/territory — {ly} (Actual)")
-        st.plotly_chart(fig2, use_container_width=True)
+    ly, latest = latest_by_state(st_wide, year_range)
+    if ly is not None:
+        def build():
+            fig2 = px.bar(latest, x="Value", y="Region", orientation="h", labels={"Value":"Cost ($)", "Region":"State/Territory"})
+            return style_bar(fig2, f"OOP by state/territory — {ly} (Actual)")
+
+        show_chart("latest_by_state", build)
         st.caption("Bars show the mean OOP per GP service in each state/territory for the latest year.")
     else:
         st.info("No state data in selected year range.")
 
+    export_panel(
+        "overview_national",
+        lambda: by_seifa(t8, basis, year_range, ["Aus"]),
+        "oop_national",
+    )
+
 # ---------- SEIFA ----------
 elif page == "SEIFA equity":
     st.title("SEIFA equity")
@@ -474,93 +378,135 @@ elif page == "SEIFA equity":
         """
     )
 
-    df = order_seifa(apply_state_filter(filter_by_year(t8)))
-    col_val = value_col_choice(t8, basis)
+    show_fc, fc_years = forecast_overlay_controls()
+    df = order_seifa(by_seifa(t8, basis, year_range, state_pick))
 
     if df.empty:
         st.info("No rows for current filters.")
     else:
-        fig = px.line(df.sort_values(["SEIFA","Year"]), x="Year", y=col_val, color="SEIFA", line_group="SEIFA")
-        fig.update_traces(hovertemplate="<b>%{x}</b><br>$%{y:.2f} per GP service<br>SEIFA: %{legendgroup}<extra></extra>")
-        fig = style_time_series(fig, f"OOP by SEIFA quintile ({basis})")
-        st.plotly_chart(fig, use_container_width=True)
+        def build():
+            fig = px.line(df.sort_values(["SEIFA","Year"]), x="Year", y="Value", color="SEIFA", line_group="SEIFA")
+            fig.update_traces(hovertemplate="<b>%{x}</b><br>$%{y:.2f} per GP service<br>SEIFA: %{legendgroup}<extra></extra>")
+            fig = style_time_series(fig, f"OOP by SEIFA quintile ({basis})")
+            if show_fc:
+                fig = add_forecast_overlay(fig, "Table8", fc_years)
+            return fig
+
+        show_chart("by_seifa", build, fc_years=fc_years)
         st.caption("Each dot is the yearly average OOP per GP service for that SEIFA quintile.")
+        if show_fc:
+            st.caption("Dashed lines: trend forecast for the selected states (national series when none are selected).")
+
+        pvt = seifa_gap(t8, basis, year_range, state_pick)
+        if "Gap_Q5_minus_Q1" in pvt.columns:
+            def build():
+                fig2 = px.line(pvt, x="Year", y="Gap_Q5_minus_Q1")
+                fig2.update_traces(hovertemplate="<b>%{x}</b><br>Gap: $%{y:.2f} (Q5 − Q1)<extra></extra>")
+                return style_time_series(fig2, f"Gap in OOP (Q5 − Q1), {basis}")
 
-        pvt = df.pivot_table(index="Year", columns="SEIFA", values=col_val, aggfunc="mean")
-        if set(["Q1","Q5"]).issubset(pvt.columns):
-            pvt["Gap_Q5_minus_Q1"] = pvt["Q5"] - pvt["Q1"]
-            fig2 = px.line(pvt.reset_index(), x="Year", y="Gap_Q5_minus_Q1")
-            fig2.update_traces(hovertemplate="<b>%{x}</b><br>Gap: $%{y:.2f} (Q5 − Q1)<extra></extra>")
-            fig2 = style_time_series(fig2, f"Gap in OOP (Q5 − Q1), {basis}")
             st.subheader("Equity gap (Q5 − Q1) over time")
-            st.plotly_chart(fig2, use_container_width=True)
+            show_chart("seifa_gap", build)
             st.caption("Shows the difference in OOP between Q5 (least disadvantage) and Q1 (most disadvantage) each year.")
         else:
             st.info("Need both Q1 and Q5 to compute gap.")
 
+    export_panel(
+        "seifa",
+        lambda: by_seifa(t8, basis, year_range, state_pick),
+        "oop_by_seifa",
+    )
+
 # ---------- Remoteness ----------
 elif page == "Remoteness":
     st.title("Remoteness")
     remoteness_explainer()
     st.markdown("**What you’re seeing:**  \n• OOP per service by remoteness area (Major Cities → Very Remote) over time.  \n• Latest-year comparison of remoteness areas.")
 
-    df = apply_state_filter(filter_by_year(t9))
+    show_fc, fc_years = forecast_overlay_controls()
     try:
-        col_val = value_col_choice(t9, basis)
-    except KeyError:
-        col_val = "oop_actual" if basis == "Actual" else "oop_inflation_adjusted"
-        if col_val not in t9.columns:
-            st.error("Could not find an appropriate value column for Table 9.")
-            st.stop()
+        t9_value_col(t9, basis)
+    except KeyError as e:
+        st.error(str(e).strip("'\""))
+        st.stop()
+    df = by_area(t9, basis, year_range, state_pick)
 
     if df.empty:
         st.info("No rows for current filters.")
     else:
-        fig = px.line(df.sort_values(["Area","Year"]), x="Year", y=col_val, color="Area")
-        fig.update_traces(hovertemplate="<b>%{x}</b><br>$%{y:.2f} per GP service<br>Area: %{legendgroup}<extra></extra>")
-        fig = style_time_series(fig, f"OOP by remoteness area ({basis})")
-        st.plotly_chart(fig, use_container_width=True)
+        def build():
+            fig = px.line(df.sort_values(["Area","Year"]), x="Year", y="Value", color="Area")
+            fig.update_traces(hovertemplate="<b>%{x}</b><br>$%{y:.2f} per GP service<br>Area: %{legendgroup}<extra></extra>")
+            fig = style_time_series(fig, f"OOP by remoteness area ({basis})")
+            if show_fc:
+                fig = add_forecast_overlay(fig, "Table9", fc_years)
+            return fig
+
+        show_chart("by_area", build, fc_years=fc_years)
         st.caption("Each dot is the yearly average OOP per GP service for that remoteness area.")
+        if show_fc:
+            st.caption("Dashed lines: trend forecast for the selected states (national series when none are selected).")
 
-        ly = int(df["Year"].max())
-        latest = df[df["Year"] == ly].groupby("Area", as_index=False)[col_val].mean().sort_values(col_val)
+        ly, latest = latest_by_area(t9, basis, year_range, state_pick)
         st.subheader(f"Latest-year by remoteness — {ly}")
-        fig2 = px.bar(latest, x=col_val, y="Area", orientation="h", labels={col_val:"Cost ($)", "Area":"Remoteness"})
-        fig2 = style_bar(fig2, "Latest-year remoteness")
-        st.plotly_chart(fig2, use_container_width=True)
+
+        def build():
+            fig2 = px.bar(latest, x="Value", y="Area", orientation="h", labels={"Value":"Cost ($)", "Area":"Remoteness"})
+            return style_bar(fig2, "Latest-year remoteness")
+
+        show_chart("latest_by_area", build)
         st.caption("Bars show the mean OOP per GP service for each remoteness area in the latest year.")
 
+    export_panel(
+        "remoteness",
+        lambda: by_area(t9, basis, year_range, state_pick),
+        "oop_by_remoteness",
+    )
+
 # ---------- States ----------
 elif page == "States & Territories":
     st.title("States & Territories")
     st.markdown("**What you’re seeing:**  \n• Heatmap of OOP (Actual) by state/territory across years (darker = higher).  \n• Optional line comparison for selected states.")
-    df = filter_by_year(st_wide)
+    df = filter_frame(st_wide, year_range)
     if df.empty:
         st.info("No state data in current range.")
     else:
-        pvt = df.pivot_table(index="Region", columns="Year", values="_actual_mean", aggfunc="mean")
+        pvt = state_matrix(st_wide, year_range)
         st.subheader("Heatmap (Actual)")
-        fig = px.imshow(pvt, aspect="auto", color_continuous_scale="YlOrRd", labels=dict(color="Cost ($)"))
-        fig = style_heatmap(fig, "OOP (mean of quintiles) by State/Territory × Year")
-        st.plotly_chart(fig, use_container_width=True)
+
+        def build():
+            fig = px.imshow(pvt, aspect="auto", color_continuous_scale="YlOrRd", labels=dict(color="Cost ($)"))
+            return style_heatmap(fig, "OOP (mean of quintiles) by State/Territory × Year")
+
+        show_chart("state_heatmap", build)
         st.caption("Cells show the mean OOP per GP service for each state × year (Actual prices).")
 
         opts = sorted(pvt.index.tolist())
         pick = st.multiselect("Compare states/territories", options=opts, default=opts[:3])
         if pick:
             dfc = df[df["Region"].isin(pick)]
-            fig2 = px.line(dfc.sort_values(["Region","Year"]), x="Year", y="_actual_mean", color="Region")
-            fig2.update_traces(hovertemplate="<b>%{x}</b><br>$%{y:.2f} per GP service<br>Region: %{legendgroup}<extra></extra>")
-            fig2 = style_time_series(fig2, "Comparison — OOP (Actual)")
-            st.plotly_chart(fig2, use_container_width=True)
+
+            def build():
+                fig2 = px.line(dfc.sort_values(["Region","Year"]), x="Year", y="_actual_mean", color="Region")
+                fig2.update_traces(hovertemplate="<b>%{x}</b><br>$%{y:.2f} per GP service<br>Region: %{legendgroup}<extra></extra>")
+                return style_time_series(fig2, "Comparison — OOP (Actual)")
+
+            show_chart("state_compare", build, pick=sorted(pick))
             st.caption("Each dot is the yearly mean OOP per GP service for the selected state/territory.")
 
+    export_panel(
+        "states",
+        lambda: filter_frame(st_wide, year_range)[
+            ["Year", "Region"] + [c for c in st_wide.columns if c.lower().startswith(("actual", "adjusted"))]
+        ],
+        "oop_by_state",
+    )
+
 # ---------- Predictions ----------
 elif page == "Predictions":
     st.title("Predictions — National Forecast")
     horizon = st.sidebar.slider("Forecast horizon (years)", min_value=5, max_value=40, value=20, step=1)
     try:
-        fig, fcst_df, act_df = forecast_national(t8, basis, years=horizon)
+        fig, fcst_df, act_df = forecast_national_cached(basis, horizon, _template(), DATA_VERSION)
         st.plotly_chart(fig, use_container_width=True)
 
         # quick metrics
@@ -587,12 +533,7 @@ elif page == "Predictions":
                        .style.format({"Forecast ($)": "${:,.2f}", "Lower (80%)": "${:,.2f}", "Upper (80%)": "${:,.2f}"}),
                 use_container_width=True
             )
-            st.download_button(
-                "Download forecast as CSV",
-                data=fcst_df.to_csv(index=False).encode(),
-                file_name="oop_forecast.csv",
-                mime="text/csv"
-            )
+            export_panel("forecast", lambda: fcst_df, "oop_forecast", horizon=horizon)
         else:
             st.info("No future years requested/available for forecast table.")
 
@@ -0,0 +1,169 @@
+# backtest.py — rolling-origin backtests and per-series model selection for the OOP forecasts
+#
+# For every series and model we refit at each origin (train on years [0, origin),
+# predict the next `horizon` years) and score MAPE, 80% interval coverage and
+# fit / predict wall time. Folds run across a process pool.
+#
+#   python backtest.py                         # national series, all installed models
+#   python backtest.py --scope all --select    # every State × SEIFA / remoteness series + write model_selection.json
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from forecasting import (SELECTION_FILE, SERIES_MODELS, SERIES_SPECS, available_models, fill_span,
+                         national_row, national_series_id, series_matrix)
+from oop_data import BASES, DATA_DIR, load_prepped, value_col_choice
+
+RESULTS_FILE = "backtest_results.csv"
+
+
+# ---------- series ----------
+def collect_series(t8: pd.DataFrame, t9: pd.DataFrame, scope: str = "national") -> Dict[str, np.ndarray]:
+    """series id -> yearly values (oldest first; leading/trailing missing years trimmed, interior gaps NaN)."""
+    out = {}
+    for basis in BASES:
+        col_val = value_col_choice(t8, basis)
+        out[national_series_id(basis)] = national_row(t8, col_val)[1]
+    if scope == "all":
+        for (table, group), df in zip(SERIES_SPECS, [t8, t9]):
+            for basis in BASES:
+                key_df, _, Y = series_matrix(df, ["State", group], value_col_choice(df, basis))
+                for keys, y in zip(key_df.astype(str).itertuples(index=False), Y):
+                    obs = np.flatnonzero(~np.isnan(y))
+                    if len(obs):
+                        out["|".join([table, basis, *keys])] = y[obs[0]:obs[-1] + 1]
+    return out
+
+
+def rolling_origins(n: int, min_train: int) -> List[int]:
+    """Training-window ends; every fold keeps at least one held-out year."""
+    return list(range(min_train, n)) if n > min_train else []
+
+
+# ---------- folds ----------
+def _run_fold(task):
+    series_id, y, model, origin, horizon = task
+    fit, predict = SERIES_MODELS[model]
+    # gaps keep their place on the year axis: the training span is interpolated, missing test years are not scored
+    train, last = fill_span(y[:origin])
+    test = y[origin:origin + horizon]
+    scored = ~np.isnan(test)
+    if len(train) < 2 or not scored.any():
+        return None
+    lag = origin - 1 - last
+
+    t0 = time.perf_counter()
+    params = fit(train)
+    t1 = time.perf_counter()
+    yhat, lower, upper = predict(params, lag + len(test))
+    t2 = time.perf_counter()
+
+    yhat, lower, upper = (np.asarray(a)[lag:][scored] for a in (yhat, lower, upper))
+    test = test[scored]
+    ape = np.abs(test - yhat) / np.abs(test)
+    return {
+        "series": series_id, "model": model, "origin": origin, "n_test": len(test),
+        "ape_sum": float(np.nansum(ape)), "covered": int(((test >= lower) & (test <= upper)).sum()),
+        "fit_s": t1 - t0, "predict_s": t2 - t1,
+    }
+
+
+def run_backtest(series: Dict[str, np.ndarray], models: Optional[List[str]] = None, min_train: int = 10,
+                 horizon: int = 3, workers: Optional[int] = None) -> pd.DataFrame:
+    """One row per (series, model): folds, MAPE (%), coverage (share inside the 80% band), mean fit/predict seconds."""
+    models = models or available_models()
+    tasks = [(sid, y, m, o, horizon)
+             for sid, y in series.items()
+             for m in models
+             for o in rolling_origins(len(y), min_train)]
+    if not tasks:
+        raise ValueError(f"No series longer than min_train={min_train} years")
+    if workers == 1:
+        folds = [_run_fold(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+            folds = list(pool.map(_run_fold, tasks, chunksize=chunk))
+
+    f = pd.DataFrame([r for r in folds if r is not None])
+    g = f.groupby(["series", "model"], sort=False)
+    res = pd.DataFrame({
+        "folds": g.size(),
+        "mape": g["ape_sum"].sum() / g["n_test"].sum() * 100,
+        "coverage": g["covered"].sum() / g["n_test"].sum(),
+        "fit_s": g["fit_s"].mean(),
+        "predict_s": g["predict_s"].mean(),
+    }).reset_index()
+    res["total_s"] = res["fit_s"] + res["predict_s"]
+    return res
+
+
+# ---------- selection ----------
+def select_models(results: pd.DataFrame, tolerance: float = 0.10, min_coverage: float = 0.6) -> Dict[str, str]:
+    """
+    Per series, the cheapest model (fit + predict time) whose MAPE is within `tolerance`
+    (relative) of the best MAPE and whose interval coverage is at least `min_coverage`.
+    Falls back to the most accurate model when nothing meets the coverage bar.
+    """
+    picks = {}
+    for sid, r in results.groupby("series", sort=False):
+        ok = r[(r["mape"] <= r["mape"].min() * (1 + tolerance)) & (r["coverage"] >= min_coverage)]
+        best = ok.nsmallest(1, "total_s") if not ok.empty else r.nsmallest(1, "mape")
+        picks[sid] = best["model"].iloc[0]
+    return picks
+
+
+def save_selection(picks: Dict[str, str], settings: dict, path: Optional[str] = None) -> str:
+    path = path or os.path.join(DATA_DIR, SELECTION_FILE)
+    with open(path, "w") as f:
+        json.dump({"settings": settings, "selection": picks}, f, indent=2)
+    return path
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Rolling-origin backtest of OOP forecast models.")
+    p.add_argument("--scope", choices=["national", "all"], default="national")
+    p.add_argument("--models", nargs="+", default=None, help=f"subset of {list(SERIES_MODELS)}")
+    p.add_argument("--min-train", type=int, default=10, help="years in the first training window")
+    p.add_argument("--horizon", type=int, default=3, help="years predicted per fold")
+    p.add_argument("--workers", type=int, default=None, help="process pool size (1 = run in-process)")
+    p.add_argument("--out", default=None, help=f"results CSV (default: data/{RESULTS_FILE})")
+    p.add_argument("--select", action="store_true", help=f"write per-series picks to data/{SELECTION_FILE}")
+    p.add_argument("--tolerance", type=float, default=0.10)
+    p.add_argument("--min-coverage", type=float, default=0.6)
+    args = p.parse_args(argv)
+
+    models = args.models or available_models()
+    missing = set(models) - set(available_models())
+    if missing:
+        p.error(f"model(s) not available here: {sorted(missing)}")
+
+    t8, t9, _ = load_prepped()
+    series = collect_series(t8, t9, args.scope)
+    t0 = time.perf_counter()
+    res = run_backtest(series, models, args.min_train, args.horizon, args.workers)
+    elapsed = time.perf_counter() - t0
+
+    out = args.out or os.path.join(DATA_DIR, RESULTS_FILE)
+    res.to_csv(out, index=False, float_format="%.6g")
+    summary = res.groupby("model")[["mape", "coverage", "fit_s", "predict_s"]].mean()
+    print(summary.to_string(float_format=lambda v: f"{v:.4g}"))
+    print(f"{len(series)} series × {len(models)} models in {elapsed:.2f}s -> {out}")
+
+    if args.select:
+        picks = select_models(res, args.tolerance, args.min_coverage)
+        settings = {k: getattr(args, k) for k in ("scope", "min_train", "horizon", "tolerance", "min_coverage")}
+        settings["models"] = models
+        path = save_selection(picks, settings)
+        print(pd.Series(picks).value_counts().to_string())
+        print(f"selection -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# benchmark.py — headless load / latency benchmark of the dashboard on scaled-up Table 8 / 9 data
+#
+# For each scale factor, Table 8 and Table 9 are replicated that many times (values jittered by up
+# to ±2%, same years / states / groups) into a scratch copy of data/, and a worker process drives
+# app.py through Streamlit's AppTest harness with OOP_DATA_DIR pointing at it. Every page is
+# visited under every filter combination (price basis × state selection × year range, plus the
+# forecast overlay on SEIFA / Remoteness and the horizon on Predictions); each widget change is
+# one rerun. Per rerun we record wall time, resident memory and the time spent in load_csv,
+# prep_table8 / prep_table9 / prep_states and forecast_national (via the oop_data.timed hooks).
+# --sessions replays the same sequence in fresh AppTest sessions, i.e. further analysts arriving
+# once the process-wide caches are warm.
+#
+#   python benchmark.py                                   # scales 10, 100, 1000 -> data/benchmark_results.csv
+#   python benchmark.py --scales 1 10 --sessions 3 --quick
+#   python benchmark.py --baseline last_results.csv --tolerance 0.25   # exit 1 on a latency regression
+import argparse
+import itertools
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from forecasting import FORECAST_FILE, SELECTION_FILE
+from oop_data import BASES, DATA_DIR, FILE_STATES, FILE_TABLE8, FILE_TABLE9, read_table, value_col_choice
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+RESULTS_FILE = "benchmark_results.csv"
+PAGES = ["Overview", "SEIFA equity", "Remoteness", "States & Territories", "Predictions"]
+PROBES = ["load_csv", "prep_table8", "prep_table9", "prep_states", "forecast_national"]
+SCALES = [10, 100, 1000]
+# page-level widgets and the values they start with (combinations() lists these first on each page)
+PAGE_DEFAULTS = {"overlay": False, "horizon": 20}
+JITTER = 0.02
+RANDOM_STATE = 42
+TIMEOUT = 600  # seconds per rerun
+
+
+# ---------- scaled data ----------
+def scale_table(df: pd.DataFrame, factor: int, rng: np.random.Generator) -> pd.DataFrame:
+    """df repeated `factor` times; the price columns (both bases) multiplied by 1 ± JITTER."""
+    out = df.loc[np.repeat(df.index.to_numpy(), factor)].reset_index(drop=True)
+    for col in {value_col_choice(df, b) for b in BASES}:
+        vals = pd.to_numeric(out[col], errors="coerce").to_numpy(dtype=float)
+        out[col] = np.round(vals * rng.uniform(1 - JITTER, 1 + JITTER, len(out)), 4)
+    return out
+
+
+def write_scaled_data(factor: int, dest: str, src: str = DATA_DIR, random_state: int = RANDOM_STATE) -> Dict[str, int]:
+    """A copy of data/ with Table 8 / 9 scaled by factor (states file and forecast table as they are)."""
+    os.makedirs(dest, exist_ok=True)
+    rng = np.random.default_rng(random_state)
+    rows = {}
+    for name in (FILE_TABLE8, FILE_TABLE9):
+        df = scale_table(read_table(os.path.join(src, name)), factor, rng)
+        df.to_csv(os.path.join(dest, name), index=False)
+        rows[name] = len(df)
+    for name in (FILE_STATES, FORECAST_FILE, SELECTION_FILE):
+        if os.path.exists(os.path.join(src, name)):
+            shutil.copyfile(os.path.join(src, name), os.path.join(dest, name))
+    return rows
+
+
+# ---------- driver (runs inside the worker process) ----------
+def _widget(widgets, label: str):
+    hits = [w for w in widgets if w.label == label]
+    return hits[0] if hits else None
+
+
+def combinations(at, quick: bool = False) -> List[dict]:
+    """Filter settings per page, from the widget options of a first run (states, year bounds)."""
+    states = list(_widget(at.sidebar.multiselect, "State(s)/Territories").options)
+    years = _widget(at.sidebar.slider, "Year range")
+    lo, hi = int(years.min), int(years.max)
+    state_sets = [[], states[:1], states[:3], states] if not quick else [[], states]
+    year_ranges = [(lo, hi), (max(lo, hi - 4), hi)] if not quick else [(lo, hi)]
+    out = []
+    for page in PAGES:
+        extras = [{}]
+        if page in ("SEIFA equity", "Remoteness"):
+            extras = [{"overlay": False}, {"overlay": True}]
+        elif page == "Predictions":
+            extras = [{"horizon": 20}, {"horizon": 40}] if not quick else [{"horizon": 20}]
+        for basis, picked, yr, extra in itertools.product(BASES, state_sets, year_ranges, extras):
+            out.append({"page": page, "basis": basis, "states": picked, "years": yr, **extra})
+    return out
+
+
+def apply(at, combo: dict) -> None:
+    """Set the sidebar widgets for combo; the caller's run() is the rerun being timed."""
+    _widget(at.sidebar.radio, "Page").set_value(combo["page"])
+    _widget(at.sidebar.radio, "Price basis").set_value(combo["basis"])
+    _widget(at.sidebar.multiselect, "State(s)/Territories").set_value(combo["states"])
+    _widget(at.sidebar.slider, "Year range").set_value(tuple(combo["years"]))
+    for key, label in (("overlay", "Overlay forecasts"), ("horizon", "Forecast horizon (years)")):
+        if key not in combo:
+            continue
+        w = _widget(at.sidebar.checkbox if key == "overlay" else at.sidebar.slider, label)
+        if w is not None:
+            w.set_value(combo[key])
+        elif combo[key] != PAGE_DEFAULTS[key]:  # page-level widgets appear once the page has run
+            raise RuntimeError(f"{label!r} is not on the page yet; list the default value first")
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return float("nan")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def drive(scale: int, sessions: int = 1, quick: bool = False, trace_memory: bool = False) -> List[dict]:
+    """All reruns for one scale, in this process (OOP_DATA_DIR must already point at the scaled data)."""
+    from streamlit.testing.v1 import AppTest
+
+    import oop_data
+
+    # the app's use_container_width deprecation notices would otherwise fill the log on every rerun
+    logging.getLogger("streamlit.deprecation_util").addFilter(lambda record: record.levelno >= logging.ERROR)
+
+    spent: Dict[str, List[float]] = {}
+    oop_data.TIMER = lambda name, sec: spent.setdefault(name, []).append(sec)
+    if trace_memory:
+        tracemalloc.start()
+
+    rows = []
+
+    def rerun(at, session: int, step: int, combo: dict) -> None:
+        spent.clear()
+        if trace_memory:
+            tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        at.run(timeout=TIMEOUT)
+        row = {"scale": scale, "session": session, "step": step, "page": combo.get("page", "Overview"),
+               "basis": combo.get("basis", BASES[0]), "states": ",".join(combo.get("states", [])),
+               "years": "-".join(map(str, combo.get("years", ()))),
+               "extra": ";".join(f"{k}={combo[k]}" for k in ("overlay", "horizon") if k in combo),
+               "latency_s": time.perf_counter() - t0, "rss_mb": _rss_mb(), "peak_rss_mb": _peak_rss_mb(),
+               "errors": len(at.exception) + len(at.error)}
+        if trace_memory:
+            row["py_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        for name in PROBES:
+            row[f"{name}_s"] = sum(spent.get(name, []))
+            row[f"{name}_calls"] = len(spent.get(name, []))
+        rows.append(row)
+
+    for session in range(sessions):
+        at = AppTest.from_file(APP, default_timeout=TIMEOUT)
+        rerun(at, session, 0, {"page": "(startup)"})
+        for step, combo in enumerate(combinations(at, quick), start=1):
+            apply(at, combo)
+            rerun(at, session, step, combo)
+    oop_data.TIMER = None
+    return rows
+
+
+# ---------- reporting ----------
+def summarise(results: pd.DataFrame) -> pd.DataFrame:
+    """Per scale × page: rerun count, latency median / p95 / max, probe time per rerun, peak RSS."""
+    probe_cols = [f"{n}_s" for n in PROBES]
+    g = results.groupby(["scale", "page"], sort=False)
+    out = g["latency_s"].agg(reruns="count", median_s="median", p95_s=lambda s: s.quantile(0.95), max_s="max")
+    out = out.join(g[probe_cols].mean()).join(g["peak_rss_mb"].max()).join(g["errors"].sum())
+    return out.reset_index()
+
+
+def regressions(summary: pd.DataFrame, baseline: pd.DataFrame, tolerance: float) -> pd.DataFrame:
+    """scale × page rows whose median latency grew by more than tolerance over the baseline run."""
+    base = summarise(baseline)[["scale", "page", "median_s"]]
+    m = summary.merge(base, on=["scale", "page"], suffixes=("", "_baseline"))
+    m["change"] = m["median_s"] / m["median_s_baseline"] - 1
+    return m[m["change"] > tolerance]
+
+
+def run_scale(scale: int, args) -> pd.DataFrame:
+    """Write the scaled data and drive the app in a fresh process (caches and memory start cold)."""
+    with tempfile.TemporaryDirectory(prefix=f"oop_x{scale}_") as tmp:
+        data = os.path.join(tmp, "data")
+        t0 = time.perf_counter()
+        rows = write_scaled_data(scale, data)
+        print(f"x{scale}: " + ", ".join(f"{n} {r:,} rows" for n, r in rows.items())
+              + f" ({time.perf_counter() - t0:.1f}s to write)")
+        out = os.path.join(tmp, "results.json")
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", str(scale), "--worker-out", out,
+               "--sessions", str(args.sessions)] + (["--quick"] if args.quick else []) \
+            + (["--tracemalloc"] if args.tracemalloc else [])
+        subprocess.run(cmd, check=True, env={**os.environ, "OOP_DATA_DIR": data})
+        with open(out) as f:
+            return pd.DataFrame(json.load(f))
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    p = argparse.ArgumentParser(description="Headless latency / memory benchmark of the OOP dashboard.")
+    p.add_argument("--scales", nargs="+", type=int, default=SCALES, help="row multipliers for Table 8 / 9")
+    p.add_argument("--sessions", type=int, default=1, help="fresh AppTest sessions per scale")
+    p.add_argument("--quick", action="store_true", help="fewer state / year / horizon combinations")
+    p.add_argument("--tracemalloc", action="store_true", help="also record Python heap peak per rerun (slower)")
+    p.add_argument("--out", default=None, help=f"per-rerun CSV (default: data/{RESULTS_FILE})")
+    p.add_argument("--baseline", default=None, help="earlier per-rerun CSV to compare median latency against")
+    p.add_argument("--tolerance", type=float, default=0.25, help="allowed median latency growth (0.25 = +25%%)")
+    p.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    p.add_argument("--worker-out", default=None, help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.worker is not None:
+        rows = drive(args.worker, args.sessions, args.quick, args.tracemalloc)
+        with open(args.worker_out, "w") as f:
+            json.dump(rows, f)
+        return
+
+    results = pd.concat([run_scale(s, args) for s in args.scales], ignore_index=True)
+    out = args.out or os.path.join(DATA_DIR, RESULTS_FILE)
+    results.to_csv(out, index=False, float_format="%.6g")
+    summary = summarise(results)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(summary.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"{len(results)} reruns -> {out}")
+
+    failed = int(results["errors"].sum())
+    if failed:
+        print(f"{failed} rerun(s) raised in the app", file=sys.stderr)
+    if args.baseline:
+        worse = regressions(summary, pd.read_csv(args.baseline), args.tolerance)
+        if not worse.empty:
+            print("Latency regressions:\n" + worse[["scale", "page", "median_s_baseline", "median_s", "change"]]
+                  .to_string(index=False, float_format=lambda v: f"{v:.3f}"), file=sys.stderr)
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# exports.py — lazily generated, cached CSV / Parquet extracts for the OOP dashboard pages
+#
+# An extract is only built when someone asks for it. It is written to disk in chunks
+# (CSV rows / Parquet row groups) and cached under a hash of (table, filters, format,
+# data version), so repeat downloads are served straight from the file. The cache is kept under
+# MAX_EXPORT_BYTES by evicting the least recently used extracts (hits refresh a file's mtime), so
+# extracts for old filter combinations and data versions age out.
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Iterator, List, Optional
+
+import pandas as pd
+
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".export_cache")
+CHUNK_ROWS = 50_000
+MAX_EXPORT_BYTES = 256 * 1024 * 1024
+STALE_PART_SECONDS = 3600  # leftovers of interrupted writes
+MIME = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def export_formats():
+    return ["csv", "parquet"] if parquet_available() else ["csv"]
+
+
+def filter_hash(table: str, fmt: str, filters: dict) -> str:
+    payload = json.dumps({"table": table, "fmt": fmt, "filters": filters}, default=str, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def iter_csv_chunks(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """CSV bytes, header first, `chunk_rows` rows at a time (for streaming responses)."""
+    yield df.head(0).to_csv(index=False).encode()
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=False).encode()
+
+
+def write_export(df: pd.DataFrame, path: str, fmt: str, chunk_rows: int = CHUNK_ROWS) -> str:
+    """Write df chunk by chunk to a temp file, then move it into place (readers never see half a file)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if fmt == "csv":
+                for chunk in iter_csv_chunks(df, chunk_rows):
+                    f.write(chunk)
+            elif fmt == "parquet":
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                schema = pa.Schema.from_pandas(df.head(0), preserve_index=False)
+                with pq.ParquetWriter(f, schema) as writer:
+                    for start in range(0, len(df), chunk_rows):
+                        part = df.iloc[start:start + chunk_rows]
+                        writer.write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False))
+            else:
+                raise ValueError(f"Unknown export format {fmt!r}; expected one of {list(MIME)}")
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path
+
+
+def artifact_path(table: str, fmt: str, filters: dict, export_dir: Optional[str] = None) -> str:
+    return os.path.join(export_dir or EXPORT_DIR, f"{table}-{filter_hash(table, fmt, filters)}.{fmt}")
+
+
+def cached_artifact(table: str, fmt: str, filters: dict, export_dir: Optional[str] = None) -> Optional[str]:
+    path = artifact_path(table, fmt, filters, export_dir)
+    try:
+        os.utime(path)  # mark as recently used for prune()
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def prune(export_dir: Optional[str] = None, max_bytes: int = MAX_EXPORT_BYTES, keep: Optional[str] = None) -> List[str]:
+    """Delete least recently used extracts until the cache fits in max_bytes; returns the removed paths."""
+    export_dir = export_dir or EXPORT_DIR
+    now = time.time()
+    files = []
+    for entry in os.scandir(export_dir):
+        if not entry.is_file():
+            continue
+        st = entry.stat()
+        if entry.name.endswith(".part"):
+            if now - st.st_mtime > STALE_PART_SECONDS:
+                os.remove(entry.path)
+            continue
+        files.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    removed = []
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if keep and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed.append(path)
+    return removed
+
+
+def build_artifact(table: str, fmt: str, filters: dict, make_frame: Callable[[], pd.DataFrame],
+                   export_dir: Optional[str] = None) -> str:
+    """Path of the extract for these filters; `make_frame` is only called on a cache miss."""
+    path = cached_artifact(table, fmt, filters, export_dir)
+    if path:
+        return path
+    path = write_export(make_frame(), artifact_path(table, fmt, filters, export_dir), fmt)
+    prune(export_dir, keep=path)
+    return path
+
+
+def iter_file(path: str, chunk_bytes: int = 1 << 20) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                return
+            yield block
@@ -0,0 +1,118 @@
+# figure_cache.py — server-side cache of finished (styled) Plotly figures for the OOP dashboard
+#
+# Figures are stored as compact JSON keyed by (page, chart, filters, basis, theme, data version).
+# Numeric trace arrays are rounded and down-cast (float32 / int16) before serialising; with
+# plotly >= 6 those numpy arrays are written as base64 typed arrays instead of long
+# decimal lists, which is what Streamlit ships to the browser.
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# trace attributes that hold per-point numbers
+ARRAY_ATTRS = ("x", "y", "z", "customdata")
+
+
+def data_version(paths: Iterable[str]) -> str:
+    """Cheap fingerprint of the input files (path, size, mtime) — changes whenever any file is replaced."""
+    h = hashlib.sha1()
+    for p in paths:
+        if os.path.exists(p):
+            st = os.stat(p)
+            h.update(f"{p}|{st.st_size}|{st.st_mtime_ns}".encode())
+        else:
+            h.update(f"{p}|missing".encode())
+    return h.hexdigest()[:12]
+
+
+def figure_key(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, default=str, sort_keys=True).encode()).hexdigest()
+
+
+def _compact_array(values, decimals: int):
+    try:
+        arr = np.asarray(values)
+    except (TypeError, ValueError):  # ragged / mixed
+        return values
+    if arr.dtype == object:  # e.g. nullable Int64 years
+        try:
+            arr = arr.astype(float)
+        except (TypeError, ValueError):
+            return values
+    if arr.dtype.kind in "iu":
+        if arr.size and np.iinfo(np.int16).min <= arr.min() and arr.max() <= np.iinfo(np.int16).max:
+            return arr.astype(np.int16)
+        return arr.astype(np.int32)
+    if arr.dtype.kind == "f":
+        arr = np.round(arr, decimals)
+        if np.isfinite(arr).all() and (arr == np.round(arr)).all() and np.abs(arr).max(initial=0) < 2 ** 15:
+            return arr.astype(np.int16)  # whole numbers, e.g. years that came through as float
+        return arr.astype(np.float32)
+    return values
+
+
+def compact_figure(fig: go.Figure, decimals: int = 2) -> go.Figure:
+    """Round and down-cast numeric trace arrays in place (years -> int16, dollars -> float32)."""
+    for tr in fig.data:
+        for attr in ARRAY_ATTRS:
+            v = getattr(tr, attr, None)
+            if v is None or isinstance(v, (str, dict)):
+                continue
+            # plotly skips assignments that compare equal, so clear first or the new dtype is ignored
+            setattr(tr, attr, None)
+            setattr(tr, attr, _compact_array(v, decimals))
+    return fig
+
+
+def figure_json(fig: go.Figure) -> str:
+    return pio.to_json(fig, validate=False)
+
+
+class FigureCache:
+    """Thread-safe LRU of serialised figures (Streamlit serves sessions from several threads)."""
+
+    def __init__(self, max_entries: int = 256, decimals: int = 2):
+        self.max_entries = max_entries
+        self.decimals = decimals
+        self._store: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[go.Figure]:
+        with self._lock:
+            js = self._store.get(key)
+            if js is None:
+                self.misses += 1
+                return None
+            self._store.move_to_end(key)
+            self.hits += 1
+        return go.Figure(json.loads(js), skip_invalid=True)
+
+    def put(self, key: str, fig: go.Figure) -> go.Figure:
+        js = figure_json(compact_figure(fig, self.decimals))
+        with self._lock:
+            self._store[key] = js
+            self._store.move_to_end(key)
+            while len(self._store) > self.max_entries:
+                self._store.popitem(last=False)
+        return fig
+
+    def get_or_build(self, key: str, build: Callable[[], go.Figure]) -> go.Figure:
+        fig = self.get(key)
+        return fig if fig is not None else self.put(key, build())
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = sum(len(v) for v in self._store.values())
+            return {"entries": len(self._store), "bytes": size, "hits": self.hits, "misses": self.misses}
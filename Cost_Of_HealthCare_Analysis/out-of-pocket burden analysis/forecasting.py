@@ -0,0 +1,348 @@
+# forecasting.py — batched trend forecasts for every State × SEIFA quintile and State × remoteness series
+#
+# Each series is one row of a (series × year) matrix; missing years are NaN.
+# Linear and exponential trends are fitted for all rows at once with closed-form
+# least squares, in-process: the batch is a few matrix products, so a process
+# pool only adds start-up and pickling (slower even at 25,000+ rows). The
+# iterative models (Holt, damped trend, Prophet) run per series and are only
+# used where backtest.py selected them.
+#
+#   python forecasting.py --horizon 40     # refit and write data/forecast_table.csv
+import argparse
+import json
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from oop_data import BASES, DATA_DIR, load_prepped, national_rows, value_col_choice
+
+FORECAST_FILE = "forecast_table.csv"
+DEFAULT_HORIZON = 40
+MODELS = ["linear", "exponential"]
+Z_80 = 1.28  # ~80% interval
+
+# (table name, grouping column) for every family of series we project
+SERIES_SPECS = [("Table8", "SEIFA"), ("Table9", "Area")]
+
+
+# ---------- series matrix ----------
+def series_matrix(df: pd.DataFrame, keys: List[str], col_val: str):
+    """Pivot a long frame to (keys frame, years array, values matrix) with NaN for missing years."""
+    base = df.dropna(subset=["Year"])
+    base = base.assign(Year=base["Year"].astype(int))
+    pvt = base.pivot_table(index=keys, columns="Year", values=col_val, aggfunc="mean", observed=True)
+    years = np.arange(int(pvt.columns.min()), int(pvt.columns.max()) + 1)
+    pvt = pvt.reindex(columns=years)
+    key_df = pvt.index.to_frame(index=False)
+    return key_df, years, pvt.to_numpy(dtype=float)
+
+
+def national_row(df: pd.DataFrame, col_val: str):
+    """(years, values) of the national mean as a series-matrix row: first to last observed year, NaN in gaps."""
+    base = national_rows(df).dropna(subset=["Year", col_val])
+    if base.empty:
+        return np.zeros(0, dtype=int), np.zeros(0)
+    _, years, Y = series_matrix(base.assign(Series="national"), ["Series"], col_val)
+    return years, Y[0]
+
+
+# ---------- closed-form batched fits ----------
+def fit_linear_batch(Y: np.ndarray):
+    """Least-squares line per row of Y (NaN = missing). Returns slope, intercept, resid std, last observed t."""
+    t = np.arange(Y.shape[1], dtype=float)
+    W = ~np.isnan(Y)
+    Yz = np.where(W, Y, 0.0)
+    n = W.sum(axis=1).astype(float)
+    sx = W @ t
+    sxx = W @ (t * t)
+    sy = Yz.sum(axis=1)
+    sxy = Yz @ t
+    with np.errstate(divide="ignore", invalid="ignore"):
+        den = n * sxx - sx * sx
+        slope = np.where(den > 0, (n * sxy - sx * sy) / den, 0.0)
+        intercept = (sy - slope * sx) / n
+        fitted = intercept[:, None] + slope[:, None] * t[None, :]
+        resid = np.where(W, Y - fitted, 0.0)
+        s = np.sqrt((resid * resid).sum(axis=1) / n)
+    last = np.where(W.any(axis=1), Y.shape[1] - 1 - np.argmax(W[:, ::-1], axis=1), -1)
+    return slope, intercept, s, last
+
+
+def forecast_batch(Y: np.ndarray, horizon: int, model: str = "linear"):
+    """
+    Project every row of Y `horizon` steps past the last column.
+    Intervals widen with √(1+h), h = steps past each series' last observation.
+    Returns (yhat, lower, upper), each shaped (n_series, horizon).
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model {model!r}; expected one of {MODELS}")
+    if model == "exponential":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            Yfit = np.where(Y > 0, np.log(Y), np.nan)
+    else:
+        Yfit = Y
+
+    slope, intercept, s, last = fit_linear_batch(Yfit)
+    return _project(slope, intercept, s, last, Y.shape[1], horizon, model)
+
+
+def _project(slope, intercept, s, last, n_obs: int, horizon: int, model: str):
+    tf = np.arange(n_obs, n_obs + horizon, dtype=float)
+    yhat = intercept[:, None] + slope[:, None] * tf[None, :]
+    h = np.clip(tf[None, :] - last[:, None], 0, None)
+    band = Z_80 * s[:, None] * np.sqrt(1 + h)
+    lower, upper = yhat - band, yhat + band
+
+    if model == "exponential":
+        yhat, lower, upper = np.exp(yhat), np.exp(lower), np.exp(upper)
+    return yhat, lower, upper
+
+
+# ---------- single-series models (backtested in backtest.py) ----------
+# Each model is a (fit, predict) pair: fit(y) -> params, predict(params, horizon) -> (yhat, lower, upper).
+def fit_trend(y: np.ndarray, model: str = "linear"):
+    y = np.asarray(y, dtype=float)[None, :]
+    if model == "exponential":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            y = np.where(y > 0, np.log(y), np.nan)
+    slope, intercept, s, last = fit_linear_batch(y)
+    return {"model": model, "n": y.shape[1], "slope": slope, "intercept": intercept, "s": s, "last": last}
+
+
+def predict_trend(params, horizon: int):
+    p = params
+    yhat, lower, upper = _project(p["slope"], p["intercept"], p["s"], p["last"], p["n"], horizon, p["model"])
+    return yhat[0], lower[0], upper[0]
+
+
+def _holt_sse(y, alpha, beta, phi):
+    level, trend = y[0], y[1] - y[0]
+    sse = 0.0
+    for v in y[1:]:
+        pred = level + phi * trend
+        err = v - pred
+        sse += err * err
+        new_level = pred + alpha * err
+        trend = phi * trend + alpha * beta * err
+        level = new_level
+    return sse, level, trend
+
+
+def fit_holt(y: np.ndarray, phi: float = 1.0):
+    """ETS(A,A,N) (phi=1) or damped ETS(A,Ad,N); smoothing weights picked by a coarse grid on one-step SSE."""
+    y = np.asarray(y, dtype=float)
+    grid = np.linspace(0.1, 0.9, 9)
+    best = None
+    for a in grid:
+        for b in grid:
+            sse, level, trend = _holt_sse(y, a, b, phi)
+            if best is None or sse < best[0]:
+                best = (sse, a, b, level, trend)
+    sse, a, b, level, trend = best
+    return {"alpha": a, "beta": b, "phi": phi, "level": level, "trend": trend,
+            "sigma": np.sqrt(sse / max(len(y) - 1, 1))}
+
+
+def predict_holt(params, horizon: int):
+    a, b, phi = params["alpha"], params["beta"], params["phi"]
+    steps = np.arange(1, horizon + 1)
+    damp = np.cumsum(phi ** steps)  # phi + phi^2 + ... + phi^h
+    yhat = params["level"] + damp * params["trend"]
+    # var(h) = sigma^2 * (1 + sum_{j<h} c_j^2), c_j = alpha * (1 + beta * (phi + ... + phi^j))
+    c = a * (1 + b * damp)
+    var = params["sigma"] ** 2 * (1 + np.concatenate([[0.0], np.cumsum(c * c)[:-1]]))
+    band = Z_80 * np.sqrt(var)
+    return yhat, yhat - band, yhat + band
+
+
+def fit_prophet(y: np.ndarray):
+    from prophet import Prophet
+    ts = pd.DataFrame({"ds": pd.date_range("2000-01-01", periods=len(y), freq="YS"), "y": y})
+    m = Prophet(interval_width=0.8, yearly_seasonality=False)
+    m.fit(ts)
+    return {"m": m}
+
+
+def predict_prophet(params, horizon: int):
+    m = params["m"]
+    future = m.make_future_dataframe(periods=horizon, freq="YS").tail(horizon)
+    fc = m.predict(future)
+    return fc["yhat"].to_numpy(), fc["yhat_lower"].to_numpy(), fc["yhat_upper"].to_numpy()
+
+
+SERIES_MODELS = {
+    "linear":      (lambda y: fit_trend(y, "linear"), predict_trend),
+    "exponential": (lambda y: fit_trend(y, "exponential"), predict_trend),
+    "holt":        (fit_holt, predict_holt),
+    "damped":      (lambda y: fit_holt(y, phi=0.9), predict_holt),
+    "prophet":     (fit_prophet, predict_prophet),
+}
+
+
+def available_models() -> List[str]:
+    names = [m for m in SERIES_MODELS if m != "prophet"]
+    try:
+        import prophet  # noqa: F401
+        names.append("prophet")
+    except ImportError:
+        pass
+    return names
+
+
+def forecast_one(y: np.ndarray, horizon: int, model: str = "linear"):
+    fit, predict = SERIES_MODELS[model]
+    return predict(fit(np.asarray(y, dtype=float)), horizon)
+
+
+def fill_span(y: np.ndarray):
+    """
+    A series-matrix row ready for the per-series models, which need evenly spaced years:
+    leading/trailing NaN trimmed, interior gaps linearly interpolated. Returns (values, index of last observation).
+    """
+    y = np.asarray(y, dtype=float)
+    obs = np.flatnonzero(~np.isnan(y))
+    if not len(obs):
+        return y[:0], -1
+    span = y[obs[0]:obs[-1] + 1]
+    t = np.arange(len(span))
+    ok = ~np.isnan(span)
+    return np.interp(t, t[ok], span[ok]), int(obs[-1])
+
+
+def forecast_row(y: np.ndarray, horizon: int, model: str = "linear"):
+    """
+    forecast_one for a series-matrix row: the `horizon` years after the matrix's last column,
+    projected from the series' own last observed year (so a series that ends early is not shifted).
+    """
+    span, last = fill_span(y)
+    if len(span) < 2:
+        return tuple(np.full(horizon, np.nan) for _ in range(3))
+    lag = len(y) - 1 - last
+    return tuple(np.asarray(p)[lag:] for p in forecast_one(span, lag + horizon, model))
+
+
+def forecast_frame(ts: pd.DataFrame, horizon: int, model: str) -> pd.DataFrame:
+    """
+    ds/yhat/yhat_lower/yhat_upper frame (history = observed y) in the shape forecast_national plots.
+    Years missing from ts are gaps on the year axis, filled as forecast_row does.
+    """
+    years = ts["ds"].dt.year.to_numpy()
+    y = pd.Series(ts["y"].to_numpy(dtype=float), index=years).reindex(np.arange(years.min(), years.max() + 1))
+    yhat, lower, upper = forecast_row(y.to_numpy(), horizon, model)
+    last = ts["ds"].max()
+    fut = pd.DataFrame({
+        "ds": pd.to_datetime([f"{last.year + h}" for h in range(1, horizon + 1)], format="%Y"),
+        "yhat": yhat, "yhat_lower": lower, "yhat_upper": upper,
+    })
+    hist = pd.DataFrame({"ds": ts["ds"].to_numpy(), "yhat": ts["y"].to_numpy(),
+                         "yhat_lower": ts["y"].to_numpy(), "yhat_upper": ts["y"].to_numpy()})
+    return pd.concat([hist, fut], ignore_index=True)
+
+
+# ---------- per-series model selection (written by backtest.py) ----------
+SELECTION_FILE = "model_selection.json"
+
+
+def national_series_id(basis: str) -> str:
+    return f"Table8|{basis}|national"
+
+
+def load_model_selection(path: Optional[str] = None) -> dict:
+    path = path or os.path.join(DATA_DIR, SELECTION_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("selection", {})
+
+
+def selected_model(series_id: str, default: Optional[str] = None, selection: Optional[dict] = None) -> Optional[str]:
+    selection = load_model_selection() if selection is None else selection
+    model = selection.get(series_id, default)
+    return model if model in available_models() else default
+
+
+# ---------- forecast table ----------
+def forecast_series(df: pd.DataFrame, keys: List[str], col_val: str, horizon: int = DEFAULT_HORIZON,
+                    model: str = "linear", id_prefix: str = "") -> pd.DataFrame:
+    """
+    Forecast every `keys` group of df; long frame with keys + Year, Value, Lower, Upper, Model.
+    model="auto" looks each series up in the backtest selection ("<id_prefix>|<key>|<key>", default linear).
+    """
+    key_df, years, Y = series_matrix(df, keys, col_val)
+    n = len(key_df)
+    if model == "auto":
+        selection = load_model_selection()
+        ids = key_df.astype(str).apply(lambda r: "|".join([id_prefix, *r]), axis=1)
+        models = np.array([selected_model(i, "linear", selection) for i in ids], dtype=object)
+    else:
+        models = np.full(n, model, dtype=object)
+
+    yhat, lower, upper = (np.full((n, horizon), np.nan) for _ in range(3))
+    for m in pd.unique(models):
+        idx = np.flatnonzero(models == m)
+        if m in MODELS:  # closed form -> one batched fit
+            parts = forecast_batch(Y[idx], horizon, m)
+        else:
+            parts = zip(*[forecast_row(Y[i], horizon, m) for i in idx])
+        for out, part in zip((yhat, lower, upper), parts):
+            out[idx] = np.asarray(part)
+    fut_years = np.arange(years[-1] + 1, years[-1] + 1 + horizon)
+
+    out = key_df.loc[np.repeat(np.arange(n), horizon)].reset_index(drop=True)
+    out["Year"] = np.tile(fut_years, n)
+    out["Value"] = yhat.ravel()
+    out["Lower"] = lower.ravel()
+    out["Upper"] = upper.ravel()
+    out["Model"] = np.repeat(models, horizon)
+    return out
+
+
+def build_forecast_table(t8: pd.DataFrame, t9: pd.DataFrame, horizon: int = DEFAULT_HORIZON,
+                         model: str = "linear") -> pd.DataFrame:
+    """All State × SEIFA (Table 8) and State × Area (Table 9) series, both price bases."""
+    frames = []
+    for (table, group), df in zip(SERIES_SPECS, [t8, t9]):
+        for basis in BASES:
+            fc = forecast_series(df, ["State", group], value_col_choice(df, basis), horizon, model,
+                                 id_prefix=f"{table}|{basis}")
+            fc = fc.rename(columns={group: "Group"})
+            fc.insert(0, "Basis", basis)
+            fc.insert(0, "Table", table)
+            frames.append(fc)
+    return pd.concat(frames, ignore_index=True)
+
+
+def save_forecast_table(fc: pd.DataFrame, path: Optional[str] = None) -> str:
+    path = path or os.path.join(DATA_DIR, FORECAST_FILE)
+    fc.to_csv(path, index=False, float_format="%.4f")
+    return path
+
+
+def load_forecast_table(path: Optional[str] = None) -> Optional[pd.DataFrame]:
+    path = path or os.path.join(DATA_DIR, FORECAST_FILE)
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Refit State × SEIFA / remoteness OOP forecasts.")
+    p.add_argument("--horizon", type=int, default=DEFAULT_HORIZON)
+    p.add_argument("--model", choices=MODELS + ["auto"], default="linear",
+                   help="auto = per-series model picked by backtest.py --select")
+    p.add_argument("--out", default=None, help=f"output CSV (default: data/{FORECAST_FILE})")
+    args = p.parse_args(argv)
+
+    t0 = time.perf_counter()
+    t8, t9, _ = load_prepped()
+    fc = build_forecast_table(t8, t9, args.horizon, args.model)
+    path = save_forecast_table(fc, args.out)
+    n_series = fc.groupby(["Table", "Basis", "State", "Group"]).ngroups
+    print(f"{n_series} series × {args.horizon} years -> {path} ({time.perf_counter() - t0:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# oop_api.py — small async JSON API over oop_queries (no web framework needed)
+#
+#   python oop_api.py --port 8765
+#   curl 'http://127.0.0.1:8765/seifa/gap?basis=Actual&from=2010&to=2023&states=NSW,Vic'
+#
+# GET only. Responses are cached in memory per (data version, path, query) and carry an ETag
+# derived from the same key, so clients revalidating with If-None-Match get a 304 without the
+# query being run. The data version is the size/mtime fingerprint of the input CSVs; when a file
+# is replaced the tables are reloaded and the cache starts over.
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from figure_cache import data_version
+from forecasting import FORECAST_FILE, SELECTION_FILE, build_forecast_table, load_forecast_table
+from oop_data import BASES, FILE_STATES, FILE_TABLE8, FILE_TABLE9, load_prepped, safe_path
+from oop_queries import (by_area, by_seifa, headline, latest_by_area, latest_by_state, national_forecast,
+                         national_trend, seifa_gap, series_forecast, state_matrix)
+
+WATCHED = [safe_path(f) for f in (FILE_TABLE8, FILE_TABLE9, FILE_STATES, FORECAST_FILE, SELECTION_FILE)]
+MAX_CACHE = 512
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+
+# ---------- data ----------
+class Tables:
+    """The prepped OOP tables for one data version (reloaded when the inputs change)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.reload_if_changed()
+
+    def reload_if_changed(self) -> bool:
+        v = data_version(WATCHED)
+        if v == self.version:
+            return False
+        with self._lock:
+            if v != self.version:
+                self.t8, self.t9, self.st_wide = load_prepped()
+                fc = load_forecast_table()
+                self.forecasts = fc if fc is not None else build_forecast_table(self.t8, self.t9)
+                self.version = v
+        return True
+
+
+# ---------- parameters ----------
+def _basis(q) -> str:
+    b = q.get("basis", "Actual")
+    if b not in BASES:
+        raise ValueError(f"basis must be one of {BASES}")
+    return b
+
+
+def _years(q):
+    if "from" not in q and "to" not in q:
+        return None
+    return int(q.get("from", 0)), int(q.get("to", 9999))
+
+
+def _states(q):
+    return [s for s in q.get("states", "").split(",") if s] or None
+
+
+def records(df: pd.DataFrame) -> list:
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict(orient="records")
+
+
+def _latest(pair):
+    year, df = pair
+    return {"year": year, "rows": records(df)}
+
+
+def _matrix(pvt: pd.DataFrame):
+    return {"regions": list(pvt.index), "years": [int(c) for c in pvt.columns],
+            "values": pvt.astype(object).where(pvt.notna(), None).values.tolist()}
+
+
+def _headline(d: Tables, q):
+    h = headline(d.t8, _basis(q), _years(q))
+    return h and {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in h.items()}
+
+
+def _national_forecast(d: Tables, q):
+    fc, act, model = national_forecast(d.t8, _basis(q), int(q.get("horizon", 20)))
+    return {"model": model, "forecast": records(fc), "actual": records(act)}
+
+
+ROUTES = {
+    "/version":           lambda d, q: {"version": d.version},
+    "/national":          lambda d, q: records(national_trend(d.t8, _basis(q), _years(q))),
+    "/headline":          _headline,
+    "/seifa":             lambda d, q: records(by_seifa(d.t8, _basis(q), _years(q), _states(q))),
+    "/seifa/gap":         lambda d, q: records(seifa_gap(d.t8, _basis(q), _years(q), _states(q))),
+    "/remoteness":        lambda d, q: records(by_area(d.t9, _basis(q), _years(q), _states(q))),
+    "/remoteness/latest": lambda d, q: _latest(latest_by_area(d.t9, _basis(q), _years(q), _states(q))),
+    "/states/latest":     lambda d, q: _latest(latest_by_state(d.st_wide, _years(q))),
+    "/states/matrix":     lambda d, q: _matrix(state_matrix(d.st_wide, _years(q))),
+    "/forecast/national": _national_forecast,
+    "/forecast/series":   lambda d, q: records(series_forecast(
+        d.forecasts, q.get("table", "Table8"), _basis(q), _states(q),
+        int(q["years"]) if "years" in q else None)),
+}
+
+
+def _json_default(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"{type(o).__name__} is not JSON serialisable")
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, default=_json_default, separators=(",", ":")).encode()
+
+
+# ---------- server ----------
+class QueryServer:
+    def __init__(self, tables: Optional[Tables] = None, max_cache: int = MAX_CACHE):
+        self.tables = tables or Tables()
+        self.max_cache = max_cache
+        self.cache: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def _etag(self, path: str, query: dict) -> str:
+        key = json.dumps([self.tables.version, path, sorted(query.items())])
+        return '"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+    async def respond(self, method: str, target: str, headers: dict):
+        if method not in ("GET", "HEAD"):
+            return 405, {}, _dumps({"error": "GET only"})
+        url = urlsplit(target)
+        route = ROUTES.get(url.path.rstrip("/") or "/")
+        if route is None:
+            return 404, {}, _dumps({"error": f"unknown path {url.path}", "paths": sorted(ROUTES)})
+
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, self.tables.reload_if_changed):
+            self.cache.clear()
+
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        etag = self._etag(url.path, query)
+        extra = {"ETag": etag, "Cache-Control": "no-cache", "X-Data-Version": self.tables.version}
+        if etag in [t.strip() for t in headers.get("if-none-match", "").split(",")]:
+            return 304, extra, b""
+
+        body = self.cache.get(etag)
+        if body is None:
+            try:
+                body = await loop.run_in_executor(None, lambda: _dumps(route(self.tables, query)))
+            except (KeyError, ValueError) as e:
+                return 400, {}, _dumps({"error": str(e)})
+            self.cache[etag] = body
+            while len(self.cache) > self.max_cache:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(etag)
+        return 200, extra, body
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:  # keep-alive: serve requests until the client closes
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, _ = line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+
+                try:
+                    status, extra, body = await self.respond(method, target, headers)
+                except Exception as e:  # keep the connection handler alive
+                    status, extra, body = 500, {}, _dumps({"error": str(e)})
+                head = [f"HTTP/1.1 {status} {REASONS[status]}",
+                        "Content-Type: application/json",
+                        f"Content-Length: {len(body)}"]
+                head += [f"{k}: {v}" for k, v in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765):
+    app = QueryServer()
+    server = await asyncio.start_server(app.handle, host, port)
+    print(f"OOP query API on http://{host}:{port} (data version {app.tables.version})")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Async JSON API over the out-of-pocket datasets.")
+    p.add_argument("--host", default=os.environ.get("OOP_API_HOST", "127.0.0.1"))
+    p.add_argument("--port", type=int, default=int(os.environ.get("OOP_API_PORT", 8765)))
+    args = p.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# oop_data.py — shared loading / schema helpers for the OOP dashboard and its batch jobs
+import functools
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+# OOP_DATA_DIR points the dashboard and batch jobs at another copy of data/ (benchmark.py uses scaled-up CSVs)
+DATA_DIR = os.environ.get("OOP_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# CSVs go through the shared cache in Cost_Of_HealthCare_Analysis/data_catalog.py when this folder
+# sits in the repo; a standalone copy of the dashboard falls back to plain pandas.
+try:
+    sys.path.append(next(str(p) for p in Path(__file__).resolve().parents if (p / "data_catalog.py").exists()))
+    from data_catalog import read_csv as _read_csv
+    SHARED_CACHE = True
+except (StopIteration, ImportError):
+    _read_csv = pd.read_csv
+    SHARED_CACHE = False
+
+FILE_TABLE8 = "Table8_GP_Out_of_Pocket_Clean_YearFixed (1).csv"
+FILE_TABLE9 = "Table9_Remoteness_Out_of_Pocket_Clean (1) (1).csv"
+FILE_STATES = "Out_of_pocket_costs_by_states&territories_2003_2023.csv"
+
+BASES = ["Actual", "Inflation adjusted"]
+
+# helpers to keep category order consistent everywhere
+SEIFA_ORDER = ["Q1", "Q2", "Q3", "Q4", "Q5"]
+AREA_ORDER  = ["Major Cities", "Inner Regional", "Outer Regional", "Remote", "Very Remote"]
+
+# ---------- timing hooks ----------
+# benchmark.py sets TIMER to a callable(name, seconds); while it is None a timed function costs one extra call.
+TIMER: Optional[Callable[[str, float], None]] = None
+
+def timed(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if TIMER is None:
+            return fn(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            TIMER(fn.__name__, time.perf_counter() - t0)
+    return wrapper
+
+# ---------- helpers ----------
+def find_one(patterns: List[str], columns: List[str], required=True, default: Optional[str]=None) -> Optional[str]:
+    for pat in patterns:
+        rx = re.compile(pat, re.I)
+        for c in columns:
+            if rx.search(str(c)):
+                return c
+    if required:
+        raise KeyError(f"Could not find any column matching: {patterns} in {list(columns)}")
+    return default
+
+def yearify(series: pd.Series) -> pd.Series:
+    return (
+        pd.to_numeric(
+            series.astype(str).str.extract(r"(\d{4})", expand=False),
+            errors="coerce",
+        ).astype("Int64")
+    )
+
+def safe_path(name): return os.path.join(DATA_DIR, name)
+
+def read_table(path) -> pd.DataFrame:
+    df = _read_csv(path)
+    df.columns = [c.strip() for c in df.columns]
+    return df
+
+def value_col_choice(df: pd.DataFrame, basis: str) -> str:
+    cols = list(df.columns)
+    if basis == "Actual":
+        return find_one(
+            [r"actual.*(cost|price)", r"\bactual\b", r"oop.*actual", r"value|amount|price"],
+            cols, required=True
+        )
+    else:  # Inflation adjusted
+        return find_one(
+            [r"inflation.*adjust", r"adjust(ed|ment)", r"\bcpi\b", r"inflation.*price"],
+            cols, required=True
+        )
+
+def seifa_standardize_label(s: str) -> str:
+    t = str(s).strip().lower()
+    mapping = {"quintile 1": "Q1", "quintile 2": "Q2", "quintile 3": "Q3", "quintile 4": "Q4", "quintile 5": "Q5"}
+    for k, v in mapping.items():
+        if k in t:
+            return v
+    m = re.search(r"\b([1-5])\b", t)
+    return f"Q{m.group(1)}" if m else s
+
+def area_standardize_label(s: str) -> str:
+    t = str(s).strip().lower()
+    t = t.replace("majorcities", "major cities")
+    t = t.replace("innerregional", "inner regional")
+    t = t.replace("outerregional", "outer regional")
+    t = t.replace("veryremote", "very remote")
+    return t.title()
+
+def order_seifa(df, col="SEIFA"):
+    if col in df.columns:
+        df[col] = pd.Categorical(df[col], categories=SEIFA_ORDER, ordered=True)
+    return df
+
+def order_area(df, col="Area"):
+    if col in df.columns:
+        df[col] = pd.Categorical(df[col], categories=AREA_ORDER, ordered=True)
+    return df
+
+# ---------- normalize schemas ----------
+@timed
+def prep_table8(df: pd.DataFrame) -> pd.DataFrame:
+    y = find_one([r"^year$", r"service[_\s]*year", r"\bdate\b"], df.columns)
+    s = find_one([r"^state$", r"jurisdiction"], df.columns)
+    q = find_one([r"seifa.*quintile", r"\bquintile\b"], df.columns)
+    df = df.copy()
+    df["Year"] = yearify(df[y])
+    df["State"] = df[s].astype(str)
+    df["SEIFA"] = df[q].map(seifa_standardize_label)
+    return df
+
+@timed
+def prep_table9(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    y = find_one([r"^year$", r"service[_\s]*year"], df.columns, required=False)
+    if not y and "service_year" in df.columns: y = "service_year"
+    s = find_one([r"^state$", r"jurisdiction"], df.columns, required=False) or "state"
+    a = find_one([r"remoteness|aria|ra\s*category|area"], df.columns)
+    df["Year"] = yearify(df[y]) if y else pd.NA
+    df["State"] = df[s].astype(str)
+    df["Area"] = df[a].map(area_standardize_label)
+    return df
+
+@timed
+def prep_states(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    y = find_one([r"^year$"], df.columns)
+    r = find_one([r"^region$|^state$|jurisdiction"], df.columns)
+    df["Year"] = yearify(df[y])
+    actual_cols = [c for c in df.columns if re.fullmatch(r"actual[1-5]", c.lower())]
+    if not actual_cols:
+        actual_cols = [find_one([r"actual.*(price|cost)|\bactual\b"], df.columns)]
+    df["_actual_mean"] = df[actual_cols].apply(pd.to_numeric, errors="coerce").mean(axis=1)
+    return df.rename(columns={r: "Region"})
+
+def national_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """The rows the national mean is taken over: the "Aus" rows when present, else all rows."""
+    aus = df[df["State"].astype(str).str.fullmatch("Aus", case=False, na=False)]
+    return df if aus.empty else aus
+
+
+def national_series(df: pd.DataFrame, col_val: str) -> pd.DataFrame:
+    """Yearly national mean over the observed years (see forecasting.national_row for the full year axis)."""
+    return national_rows(df).groupby("Year", as_index=False)[col_val].mean().dropna().sort_values("Year")
+
+def load_prepped(data_dir: Optional[str] = None):
+    """Read and normalise Table 8, Table 9 and the states file (outside Streamlit)."""
+    d = data_dir or DATA_DIR
+    t8 = prep_table8(read_table(os.path.join(d, FILE_TABLE8)))
+    t9 = prep_table9(read_table(os.path.join(d, FILE_TABLE9)))
+    st_wide = prep_states(read_table(os.path.join(d, FILE_STATES)))
+    return t8, t9, st_wide
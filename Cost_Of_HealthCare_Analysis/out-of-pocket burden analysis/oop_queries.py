@@ -0,0 +1,162 @@
+# oop_queries.py — the dashboard's numbers as plain functions over the prepped tables
+#
+# Everything the Streamlit pages show (national mean, Q5 − Q1 gap, latest year by state /
+# remoteness, forecasts) is computed here, so app.py, oop_api.py and batch jobs share one engine.
+# Inputs are the frames from oop_data.load_prepped(); nothing here imports Streamlit.
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from forecasting import forecast_frame, national_row, national_series_id, selected_model
+from oop_data import value_col_choice
+
+YearRange = Optional[Tuple[int, int]]
+
+
+def filter_frame(df: pd.DataFrame, year_range: YearRange = None, states: Optional[Sequence[str]] = None,
+                 state_col: str = "State") -> pd.DataFrame:
+    """Year-range / state filter (rows with no year are dropped when a range is given)."""
+    mask = pd.Series(True, index=df.index)
+    if year_range and "Year" in df.columns:
+        mask &= df["Year"].notna() & df["Year"].between(year_range[0], year_range[1])
+    if states and state_col in df.columns:
+        mask &= df[state_col].isin(list(states))
+    return df.loc[mask]
+
+
+def t9_value_col(t9: pd.DataFrame, basis: str) -> str:
+    try:
+        return value_col_choice(t9, basis)
+    except KeyError:
+        col = "oop_actual" if basis == "Actual" else "oop_inflation_adjusted"
+        if col not in t9.columns:
+            raise KeyError("Could not find an appropriate value column for Table 9.")
+        return col
+
+
+# ---------- Overview ----------
+def national_trend(t8: pd.DataFrame, basis: str, year_range: YearRange = None) -> pd.DataFrame:
+    """Year, Value — national mean OOP per GP service; years missing inside the range are NaN."""
+    col_val = value_col_choice(t8, basis)
+    years, y = national_row(filter_frame(t8, year_range), col_val)
+    return pd.DataFrame({"Year": years, "Value": y})
+
+
+def seifa_gap(t8: pd.DataFrame, basis: str, year_range: YearRange = None,
+              states: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Year × quintile mean, plus Gap_Q5_minus_Q1 when both ends are present."""
+    col_val = value_col_choice(t8, basis)
+    df = filter_frame(t8, year_range, states)
+    pvt = df.pivot_table(index="Year", columns="SEIFA", values=col_val, aggfunc="mean", observed=True)
+    pvt.columns = [str(c) for c in pvt.columns]
+    if {"Q1", "Q5"}.issubset(pvt.columns):
+        pvt["Gap_Q5_minus_Q1"] = pvt["Q5"] - pvt["Q1"]
+    return pvt.reset_index()
+
+
+def headline(t8: pd.DataFrame, basis: str, year_range: YearRange = None) -> Optional[dict]:
+    """Latest national value, YoY % change and the national Q5 − Q1 gap for that year."""
+    trend = national_trend(t8, basis, year_range)
+    if trend.empty:
+        return None
+    latest_year = int(trend["Year"].iloc[-1])
+    latest_val = float(trend["Value"].iloc[-1])
+    prev = trend.loc[trend["Year"] == latest_year - 1, "Value"].dropna()
+    yoy = (latest_val - float(prev.iloc[0])) / float(prev.iloc[0]) * 100 if not prev.empty else 0.0
+
+    gap = seifa_gap(t8, basis, year_range, ["Aus"])
+    row = gap[gap["Year"] == latest_year]
+    gap_latest = float(row["Gap_Q5_minus_Q1"].iloc[0]) if "Gap_Q5_minus_Q1" in gap and not row.empty else float("nan")
+    return {"basis": basis, "latest_year": latest_year, "latest_value": latest_val,
+            "yoy_pct": yoy, "equity_gap": gap_latest}
+
+
+def latest_by_state(st_wide: pd.DataFrame, year_range: YearRange = None) -> Tuple[Optional[int], pd.DataFrame]:
+    """(latest year, Region / Value sorted ascending) from the states file (Actual prices)."""
+    sw = filter_frame(st_wide, year_range)
+    if sw.empty:
+        return None, pd.DataFrame(columns=["Region", "Value"])
+    ly = int(sw["Year"].max())
+    latest = (sw[sw["Year"] == ly].groupby("Region", as_index=False)["_actual_mean"].mean()
+              .rename(columns={"_actual_mean": "Value"}).sort_values("Value"))
+    return ly, latest.reset_index(drop=True)
+
+
+# ---------- SEIFA / Remoteness ----------
+def by_seifa(t8: pd.DataFrame, basis: str, year_range: YearRange = None,
+             states: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Year, State, SEIFA, Value rows after filters."""
+    col_val = value_col_choice(t8, basis)
+    df = filter_frame(t8, year_range, states)
+    return df[["Year", "State", "SEIFA", col_val]].rename(columns={col_val: "Value"}).reset_index(drop=True)
+
+
+def by_area(t9: pd.DataFrame, basis: str, year_range: YearRange = None,
+            states: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Year, State, Area, Value rows after filters."""
+    col_val = t9_value_col(t9, basis)
+    df = filter_frame(t9, year_range, states)
+    return df[["Year", "State", "Area", col_val]].rename(columns={col_val: "Value"}).reset_index(drop=True)
+
+
+def latest_by_area(t9: pd.DataFrame, basis: str, year_range: YearRange = None,
+                   states: Optional[Sequence[str]] = None) -> Tuple[Optional[int], pd.DataFrame]:
+    df = by_area(t9, basis, year_range, states)
+    if df.empty:
+        return None, pd.DataFrame(columns=["Area", "Value"])
+    ly = int(df["Year"].max())
+    latest = df[df["Year"] == ly].groupby("Area", as_index=False)["Value"].mean().sort_values("Value")
+    return ly, latest.reset_index(drop=True)
+
+
+# ---------- States ----------
+def state_matrix(st_wide: pd.DataFrame, year_range: YearRange = None) -> pd.DataFrame:
+    """Region × Year mean of quintiles (Actual)."""
+    return filter_frame(st_wide, year_range).pivot_table(index="Region", columns="Year",
+                                                          values="_actual_mean", aggfunc="mean")
+
+
+# ---------- forecasts ----------
+def national_forecast(t8: pd.DataFrame, basis: str, horizon: int = 20):
+    """
+    (forecast_df[Year, Value, Lower, Upper], actual_df[Year, Value], model name).
+    Model: the backtest selection if any, else Prophet if installed, else the √h-widened linear trend.
+    """
+    col_val = value_col_choice(t8, basis)
+    years, y = national_row(t8, col_val)
+    ts = pd.DataFrame({"ds": pd.to_datetime(years.astype(str), format="%Y"), "y": y}).dropna(subset=["y"])
+    last_year = int(years[-1])
+
+    model = selected_model(national_series_id(basis))
+    fc = None
+    if not model:
+        try:
+            from prophet import Prophet
+            m = Prophet(interval_width=0.8, yearly_seasonality=False)
+            m.fit(ts)
+            future = m.make_future_dataframe(periods=horizon, freq="YS")
+            fc = m.predict(future)[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+            model = "prophet"
+        except Exception:
+            model = "linear"
+    if fc is None:
+        # gaps stay on the year axis (forecast_row), as for the State / SEIFA / Area series
+        fc = forecast_frame(ts, horizon, model)
+
+    fc = fc.assign(Year=fc["ds"].dt.year)
+    act = fc[fc["Year"] <= last_year]
+    fut = fc[fc["Year"] > last_year]
+    forecast_df = fut.rename(columns={"yhat": "Value", "yhat_lower": "Lower", "yhat_upper": "Upper"})
+    forecast_df = forecast_df[["Year", "Value", "Lower", "Upper"]].reset_index(drop=True)
+    actual_df = act.rename(columns={"yhat": "Value"})[["Year", "Value"]].reset_index(drop=True)
+    return forecast_df, actual_df, model
+
+
+def series_forecast(fc_table: pd.DataFrame, table: str, basis: str, states: Optional[List[str]] = None,
+                    years: Optional[int] = None) -> pd.DataFrame:
+    """Group, Year, Value, Lower, Upper from the batched forecast table, averaged over `states` (default Aus)."""
+    fc = fc_table[(fc_table["Table"] == table) & (fc_table["Basis"] == basis)]
+    if years is not None:
+        fc = fc[fc["Year"] < fc["Year"].min() + years]
+    fc = fc[fc["State"].isin(states or ["Aus"])]
+    return fc.groupby(["Group", "Year"], as_index=False)[["Value", "Lower", "Upper"]].mean()
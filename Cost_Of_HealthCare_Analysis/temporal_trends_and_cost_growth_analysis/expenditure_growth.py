@@ -0,0 +1,286 @@
+# expenditure_growth.py — nominal vs real growth, CAGR and sector splits over the cleaned HWE series
+#
+# Tempral_Trends_and_Cost_growth.ipynb reloads the yearly workbooks, filters Amount row by row and
+# recomputes diffs for each chart. This works from the two cleaned CSVs instead:
+#
+#   * Health_Expenditure_Trends_2008-2022_Cleaned.csv gives national current and constant price
+#     totals; their ratio is the implicit price deflator (100 in the reference year).
+#   * Health_Expenditure_Breakdown_By_Category_2018-2022_Cleaned.csv lists categories with the
+#     hierarchy as leading spaces ("   Private hospitals" sits under "Hospitals"). CategoryTree
+#     stores it in depth-first order, so every subtree is one contiguous slice of a
+#     (category, year, sector) array and YoY / CAGR / real values / government share are array
+#     operations on that slice. Results are cached per subtree.
+#
+# Children are reported components of their parent, not a partition of it, so parent values are
+# never rebuilt by summing children.
+#
+#   python expenditure_growth.py                          # national bridge + every category
+#   python expenditure_growth.py --root Hospitals --real --out hospitals_growth.csv
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, "Data")
+TRENDS_FILE = "Health_Expenditure_Trends_2008-2022_Cleaned.csv"
+BREAKDOWN_FILE = "Health_Expenditure_Breakdown_By_Category_2018-2022_Cleaned.csv"
+
+SECTORS = ["Government", "Non-government"]
+
+# Cost_Of_HealthCare_Analysis/ on sys.path for the shared modules (pattern documented in data_catalog.py)
+sys.path.append(next(str(p) for p in Path(__file__).resolve().parents if (p / "data_catalog.py").exists()))
+from data_catalog import read_csv  # noqa: E402
+
+
+# ---------- inputs ----------
+def load_trends(path: Optional[str] = None) -> pd.DataFrame:
+    """Year, StartYear, Current ($m), Constant ($m) (the % columns are recomputed, not read)."""
+    df = read_csv(path or os.path.join(DATA_DIR, TRENDS_FILE))
+    return df[["Year", "StartYear", "Current ($m)", "Constant ($m)"]].sort_values("StartYear").reset_index(drop=True)
+
+
+def load_breakdown(path: Optional[str] = None) -> pd.DataFrame:
+    """Category (stripped), Indent (leading spaces), Government, Non-government, YearLabel, StartYear."""
+    df = read_csv(path or os.path.join(DATA_DIR, BREAKDOWN_FILE))
+    raw = df["Category"].astype(str)
+    df["Category"] = raw.str.strip()
+    df["Indent"] = raw.str.len() - raw.str.lstrip().str.len()
+    df["StartYear"] = df["YearLabel"].str[:4].astype(int)
+    for c in SECTORS:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
+# ---------- hierarchy ----------
+class CategoryTree:
+    """
+    Categories in depth-first order with parent / depth arrays and [start, stop) subtree slices.
+    A node is identified by its path ("Hospitals/Private hospitals"), so repeated names under
+    different parents stay distinct.
+    """
+
+    def __init__(self, paths: List[str]):
+        children: Dict[str, List[str]] = {}
+        for p in paths:  # first-seen order within each parent
+            parent = p.rsplit("/", 1)[0] if "/" in p else ""
+            children.setdefault(parent, [])
+            if p not in children[parent]:
+                children[parent].append(p)
+
+        order: List[str] = []
+        stop: Dict[str, int] = {}
+
+        def visit(p: str):
+            order.append(p)
+            for c in children.get(p, []):
+                visit(c)
+            stop[p] = len(order)
+
+        for top in children.get("", []):
+            visit(top)
+
+        self.paths = order
+        self.pos = {p: i for i, p in enumerate(order)}
+        self.names = [p.rsplit("/", 1)[-1] for p in order]
+        self.depth = np.array([p.count("/") for p in order])
+        self.parent = np.array([self.pos.get(p.rsplit("/", 1)[0], -1) if "/" in p else -1 for p in order])
+        self.stop = np.array([stop[p] for p in order])
+
+    def find(self, name: str) -> int:
+        """Position of a category by path or by (unique) display name."""
+        if name in self.pos:
+            return self.pos[name]
+        hits = [i for i, n in enumerate(self.names) if n == name]
+        if len(hits) != 1:
+            raise KeyError(f"{'Ambiguous' if hits else 'Unknown'} category {name!r}")
+        return hits[0]
+
+    def subtree(self, name: Optional[str] = None) -> slice:
+        """The whole tree for None, else the category and everything under it."""
+        if name is None:
+            return slice(0, len(self.paths))
+        i = self.find(name)
+        return slice(i, int(self.stop[i]))
+
+
+def category_paths(breakdown: pd.DataFrame) -> pd.Series:
+    """Path of every row: the nearest earlier row (same year) with a smaller indent is the parent."""
+    paths = pd.Series("", index=breakdown.index, dtype=object)
+    for _, block in breakdown.groupby("YearLabel", sort=False):
+        stack: List[Tuple[int, str]] = []
+        for i, name, indent in zip(block.index, block["Category"], block["Indent"]):
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            paths[i] = f"{stack[-1][1]}/{name}" if stack else name
+            stack.append((indent, paths[i]))
+    return paths
+
+
+# ---------- metrics ----------
+def _ratio(num, den):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den != 0, num / np.where(den != 0, den, 1), np.nan)
+
+
+def yoy(a: np.ndarray, years: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """($ change, % change) from the previous year for each row of a (rows × years); NaN for the first year or a gap."""
+    diff = np.full(a.shape, np.nan)
+    pct = np.full(a.shape, np.nan)
+    consecutive = np.diff(years) == 1
+    diff[:, 1:] = np.where(consecutive[None, :], a[:, 1:] - a[:, :-1], np.nan)
+    pct[:, 1:] = 100 * _ratio(diff[:, 1:], a[:, :-1])
+    return diff, pct
+
+
+def cagr(first: np.ndarray, last: np.ndarray, n_years: int) -> np.ndarray:
+    """Compound annual growth (%) between two values n_years apart."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100 * (np.power(_ratio(last, first), 1 / n_years) - 1) if n_years > 0 else np.full(np.shape(first), np.nan)
+
+
+class ExpenditureGrowth:
+    """National and per-category growth from the trends series and the category breakdown."""
+
+    def __init__(self, trends: Optional[pd.DataFrame] = None, breakdown: Optional[pd.DataFrame] = None):
+        self.trends = load_trends() if trends is None else trends
+        bd = load_breakdown() if breakdown is None else breakdown
+        bd = bd.assign(Path=category_paths(bd))
+        self.tree = CategoryTree(list(bd["Path"]))
+        self.years = np.sort(bd["StartYear"].unique())
+        self.year_labels = (bd.drop_duplicates("StartYear").set_index("StartYear")["YearLabel"]
+                            .reindex(self.years).tolist())
+
+        # (category, year, sector) in tree order; duplicate rows for the same cell are summed
+        self.values = np.full((len(self.tree.paths), len(self.years), len(SECTORS)), np.nan)
+        ci = bd["Path"].map(self.tree.pos).to_numpy()
+        yi = np.searchsorted(self.years, bd["StartYear"].to_numpy())
+        vals = bd[SECTORS].to_numpy(dtype=float)
+        filled = np.zeros(self.values.shape[:2], dtype=bool)
+        filled[ci, yi] = True
+        self.values[filled] = 0.0
+        np.add.at(self.values, (ci, yi), np.nan_to_num(vals))
+
+        # implicit price deflator by start year, rebased to 100 where current == constant
+        cur = self.trends["Current ($m)"].to_numpy(dtype=float)
+        con = self.trends["Constant ($m)"].to_numpy(dtype=float)
+        self.deflator = pd.Series(100 * cur / con, index=self.trends["StartYear"].to_numpy())
+        self._cache: Dict[tuple, pd.DataFrame] = {}
+
+    # ---------- national ----------
+    def national(self) -> pd.DataFrame:
+        """The notebook's YoY and bridge columns plus % growth, deflator and inflation for every year."""
+        t = self.trends.copy()
+        years = t["StartYear"].to_numpy()
+        both = t[["Current ($m)", "Constant ($m)"]].to_numpy(dtype=float).T  # (series, year)
+        diff, pct = yoy(both, years)
+        t["Deflator"] = self.deflator.to_numpy()
+        t["Current YoY ($m)"], t["Constant YoY ($m)"] = diff
+        t["Price Effect ($m)"] = diff[0] - diff[1]
+        t["Nominal change (%)"], t["Real growth (%)"] = pct
+        t["Inflation (%)"] = yoy(t["Deflator"].to_numpy()[None], years)[1][0]
+        return t
+
+    def national_cagr(self, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, float]:
+        t = self.trends.set_index("StartYear")
+        start = int(t.index.min()) if start is None else start
+        end = int(t.index.max()) if end is None else end
+        out = {}
+        for col, key in [("Current ($m)", "nominal_cagr_pct"), ("Constant ($m)", "real_cagr_pct")]:
+            out[key] = float(cagr(np.array(t.loc[start, col]), np.array(t.loc[end, col]), end - start))
+        return out
+
+    # ---------- categories ----------
+    def real_values(self, base_year: Optional[int] = None) -> np.ndarray:
+        """values in constant prices of base_year (default: the deflator's reference year); NaN without a deflator."""
+        d = self.deflator.reindex(self.years).to_numpy()
+        base = 100.0 if base_year is None else float(self.deflator.loc[base_year])
+        return self.values * (base / d)[None, :, None]
+
+    def categories(self, root: Optional[str] = None, real: bool = False) -> pd.DataFrame:
+        """
+        One row per category × year of the subtree: sector amounts, Total, government share and
+        YoY ($m / %) of the total. real=True deflates amounts first (years without a deflator are NaN).
+        """
+        key = ("categories", root, real)
+        if key not in self._cache:
+            sl = self.tree.subtree(root)
+            v = (self.real_values() if real else self.values)[sl]
+            total = v.sum(axis=2)
+            diff, pct = yoy(total, self.years)
+            n_cat, n_year = total.shape
+            ci = np.repeat(np.arange(sl.start, sl.stop), n_year)
+            out = pd.DataFrame({
+                "Category": np.array(self.tree.names, dtype=object)[ci],
+                "Path": np.array(self.tree.paths, dtype=object)[ci],
+                "Level": self.tree.depth[ci],
+                "YearLabel": np.tile(np.array(self.year_labels, dtype=object), n_cat),
+                "StartYear": np.tile(self.years, n_cat),
+                "Government": v[..., 0].ravel(),
+                "Non-government": v[..., 1].ravel(),
+                "Total": total.ravel(),
+                "Government share (%)": 100 * _ratio(v[..., 0], total).ravel(),
+                "YoY ($m)": diff.ravel(),
+                "YoY (%)": pct.ravel(),
+            })
+            self._cache[key] = out[~np.isnan(out["Total"])].reset_index(drop=True)
+        return self._cache[key]
+
+    def category_cagr(self, root: Optional[str] = None, real: bool = False) -> pd.DataFrame:
+        """CAGR of each sector and the total between each category's first and last reported year."""
+        key = ("cagr", root, real)
+        if key not in self._cache:
+            sl = self.tree.subtree(root)
+            v = (self.real_values() if real else self.values)[sl]
+            v = np.concatenate([v, v.sum(axis=2, keepdims=True)], axis=2)  # sectors + total
+            known = ~np.isnan(v[..., -1])
+            first = known.argmax(axis=1)
+            last = known.shape[1] - 1 - known[:, ::-1].argmax(axis=1)
+            rows = np.arange(len(v))
+            span = self.years[last] - self.years[first]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                growth = 100 * (np.power(_ratio(v[rows, last], v[rows, first]),
+                                         1 / np.where(span > 0, span, np.nan)[:, None]) - 1)
+            out = pd.DataFrame({"Category": self.tree.names[sl], "Path": self.tree.paths[sl],
+                                "Level": self.tree.depth[sl], "From": self.years[first], "To": self.years[last]})
+            for j, name in enumerate(SECTORS + ["Total"]):
+                out[f"{name} CAGR (%)"] = growth[:, j]
+            self._cache[key] = out
+        return self._cache[key]
+
+    def sector_split(self, root: Optional[str] = None) -> pd.DataFrame:
+        """Long Category, YearLabel, Sector, Expenditure ($m), Share (%) (the gov vs non-gov charts)."""
+        c = self.categories(root)
+        long = c.melt(id_vars=["Category", "Path", "YearLabel", "Total"], value_vars=SECTORS,
+                      var_name="Sector", value_name="Expenditure ($m)")
+        long["Share (%)"] = 100 * _ratio(long["Expenditure ($m)"].to_numpy(), long["Total"].to_numpy())
+        return long.drop(columns="Total")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Nominal vs real health expenditure growth by category.")
+    p.add_argument("--trends", default=None, help=f"default: Data/{TRENDS_FILE}")
+    p.add_argument("--breakdown", default=None, help=f"default: Data/{BREAKDOWN_FILE}")
+    p.add_argument("--root", default=None, help="limit the category tables to this category's subtree")
+    p.add_argument("--real", action="store_true", help="deflate category amounts to constant prices")
+    p.add_argument("--out", default=None, help="write the category table to this CSV")
+    args = p.parse_args(argv)
+
+    g = ExpenditureGrowth(load_trends(args.trends), load_breakdown(args.breakdown))
+    fmt = lambda v: f"{v:,.2f}"  # noqa: E731
+    print(g.national().drop(columns=["Year"]).to_string(index=False, float_format=fmt))
+    print(g.national_cagr())
+    cats = g.categories(args.root, args.real)
+    print(cats.drop(columns=["Path"]).to_string(index=False, float_format=fmt))
+    print(g.category_cagr(args.root, args.real).drop(columns=["Path"]).to_string(index=False, float_format=fmt))
+    if args.out:
+        cats.to_csv(args.out, index=False)
+        print(f"{len(cats)} rows -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
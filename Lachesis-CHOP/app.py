@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -5,6 +6,7 @@ import joblib
 import matplotlib.pyplot as plt
 from sklearn.tree import plot_tree
 from recommendation import generate_recommendations 
+from feedback import FeedbackLog
 
 # --------------------- Page ---------------------
 st.set_page_config(page_title="Child Obesity Risk — Doctor-Style Interview", layout="centered")
@@ -12,8 +14,14 @@ st.title("🧒 Childhood Obesity : Doctor-Style Adaptive Interview")
 # questions by topic (like a checkup). A surrogate Decision Tree picks the next topic. The RandomForest makes the final prediction.")
 
 # --------------------- Load models ---------------------
-@st.cache_resource
-def load_artifacts():
+ARTIFACTS = ("obesity_model.pkl", "encoders.pkl", "surrogate_dt.pkl")
+
+def artifact_stamp() -> tuple:
+    # refresh.py replaces these atomically; a new mtime means a new model to load
+    return tuple(os.stat(p).st_mtime_ns for p in ARTIFACTS)
+
+@st.cache_resource(max_entries=1)
+def load_artifacts(stamp: tuple):
     rf = joblib.load("obesity_model.pkl")       # RandomForest (final predictor)
     enc = joblib.load("encoders.pkl")           # {'nobeyesdad': {...}}
     bun = joblib.load("surrogate_dt.pkl")       # {'model','feature_names','class_names','fidelity'}
@@ -24,7 +32,8 @@ def load_artifacts():
     rf_feats = list(getattr(rf, "feature_names_in_", dt_feats))
     return rf, enc, dt, dt_feats, class_names, fidelity, rf_feats
 
-rf, encoders, dt, DT_FEATURES, CLASS_NAMES, FIDELITY, RF_FEATURES = load_artifacts()
+STAMP = artifact_stamp()
+rf, encoders, dt, DT_FEATURES, CLASS_NAMES, FIDELITY, RF_FEATURES = load_artifacts(STAMP)
 TREE = dt.tree_
 
 # --------------------- Label map ---------------------
@@ -52,6 +61,15 @@ if "node" not in st.session_state:    st.session_state.node = 0
 if "path" not in st.session_state:    st.session_state.path = []    # for explanation
 if "phase" not in st.session_state:   st.session_state.phase = "interview"  # -> "complete" -> "done"
 if "last_topic" not in st.session_state: st.session_state.last_topic = None  # UI continuity
+if "shared" not in st.session_state:  st.session_state.shared = False  # feedback logged for this interview
+if "model_stamp" not in st.session_state: st.session_state.model_stamp = STAMP
+
+# Model was refreshed mid-interview: keep the answers, replay them down the new surrogate tree
+if st.session_state.model_stamp != STAMP:
+    st.session_state.model_stamp = STAMP
+    if st.session_state.phase == "interview":
+        st.session_state.node = 0
+        st.session_state.path = []
 
 def reset_all():
     st.session_state.answers = {}
@@ -59,6 +77,7 @@ def reset_all():
     st.session_state.path = []
     st.session_state.phase = "interview"
     st.session_state.last_topic = None
+    st.session_state.shared = False
 
 with st.sidebar:
     st.button("🔄 Reset interview", on_click=reset_all)
@@ -275,5 +294,23 @@ if st.session_state.phase == "done":
         else:
             st.info("No recommendations available for this case.")
 
+        # --- Feedback (consented interviews only; used by refresh.py) ---
+        if st.session_state.shared:
+            st.caption("✅ Thank you — this interview was saved to improve the model.")
+        else:
+            with st.form("feedback_form"):
+                consent = st.checkbox("I consent to these anonymised answers being stored to improve the model")
+                assessed = st.selectbox("Clinician-assessed weight category (if known)",
+                                        ["Not assessed"] + [inv_label[i] for i in sorted(inv_label)])
+                share = st.form_submit_button("Share")
+            if share:
+                if consent:
+                    label = encoders["nobeyesdad"].get(assessed)  # None when not assessed
+                    FeedbackLog(features=UNIFIED_ORDER).append(row, label=label, pred=pred)
+                    st.session_state.shared = True
+                    st.rerun()
+                else:
+                    st.warning("Nothing was saved — tick the consent box to share.")
+
     except Exception as e:
         st.error(f"Prediction failed: {e}")
\ No newline at end of file
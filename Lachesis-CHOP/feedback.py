@@ -0,0 +1,141 @@
+# feedback.py — append-only binary log of completed, consented interviews
+#
+# The app used to drop st.session_state.answers once the prediction was shown. With consent, a
+# finished interview is now appended here as one fixed-width record: timestamp, clinician-assessed
+# class (-1 if not assessed), the RF prediction at the time, and the feature vector as float32 in
+# the log's feature order. The header (magic + JSON with the feature names) is written once, so
+# the log can be memory-mapped and read from any record offset without parsing text. A partially
+# written trailing record (crash mid-append) is ignored by readers and cut off by the next append,
+# which holds an exclusive lock so concurrent appends stay record-aligned.
+#
+#   python feedback.py                 # summary of feedback.bin
+#
+#   from feedback import FeedbackLog
+#   log = FeedbackLog("feedback.bin", RF_FEATURES)
+#   log.append(st.session_state.answers, label=None, pred=pred)
+#   X, y, pred, ts = log.read(since=120)
+import argparse
+import fcntl
+import json
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+LOG_PATH = HERE / "feedback.bin"
+MAGIC = b"CHOPFB\x01\n"
+UNLABELLED = -1
+
+
+def record_dtype(n_features: int) -> np.dtype:
+    return np.dtype([("ts", "<f8"), ("label", "i1"), ("pred", "i1"), ("x", "<f4", (n_features,))])
+
+
+class FeedbackLog:
+    """Fixed-width interview records behind a small JSON header; appends are locked and record-aligned."""
+
+    def __init__(self, path=LOG_PATH, features: Optional[Sequence[str]] = None):
+        self.path = Path(path)
+        if self.path.exists() and self.path.stat().st_size:
+            self.features, self.offset = self._read_header()
+            if features is not None and list(features) != self.features:
+                raise ValueError(f"{self.path.name} was written for features {self.features}, not {list(features)}")
+        elif features is None:
+            raise FileNotFoundError(f"{self.path} does not exist and no feature list was given to create it")
+        else:
+            self.features = list(features)
+            self._write_header()
+        self.dtype = record_dtype(len(self.features))
+
+    # ---------- header ----------
+    def _read_header(self) -> Tuple[List[str], int]:
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a feedback log")
+            (n,) = struct.unpack("<I", f.read(4))
+            meta = json.loads(f.read(n))
+        return meta["features"], len(MAGIC) + 4 + n
+
+    def _write_header(self):
+        meta = json.dumps({"features": self.features, "created": time.time()}).encode()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(meta)) + meta)
+        # another writer may have created it first; keep theirs if so
+        try:
+            os.link(tmp, self.path)
+        except FileExistsError:
+            pass
+        finally:
+            tmp.unlink()
+        self.features, self.offset = self._read_header()
+
+    # ---------- records ----------
+    def __len__(self) -> int:
+        return max(self.path.stat().st_size - self.offset, 0) // self.dtype.itemsize
+
+    def encode(self, answers: Dict[str, float], label: Optional[int] = None, pred: Optional[int] = None) -> bytes:
+        rec = np.zeros(1, self.dtype)
+        rec["ts"] = time.time()
+        rec["label"] = UNLABELLED if label is None else int(label)
+        rec["pred"] = UNLABELLED if pred is None else int(pred)
+        rec["x"][0] = [float(answers.get(f, 0.0)) for f in self.features]
+        return rec.tobytes()
+
+    def append(self, answers: Dict[str, float], label: Optional[int] = None, pred: Optional[int] = None) -> int:
+        """Append one interview; returns its record index."""
+        data = self.encode(answers, label, pred)
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            n = max(os.fstat(fd).st_size - self.offset, 0) // self.dtype.itemsize
+            end = self.offset + n * self.dtype.itemsize
+            # drop a torn record left by an interrupted append so this one starts on a boundary
+            os.ftruncate(fd, end)
+            os.pwrite(fd, data, end)
+            os.fsync(fd)
+        finally:
+            os.close(fd)  # releases the lock
+        return n
+
+    def records(self, since: int = 0) -> np.ndarray:
+        """Structured array of complete records from index `since` on."""
+        n = len(self)
+        if since >= n:
+            return np.zeros(0, self.dtype)
+        mm = np.memmap(self.path, self.dtype, mode="r", offset=self.offset, shape=(n,))
+        return np.array(mm[since:])
+
+    def read(self, since: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(X float64, label, pred, ts) from record `since` on; label is -1 where not assessed."""
+        r = self.records(since)
+        return r["x"].astype(float), r["label"].astype(int), r["pred"].astype(int), r["ts"]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Summarise the interview feedback log.")
+    p.add_argument("--log", default=str(LOG_PATH))
+    p.add_argument("--since", type=int, default=0, help="first record index")
+    args = p.parse_args(argv)
+
+    log = FeedbackLog(args.log)
+    X, y, pred, ts = log.read(args.since)
+    print(f"{args.log}: {len(log)} records × {len(log.features)} features ({log.dtype.itemsize} B each)")
+    if len(ts):
+        print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(ts.min()))} → "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(ts.max()))}")
+        labelled = y != UNLABELLED
+        print(f"  clinician-assessed: {labelled.sum()}  (RF agreed on {(pred[labelled] == y[labelled]).mean():.1%})"
+              if labelled.any() else "  clinician-assessed: 0")
+        classes, counts = np.unique(y[labelled], return_counts=True)
+        for c, k in zip(classes, counts):
+            print(f"    class {c}: {k}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# refresh.py — incremental RandomForest refresh from the interview feedback log
+#
+# Retraining obesity_model.pkl meant rerunning predict.ipynb and surrogate.ipynb on the full
+# dataset. This grows the existing forest instead: once enough clinician-assessed interviews have
+# accumulated in feedback.bin, `--trees` new trees are fitted (warm_start) on those records plus a
+# stratified replay sample of Final_combined_dataset.csv (so every class is present and classes_
+# stays aligned), and the oldest trees are retired to keep the forest at `--max-trees`.
+# The surrogate DT only drives the interview flow, so it is kept as long as it still agrees with
+# the refreshed forest to within `--tolerance` of its stored fidelity on the reference inputs
+# (dataset + all consented interviews); otherwise it is refitted with the notebook's settings.
+# Artifacts are replaced atomically; app.py reloads them when their mtimes change.
+#
+#   python refresh.py                      # one refresh if >= --min-new assessed interviews are pending
+#   python refresh.py --every 60           # check hourly
+#   python refresh.py --status
+#   python refresh.py --full               # retrain from scratch as predict.ipynb + surrogate.ipynb do
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+
+from feedback import LOG_PATH, UNLABELLED, FeedbackLog
+
+HERE = Path(__file__).resolve().parent
+DATA_FILE = HERE / "Final_combined_dataset.csv"
+MODEL_PATH = HERE / "obesity_model.pkl"
+ENCODERS_PATH = HERE / "encoders.pkl"
+SURROGATE_PATH = HERE / "surrogate_dt.pkl"
+STATE_PATH = HERE / "refresh_state.json"
+TARGET = "nobeyesdad"
+DROP = ["smoke", "calc_Frequently", "calc_Sometimes", "calc_no"]  # as in predict.ipynb
+SEED = 42
+SURROGATE_PARAMS = dict(max_depth=4, min_samples_leaf=20, random_state=SEED)  # as in surrogate.ipynb
+HISTORY = 50
+
+
+# ---------- data ----------
+def load_dataset(path=DATA_FILE) -> Tuple[pd.DataFrame, pd.Series]:
+    df = pd.read_csv(path).drop(columns=DROP, errors="ignore")
+    X = df.drop(columns=TARGET).apply(pd.to_numeric, errors="coerce").fillna(0.0).astype(float)
+    return X, df[TARGET].astype(int)
+
+
+def replay_sample(y: pd.Series, n: int, seed: int) -> np.ndarray:
+    """Row positions of a stratified sample of about n rows with at least one row per class."""
+    rng = np.random.default_rng(seed)
+    frac = min(n / len(y), 1.0)
+    out = []
+    for _, pos in pd.Series(np.arange(len(y))).groupby(y.to_numpy()):
+        k = min(len(pos), max(1, round(frac * len(pos))))
+        out.append(rng.choice(pos.to_numpy(), k, replace=False))
+    return np.sort(np.concatenate(out))
+
+
+# ---------- artifacts ----------
+def save_atomic(obj, path: Path):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_state(path=STATE_PATH) -> Dict:
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"offset": 0, "generation": 0, "history": []}
+
+
+def save_state(state: Dict, path=STATE_PATH):
+    state["history"] = state["history"][-HISTORY:]
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, path)
+
+
+def class_names() -> list:
+    label_map = joblib.load(ENCODERS_PATH)[TARGET]
+    names = [None] * (max(label_map.values()) + 1)
+    for label, idx in label_map.items():
+        names[idx] = label
+    return names
+
+
+def fit_surrogate(rf: RandomForestClassifier, X: pd.DataFrame, feature_names: list) -> Dict:
+    rf_preds = rf.predict(X[list(rf.feature_names_in_)])
+    dt = DecisionTreeClassifier(**SURROGATE_PARAMS).fit(X[feature_names], rf_preds)
+    fidelity = float((dt.predict(X[feature_names]) == rf_preds).mean())
+    return {"model": dt, "feature_names": feature_names, "class_names": class_names(), "fidelity": fidelity}
+
+
+def train_full(X: pd.DataFrame, y: pd.Series) -> RandomForestClassifier:
+    """predict.ipynb: RandomForest(random_state=42) on the 80% split."""
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=SEED)
+    return RandomForestClassifier(random_state=SEED).fit(X_train, y_train)
+
+
+# ---------- incremental ----------
+def grow(rf: RandomForestClassifier, X: pd.DataFrame, y: np.ndarray, trees: int, max_trees: int,
+         seed: int) -> int:
+    """Add `trees` trees fitted on (X, y), then retire the oldest beyond max_trees; returns the number retired."""
+    classes = rf.classes_.copy()
+    # the seed changes per generation so new trees do not repeat the bootstrap draws of retired ones
+    rf.set_params(warm_start=True, n_estimators=len(rf.estimators_) + trees, random_state=seed)
+    rf.fit(X, y)
+    if not np.array_equal(rf.classes_, classes):
+        raise ValueError(f"refresh batch changed classes_ {classes.tolist()} -> {rf.classes_.tolist()}")
+    retired = max(len(rf.estimators_) - max_trees, 0)
+    if retired:
+        rf.estimators_ = rf.estimators_[retired:]
+    rf.set_params(warm_start=False, n_estimators=len(rf.estimators_))
+    return retired
+
+
+def reference_inputs(X: pd.DataFrame, log: Optional[FeedbackLog]) -> pd.DataFrame:
+    if log is None or not len(log):
+        return X
+    Xf, _, _, _ = log.read()
+    return pd.concat([X, pd.DataFrame(Xf, columns=log.features)[X.columns]], ignore_index=True)
+
+
+def refresh(log_path=LOG_PATH, min_new: int = 25, trees: int = 10, max_trees: Optional[int] = None,
+            replay: int = 500, tolerance: float = 0.02, force_surrogate: bool = False) -> Dict:
+    """One refresh step; returns what was done (also appended to the state history)."""
+    t0 = time.perf_counter()
+    X, y = load_dataset()
+    state = load_state()
+    report = {"ts": time.time()}
+
+    if not MODEL_PATH.exists():
+        rf = train_full(X, y)
+        save_atomic(rf, MODEL_PATH)
+        report["action"] = "trained"
+        force_surrogate = True
+    else:
+        rf = joblib.load(MODEL_PATH)
+        report["action"] = "none"
+    features = list(rf.feature_names_in_)
+
+    log = FeedbackLog(log_path) if Path(log_path).exists() else None
+    if log is not None and log.features != features:
+        raise ValueError(f"{log.path.name} features do not match the model's")
+    if log is not None:
+        Xn, yn, _, _ = log.read(state["offset"])
+    else:
+        Xn, yn = np.zeros((0, len(features))), np.zeros(0, int)
+    assessed = yn != UNLABELLED
+    report.update(pending=int(len(yn)), assessed=int(assessed.sum()))
+
+    if assessed.sum() >= min_new and report["action"] == "none":
+        gen = state["generation"] + 1
+        pos = replay_sample(y, replay, SEED + gen)
+        Xb = pd.concat([X.iloc[pos], pd.DataFrame(Xn[assessed], columns=features)], ignore_index=True)
+        yb = np.concatenate([y.to_numpy()[pos], yn[assessed]])
+        report["retired"] = grow(rf, Xb[features], yb, trees, max_trees or len(rf.estimators_), SEED + gen)
+        report.update(action="grown", added=trees, trees=len(rf.estimators_), batch=len(yb))
+        save_atomic(rf, MODEL_PATH)
+        state["generation"] = gen
+        state["offset"] += len(yn)
+
+    if report["action"] != "none" or force_surrogate:
+        bundle = joblib.load(SURROGATE_PATH) if SURROGATE_PATH.exists() else None
+        feature_names = bundle["feature_names"] if bundle else features
+        Xr = reference_inputs(X, log)
+        rf_preds = rf.predict(Xr[features])
+        if bundle is not None:
+            report["agreement"] = float((bundle["model"].predict(Xr[feature_names]) == rf_preds).mean())
+        if force_surrogate or bundle is None or report["agreement"] < bundle["fidelity"] - tolerance:
+            bundle = fit_surrogate(rf, Xr, feature_names)
+            save_atomic(bundle, SURROGATE_PATH)
+            report["surrogate"] = "refit"
+        else:
+            report["surrogate"] = "kept"
+        report["fidelity"] = bundle["fidelity"]
+
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    if report["action"] != "none" or "surrogate" in report:
+        state["history"].append(report)
+        save_state(state)
+    return report
+
+
+def describe(report: Dict) -> str:
+    parts = [f"{report['action']}", f"{report['assessed']}/{report['pending']} pending assessed"]
+    if report["action"] == "grown":
+        parts.append(f"+{report['added']} -{report['retired']} trees → {report['trees']} (batch {report['batch']})")
+    if "surrogate" in report:
+        agree = f", agreement {report['agreement']:.2%}" if "agreement" in report else ""
+        parts.append(f"surrogate {report['surrogate']} (fidelity {report['fidelity']:.2%}{agree})")
+    parts.append(f"{report['seconds']:.2f}s")
+    return "; ".join(parts)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Refresh obesity_model.pkl and surrogate_dt.pkl from interview feedback.")
+    p.add_argument("--log", default=str(LOG_PATH))
+    p.add_argument("--min-new", type=int, default=25, help="clinician-assessed interviews needed before growing")
+    p.add_argument("--trees", type=int, default=10, help="trees added per refresh")
+    p.add_argument("--max-trees", type=int, default=None, help="forest size kept after retiring (default: current size)")
+    p.add_argument("--replay", type=int, default=500, help="rows of the base dataset mixed into each batch")
+    p.add_argument("--tolerance", type=float, default=0.02, help="allowed surrogate agreement drop before refitting")
+    p.add_argument("--surrogate", action="store_true", help="refit the surrogate regardless of agreement")
+    p.add_argument("--full", action="store_true", help="retrain the forest and surrogate from the dataset")
+    p.add_argument("--every", type=float, default=None, metavar="MINUTES", help="repeat on this schedule")
+    p.add_argument("--status", action="store_true")
+    args = p.parse_args(argv)
+
+    if args.status:
+        state = load_state()
+        print(f"generation {state['generation']}, log offset {state['offset']}")
+        for r in state["history"][-10:]:
+            print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(r['ts']))}  {describe(r)}")
+        return
+    if args.full:
+        t0 = time.perf_counter()
+        X, y = load_dataset()
+        rf = train_full(X, y)
+        save_atomic(rf, MODEL_PATH)
+        bundle = fit_surrogate(rf, X, list(rf.feature_names_in_))
+        save_atomic(bundle, SURROGATE_PATH)
+        print(f"full retrain: {len(rf.estimators_)} trees, fidelity {bundle['fidelity']:.2%}, "
+              f"{time.perf_counter() - t0:.2f}s")
+        return
+
+    while True:
+        report = refresh(args.log, args.min_new, args.trees, args.max_trees, args.replay, args.tolerance,
+                         args.surrogate)
+        print(time.strftime("%Y-%m-%d %H:%M:%S"), describe(report), flush=True)
+        if args.every is None:
+            break
+        time.sleep(args.every * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import numpy as np
+
+from feedback import UNLABELLED, FeedbackLog
+
+FEATURES = ["age", "height", "weight"]
+
+
+def test_append_and_read(tmp_path):
+    log = FeedbackLog(tmp_path / "feedback.bin", FEATURES)
+    assert log.append({"age": 16, "height": 1.6, "weight": 55}, label=1, pred=1) == 0
+    assert log.append({"age": 17, "height": 1.7}, pred=5) == 1
+    X, y, pred, ts = FeedbackLog(tmp_path / "feedback.bin").read()
+    np.testing.assert_allclose(X, [[16, 1.6, 55], [17, 1.7, 0]], rtol=1e-6)
+    assert y.tolist() == [1, UNLABELLED]
+    assert pred.tolist() == [1, 5]
+
+
+def test_torn_write_is_dropped_by_next_append(tmp_path):
+    path = tmp_path / "feedback.bin"
+    log = FeedbackLog(path, FEATURES)
+    log.append({"age": 16, "height": 1.6, "weight": 55}, label=1, pred=1)
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03\x04\x05")  # interrupted append
+    assert len(log) == 1
+    assert log.append({"age": 15, "height": 1.5, "weight": 70}, label=6, pred=5) == 1
+    X, y, pred, ts = log.read()
+    np.testing.assert_allclose(X[1], [15, 1.5, 70], rtol=1e-6)
+    assert y.tolist() == [1, 6]
+    assert pred.tolist() == [1, 5]
+    assert (ts > 1e9).all()
+    assert path.stat().st_size == log.offset + 2 * log.dtype.itemsize
@@ -0,0 +1,383 @@
+# covid_pipeline.py — per-country COVID-19 case / vaccination / death series from the OWID extracts in "covid19 .zip"
+#
+# The covid19 notebooks (Vizualization, Vaccination-vs-Death, Australia_Chile_COVID_Visualizations)
+# each read whole OWID CSVs, filter a few countries, merge and plot. Here the same wrangling is a
+# pipeline:
+#
+#   * the CSVs are streamed straight out of the zip (or an extracted folder) in chunks, keeping only
+#     the rows of the requested countries, so the 500k-row weekly cases file is never held whole;
+#   * each country's merged daily series (Vaccination-vs-Death's outer join, ffill and pre-rollout 0)
+#     is cached in .covid_cache/<source fingerprint>/<country>.parquet, so asking for one more
+#     country streams the sources once for that country only, and a new OWID extract gets a new key;
+#   * countries are stacked on one calendar (country × day × series) and rolling means and lagged
+#     vaccination-vs-death correlations are computed for all of them at once with array windows.
+#
+#   python covid_pipeline.py                                  # focus countries, 7-day windows, lags 0..60
+#   python covid_pipeline.py --countries Chile Portugal --window 14 --max-lag 90 --out covid_compare.csv
+#
+#   from covid_pipeline import CovidPanel
+#   panel = CovidPanel.load(["Australia", "Chile"])
+#   panel.lag_correlations(max_lag=60); panel.compare()
+import argparse
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE = os.path.join(ROOT, "covid19 .zip")
+CACHE_DIR = os.path.join(ROOT, ".covid_cache")
+FORMAT_VERSION = 1  # bump when the per-country series below change
+CHUNK_ROWS = 100_000
+
+# file name prefix inside the zip / folder -> (OWID value column, our name)
+SOURCES = {
+    "covid-19-vaccine-doses-administered-per-100-people": (
+        "COVID-19 doses (cumulative, per hundred)", "doses_per_100"),
+    "daily-new-confirmed-covid-19-deaths-per-million-people": (
+        "Daily new confirmed deaths due to COVID-19 per million people (rolling 7-day average, right-aligned)",
+        "deaths_per_million"),
+    "weekly-covid-cases": ("Weekly cases", "weekly_cases"),
+}
+SERIES = [name for _, name in SOURCES.values()]
+
+FOCUS_COUNTRIES = ["Australia", "Chile", "Portugal", "United States", "South Africa", "China"]
+END_DATE = "2023-12-31"  # Vaccination-vs-Death keeps data up to the end of 2023
+WINDOW = 7
+MAX_LAG = 60
+
+
+# ---------- sources ----------
+class Source:
+    """The OWID CSVs in the covid19 zip or an extracted copy of it, opened by file name prefix."""
+
+    def __init__(self, path: str = DEFAULT_SOURCE):
+        self.path = path
+        self.is_zip = zipfile.is_zipfile(path) if os.path.isfile(path) else False
+        if self.is_zip:
+            with zipfile.ZipFile(path) as zf:
+                self._infos = {i.filename: i for i in zf.infolist()
+                               if i.filename.endswith(".csv") and "__MACOSX" not in i.filename}
+            names = list(self._infos)
+        else:
+            names = [os.path.relpath(os.path.join(d, f), path) for d, _, files in os.walk(path)
+                     for f in files if f.endswith(".csv")]
+        self.members = {prefix: self._match(names, prefix) for prefix in SOURCES}
+
+    @staticmethod
+    def _match(names: Sequence[str], prefix: str) -> str:
+        hits = sorted(n for n in names if os.path.basename(n).startswith(prefix))
+        if not hits:
+            raise FileNotFoundError(f"No '{prefix}*.csv' in the covid19 source")
+        return hits[0]
+
+    def fingerprint(self) -> str:
+        """Key of the source contents: zip CRC + size per member, or sha1 of each extracted file."""
+        h = hashlib.sha1(f"v{FORMAT_VERSION}".encode())
+        for prefix, member in sorted(self.members.items()):
+            if self.is_zip:
+                info = self._infos[member]
+                h.update(f"{prefix}:{info.CRC}:{info.file_size}".encode())
+            else:
+                with open(os.path.join(self.path, member), "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        h.update(block)
+        return h.hexdigest()[:16]
+
+    @contextmanager
+    def open(self, prefix: str):
+        member = self.members[prefix]
+        if self.is_zip:
+            with zipfile.ZipFile(self.path) as zf, zf.open(member) as f:
+                yield f
+        else:
+            with open(os.path.join(self.path, member), "rb") as f:
+                yield f
+
+    def stream(self, prefix: str, countries: Sequence[str], chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+        """Entity, Day, value rows of one source for the given countries, read chunk by chunk."""
+        column, name = SOURCES[prefix]
+        parts = []
+        with self.open(prefix) as f:
+            for chunk in pd.read_csv(f, usecols=["Entity", "Day", column], chunksize=chunk_rows):
+                parts.append(chunk[chunk["Entity"].isin(countries)])
+        out = pd.concat(parts, ignore_index=True).rename(columns={column: name})
+        out["Day"] = pd.to_datetime(out["Day"])
+        return out
+
+
+# ---------- per-country cache ----------
+def _stem(cache_dir: str, key: str, country: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", country)
+    return os.path.join(cache_dir, key, safe)
+
+
+def _store(df: pd.DataFrame, stem: str) -> None:
+    os.makedirs(os.path.dirname(stem), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(stem), suffix=".part")
+    os.close(fd)
+    try:
+        try:
+            df.to_parquet(tmp)
+            ext = "parquet"
+        except ImportError:
+            with open(tmp, "wb") as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            ext = "pkl"
+        os.replace(tmp, f"{stem}.{ext}")
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _load(stem: str) -> Optional[pd.DataFrame]:
+    if os.path.exists(f"{stem}.parquet"):
+        return pd.read_parquet(f"{stem}.parquet")
+    if os.path.exists(f"{stem}.pkl"):
+        with open(f"{stem}.pkl", "rb") as f:
+            return pickle.load(f)
+    return None
+
+
+def country_daily(rows: Dict[str, pd.DataFrame], country: str) -> pd.DataFrame:
+    """
+    One country's daily frame (index Day) from the streamed source rows, as in Vaccination-vs-Death:
+    outer join on Day, cumulative doses forward-filled and 0 before the rollout, deaths forward-filled.
+    """
+    frames = [r.loc[r["Entity"] == country].set_index("Day")[[name]] for name, r in rows.items()]
+    df = pd.concat(frames, axis=1, sort=True)
+    df = df[~df.index.duplicated()]
+    if df.empty:
+        return pd.DataFrame(columns=SERIES, index=pd.DatetimeIndex([], name="Day"), dtype=float)
+    df = df.reindex(pd.date_range(df.index.min(), df.index.max(), freq="D", name="Day"))
+    if df["doses_per_100"].notna().any():
+        df["doses_per_100"] = df["doses_per_100"].ffill().fillna(0.0)
+    df["deaths_per_million"] = df["deaths_per_million"].ffill()
+    return df[SERIES].astype(float)
+
+
+def load_countries(countries: Sequence[str], source: Optional[Source] = None, cache_dir: str = CACHE_DIR,
+                   refresh: bool = False, chunk_rows: int = CHUNK_ROWS) -> Dict[str, pd.DataFrame]:
+    """Daily frame per country; countries not yet cached for this source are streamed in one pass per file."""
+    source = source or Source()
+    key = source.fingerprint()
+    out = {} if refresh else {c: _load(_stem(cache_dir, key, c)) for c in countries}
+    missing = [c for c in countries if out.get(c) is None]
+    if missing:
+        rows = {SOURCES[p][1]: source.stream(p, missing, chunk_rows) for p in SOURCES}
+        for c in missing:
+            out[c] = country_daily(rows, c)
+            _store(out[c], _stem(cache_dir, key, c))
+    return {c: out[c] for c in countries}
+
+
+# ---------- windows ----------
+def rolling_mean(a: np.ndarray, window: int, axis: int = 1, min_periods: Optional[int] = None) -> np.ndarray:
+    """Trailing NaN-aware mean over `window` steps along axis, via cumulative sums (no Python loop)."""
+    min_periods = window if min_periods is None else min_periods
+    a = np.moveaxis(np.asarray(a, dtype=float), axis, -1)
+    known = ~np.isnan(a)
+    pad = [(0, 0)] * (a.ndim - 1) + [(1, 0)]
+    s = np.pad(np.cumsum(np.where(known, a, 0.0), axis=-1), pad)
+    n = np.pad(np.cumsum(known, axis=-1), pad)
+    lo = np.maximum(np.arange(a.shape[-1]) + 1 - window, 0)
+    hi = np.arange(1, a.shape[-1] + 1)
+    total, count = s[..., hi] - s[..., lo], n[..., hi] - n[..., lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(count >= max(min_periods, 1), total / count, np.nan)
+    return np.moveaxis(out, -1, axis)
+
+
+def lagged_corr(x: np.ndarray, y: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    Pearson r of x[t] against y[t + lag] for lag = 0..max_lag, per row of (rows × days) x and y;
+    pairs with a NaN on either side are skipped. Returns rows × (max_lag + 1).
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    ypad = np.concatenate([y, np.full(y.shape[:-1] + (max_lag,), np.nan)], axis=-1)
+    Y = np.lib.stride_tricks.sliding_window_view(ypad, max_lag + 1, axis=-1)  # rows × days × lags
+    X = np.broadcast_to(x[..., None], Y.shape)
+    ok = ~(np.isnan(X) | np.isnan(Y))
+    n = ok.sum(axis=-2)
+    X0, Y0 = np.where(ok, X, 0.0), np.where(ok, Y, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mx, my = X0.sum(axis=-2) / n, Y0.sum(axis=-2) / n
+        dx = np.where(ok, X - mx[..., None, :], 0.0)
+        dy = np.where(ok, Y - my[..., None, :], 0.0)
+        r = (dx * dy).sum(axis=-2) / np.sqrt((dx ** 2).sum(axis=-2) * (dy ** 2).sum(axis=-2))
+    return np.where(n > 2, r, np.nan)
+
+
+# ---------- panel ----------
+class CovidPanel:
+    """Countries on one daily calendar: values is country × day × series (NaN outside a country's data)."""
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], end: Optional[str] = END_DATE, window: int = WINDOW):
+        self.countries = list(frames)
+        spans = [f.index for f in frames.values() if len(f)]
+        if not spans:
+            raise ValueError("No data for any of the requested countries")
+        start = min(i.min() for i in spans)
+        stop = max(i.max() for i in spans)
+        if end is not None:
+            stop = min(stop, pd.Timestamp(end))
+        self.days = pd.date_range(start, stop, freq="D", name="Day")
+        self.values = np.stack([f.reindex(self.days)[SERIES].to_numpy(dtype=float) for f in frames.values()])
+        self.window = window
+        self.derived = self._derive()
+
+    @classmethod
+    def load(cls, countries: Sequence[str] = FOCUS_COUNTRIES, source: Optional[str] = None,
+             end: Optional[str] = END_DATE, window: int = WINDOW, **kw) -> "CovidPanel":
+        src = Source(source) if source else Source()
+        return cls(load_countries(countries, src, **kw), end=end, window=window)
+
+    def series(self, name: str) -> np.ndarray:
+        return self.values[..., SERIES.index(name)]
+
+    def _derive(self) -> Dict[str, np.ndarray]:
+        """Daily rates from the cumulative / weekly series and their trailing `window`-day means."""
+        doses = self.series("doses_per_100")
+        new_doses = np.diff(doses, axis=1, prepend=np.nan)
+        new_doses[new_doses < 0] = 0.0  # OWID occasionally revises cumulative totals down
+        daily = {
+            "new_doses_per_100": new_doses,
+            "deaths_per_million": self.series("deaths_per_million"),
+            "daily_cases": self.series("weekly_cases") / 7.0,
+        }
+        stacked = rolling_mean(np.stack(list(daily.values()), axis=-1), self.window, axis=1, min_periods=1)
+        out = dict(daily)
+        for j, name in enumerate(daily):
+            out[f"{name}_{self.window}d"] = stacked[..., j]
+        return out
+
+    def frame(self, country: str) -> pd.DataFrame:
+        """Daily table for one country: raw series plus derived rates and rolling means."""
+        i = self.countries.index(country)
+        df = pd.DataFrame(self.values[i], index=self.days, columns=SERIES)
+        for name, a in self.derived.items():
+            if name not in df:
+                df[name] = a[i]
+        return df.dropna(how="all")
+
+    def long(self) -> pd.DataFrame:
+        return pd.concat({c: self.frame(c) for c in self.countries}, names=["Entity"]).reset_index()
+
+    def rollout_start(self) -> pd.Series:
+        """First day with any doses administered, per country (NaT if none)."""
+        doses = self.series("doses_per_100")
+        started = doses > 0
+        first = np.where(started.any(axis=1), started.argmax(axis=1), -1)
+        days = np.where(first >= 0, self.days.to_numpy()[np.maximum(first, 0)], np.datetime64("NaT"))
+        return pd.Series(days, index=pd.Index(self.countries, name="Entity"), name="rollout_start")
+
+    def lag_correlations(self, max_lag: int = MAX_LAG, x: str = "doses_per_100",
+                         y: Optional[str] = None) -> pd.DataFrame:
+        """r of x today against y lag days later, country × lag (y defaults to rolling deaths per million)."""
+        y = y or f"deaths_per_million_{self.window}d"
+        get = lambda n: self.derived[n] if n in self.derived else self.series(n)  # noqa: E731
+        r = lagged_corr(get(x), get(y), max_lag)
+        return pd.DataFrame(r, index=pd.Index(self.countries, name="Entity"),
+                            columns=pd.Index(range(max_lag + 1), name="lag"))
+
+    def weekly(self, freq: str = "W-SUN") -> pd.DataFrame:
+        """Weekly table as in Australia_Chile_COVID_Visualizations, with a pre/post rollout period label."""
+        g = self.long().set_index("Day").groupby("Entity")
+        sums = g[["daily_cases", "deaths_per_million"]].resample(freq).sum(min_count=1)
+        out = (pd.concat([sums, g["doses_per_100"].resample(freq).last()], axis=1)
+               .rename(columns={"daily_cases": "weekly_cases", "deaths_per_million": "weekly_deaths_per_million"})
+               .reset_index().rename(columns={"Day": "week_end"}))
+        out.insert(1, "week_start", out["week_end"] - pd.Timedelta(days=6))
+        start = out["Entity"].map(self.rollout_start())
+        out["period"] = np.where(start.isna() | (out["week_end"] < start), "pre_vaccine", "post_vaccine")
+        return out
+
+    def compare(self, max_lag: int = MAX_LAG) -> pd.DataFrame:
+        """One row per country: rollout, latest / peak values, pre vs post means and the strongest lag."""
+        deaths = self.derived[f"deaths_per_million_{self.window}d"]
+        cases = self.derived[f"daily_cases_{self.window}d"]
+        doses = self.series("doses_per_100")
+        start = self.rollout_start().to_numpy()
+        post = self.days.to_numpy()[None, :] >= start[:, None]  # False everywhere when NaT
+        pre = ~post & ~np.isnan(deaths)
+
+        def masked_mean(a, m):
+            m = m & ~np.isnan(a)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(m, a, 0.0).sum(axis=1) / m.sum(axis=1)
+
+        def last_valid(a):
+            ok = ~np.isnan(a)
+            idx = a.shape[1] - 1 - ok[:, ::-1].argmax(axis=1)
+            return np.where(ok.any(axis=1), a[np.arange(len(a)), idx], np.nan), idx
+
+        def argmax_or_none(a):
+            i = np.where(np.isnan(a), -np.inf, a).argmax(axis=1)
+            return i, ~np.isnan(a).all(axis=1)
+
+        rows = np.arange(len(self.countries))
+        days = self.days.to_numpy()
+        latest_doses, di = last_valid(doses)
+        latest_deaths, _ = last_valid(deaths)
+        peak_i, has_deaths = argmax_or_none(deaths)
+        r = self.lag_correlations(max_lag).to_numpy()
+        best, has_r = argmax_or_none(np.abs(r))
+        best_lag = pd.array(best, dtype="Int64")
+        best_lag[~has_r] = pd.NA
+        out = pd.DataFrame({
+            "rollout_start": start,
+            "latest_doses_per_100": latest_doses,
+            "latest_doses_day": np.where(np.isnan(latest_doses), np.datetime64("NaT"), days[di]),
+            "latest_deaths_per_million": latest_deaths,
+            "peak_deaths_per_million": deaths[rows, peak_i],
+            "peak_deaths_day": np.where(has_deaths, days[peak_i], np.datetime64("NaT")),
+            "deaths_pre": masked_mean(deaths, pre),
+            "deaths_post": masked_mean(deaths, post),
+            "cases_pre": masked_mean(cases, ~post),
+            "cases_post": masked_mean(cases, post),
+            "best_lag": best_lag,
+            "best_lag_r": r[rows, best],
+            "r_lag0": r[:, 0],
+        }, index=pd.Index(self.countries, name="Entity"))
+        # coverage tiers from the covid19 Dash app's insight box
+        out["coverage"] = pd.cut(out["latest_doses_per_100"], [-np.inf, 50, 90, np.inf],
+                                 labels=["low", "strong", "very high"])
+        return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Streamed COVID-19 vaccination vs deaths comparison per country.")
+    p.add_argument("--source", default=DEFAULT_SOURCE, help="covid19 zip or an extracted folder")
+    p.add_argument("--countries", nargs="+", default=FOCUS_COUNTRIES)
+    p.add_argument("--window", type=int, default=WINDOW, help="rolling mean window (days)")
+    p.add_argument("--max-lag", type=int, default=MAX_LAG, help="largest vaccination -> deaths lag (days)")
+    p.add_argument("--end", default=END_DATE, help="last day kept (default %(default)s)")
+    p.add_argument("--refresh", action="store_true", help="re-stream the sources, ignoring cached countries")
+    p.add_argument("--out", default=None, help="write the comparison table to this CSV")
+    p.add_argument("--weekly", default=None, help="write the weekly pre/post table to this CSV")
+    args = p.parse_args(argv)
+
+    t0 = time.perf_counter()
+    panel = CovidPanel.load(args.countries, args.source, end=args.end, window=args.window, refresh=args.refresh)
+    t1 = time.perf_counter()
+    cmp = panel.compare(args.max_lag)
+    t2 = time.perf_counter()
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(cmp.to_string(float_format=lambda v: f"{v:.3f}"))
+    print(f"{len(panel.countries)} countries × {len(panel.days)} days: load {t1 - t0:.2f}s, analysis {t2 - t1:.3f}s")
+    if args.out:
+        cmp.to_csv(args.out)
+    if args.weekly:
+        panel.weekly().to_csv(args.weekly, index=False)
+
+
+if __name__ == "__main__":
+    main()